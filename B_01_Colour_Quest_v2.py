@@ -1,73 +1,119 @@
+import time
+
+# taken before anything else is imported (for the startup report)
+LAUNCH_TIME = time.perf_counter()
+
 from tkinter import *
 from functools import partial # To prevent unwanted windows
-import csv
-import random
+import argparse
 
-# helper functions go here
-def get_colours():
-    """
-    Retrieves colours form csv file
-    :return: list of colours which where each list item has the
-    colour name, associated score and foreground colour for the text
-    """
+from callback_profiler import DEFAULT_SLOW_MS, CallbackProfiler
+from colour_catalogue import BackgroundLoader, get_colours
+from game_session import CHOICE_MADE, ROUND_STARTED, GameSession
+from game_store import DATABASE_FILE, GameStore
+from leaderboard import LEADERBOARD_FILE, Leaderboard
+from procedural_catalogue import procedural_catalogue
+from room_protocol import MAX_ROUNDS
+from round_trace import LEVEL_NAMES, JsonlSink, RoundTracer
+from session_recording import SessionRecorder, append_recording
+from stall_monitor import DEFAULT_STALL_MS, StallMonitor
+from startup_timer import StartupTimer
+from widget_render import WidgetRenderer, add_counters, format_counters
 
-    # Retrieve colours from csv file and put them in a list
-    file = open("00_colour_list_hex_v3.csv", "r")
-    all_colors = list(csv.reader(file, delimiter=","))
-    file.close()
+startup_timer = StartupTimer(LAUNCH_TIME)
+startup_timer.mark("imports")
 
-    # remove the first row
-    all_colors.pop(0)
+# round event tracer (set up in the main routine if --trace is used)
+tracer = None
 
-    return all_colors
+# renderers of the games open now, and the counters of games already
+# closed (printed at exit if --render-stats is used)
+live_renderers = []
+render_totals = {}
 
+# file that every game is recorded to (set if --record is used)
+recording_path = None
 
-def round_ans(val):
-    """
-    Rounds numbers to nearest integer
-    :param val: number to be rounded.
-    :return: Rounded number (an integer)
-    """
+# room server to play on instead of playing alone (set if --server is used)
+remote_server = None
+room_name = None
+player_name = None
+
+# how often to check for messages from the room server (ms)
+REMOTE_POLL_MS = 20
+
+# loads the colours in the background (started once the first window is up)
+catalogue_loader = None
+
+# 'text' or 'json' if --startup-report is used
+startup_report = None
 
-    var_rounded = (val * 2 + 1) // 2
-    raw_rounded = "{:.0f}".format(var_rounded)
-    return int(raw_rounded)
+# start a game straight away and quit once it's ready (for benchmarks)
+quit_after_startup = False
 
+# database of every game played (None if --no-history is used)
+game_store = None
 
-def get_round_colours():
+# best games played on this computer (None if --no-history is used)
+leaderboard = None
+leaderboard_path = None
+
+# times every Tk callback (set up in the main routine if --profile-callbacks
+# is used) and where its summary goes ('-' prints it)
+callback_profiler = None
+callback_profile_path = None
+
+# watches for the event loop getting stuck (set up if --stall-monitor or
+# --debug-overlay is used) and where its report goes (None for nowhere)
+stall_monitor = None
+stall_report_path = None
+
+
+def current_catalogue():
     """
-    Choose four colours form larger list ensuring that the scores are all different.
-    :return: list of colours and score to beat (median of course)
+    :return: colours to play with (waits for the background load if it
+    hasn't finished yet, None means use the csv file)
     """
 
-    all_colour_list = get_colours()
+    if catalogue_loader is None:
+        return None
 
-    round_colours = []
-    colour_scores = []
+    if not catalogue_loader.ready():
+        start = time.perf_counter()
+        catalogue_loader.result()
+        startup_timer.record("catalogue_wait", time.perf_counter() - start)
+    else:
+        startup_timer.record("catalogue_wait", 0)
 
-    # loop until we have four colours with different scores...
-    while len(round_colours) < 4:
-        potential_colour = random.choice(all_colour_list)
+    return catalogue_loader.result()
 
-        # colour scores are being read as a string,
-        # change them to an integer to compare / when adding to score list
-        if potential_colour[1] not in colour_scores:
-            round_colours.append(potential_colour)
 
-            # make score an integer and add it to the list of scores
-            colour_scores.append(potential_colour[1])
+def first_round_shown():
+    """
+    Called when a round has been drawn - the first time, finishes the startup report
+    """
+
+    if not startup_timer.mark("first_round"):
+        return
 
-    # change scores to integers
-    int_scores = [int(x) for x in colour_scores]
+    if catalogue_loader is not None and catalogue_loader.seconds is not None:
+        startup_timer.record("catalogue_load", catalogue_loader.seconds)
 
-    # Get median score / target score
-    int_scores.sort()
-    median = (int_scores[1] + int_scores[2]) / 2
-    median = round_ans(median)
-    highest = int_scores[-1]
+    if startup_report:
+        print(startup_timer.format_report(startup_report), flush=True)
 
+    if quit_after_startup:
+        root.destroy()
 
-    return round_colours, median, highest
+
+def dump_debug_reports(event=None):
+    """
+    Writes the callback timings / stall report so far (bound to F12)
+    """
+    if callback_profiler is not None:
+        callback_profiler.dump(callback_profile_path)
+    if stall_monitor is not None and stall_report_path is not None:
+        stall_monitor.dump(stall_report_path)
 
 
 # Classes start here
@@ -142,12 +188,17 @@ class StartGame:
         self.num_rounds_entry.config(bg="#FFFFFF")
 
         error = "Oops - Please choose a whole number more than zero."
+        most_rounds = None
+        if remote_server is not None:
+            # the room server won't make games longer than this
+            most_rounds = MAX_ROUNDS
+            error = f"Oops - Please choose a whole number from 1 to {MAX_ROUNDS}."
         has_errors = "no"
 
         # checks that amount to be converted is a number above absolute zero
         try:
             rounds_wanted = int(rounds_wanted)
-            if rounds_wanted > 0:
+            if rounds_wanted > 0 and (most_rounds is None or rounds_wanted <= most_rounds):
                 # Clear entry box and reset instruction label so
                 # that when users play a new game, they don't see an error message.
                 self.num_rounds_entry.delete(0, END)
@@ -159,6 +210,10 @@ class StartGame:
                 has_errors = "yes"
         except ValueError:
             has_errors = "yes"
+        except OSError as server_error:
+            # couldn't connect to the room server
+            has_errors = "yes"
+            error = f"Oops - Couldn't reach the server ({server_error})."
 
         if has_errors == "yes":
             self.choose_label.config(text=error, fg="#990000",
@@ -172,30 +227,48 @@ class Play:
     """
 
     def __init__(self, how_many):
-        # Integers / String Variables
-        self.target_score = IntVar()
+        # game rules, round counters and score lists live in the session
+        # (plain Python - the window just listens for changes)
+        startup_timer.mark("play_clicked")
+        if remote_server is not None:
+            # rounds come from the room server (everyone in the room gets the
+            # same ones) - only imported here so that solo games start faster
+            from remote_session import RemoteGameSession
+            self.session = RemoteGameSession(remote_server, room_name, player_name, how_many)
+        else:
+            self.session = GameSession(how_many, catalogue=current_catalogue(),
+                                       tracer=tracer)
 
-        # rounds played - start with zero
-        self.rounds_played = IntVar()
-        self.rounds_played.set(0)
+        # record the seed and choices so the game can be replayed
+        self.recorder = None
+        if recording_path is not None and self.session.seed is not None:
+            self.recorder = SessionRecorder(self.session)
 
-        self.rounds_wanted = IntVar()
-        self.rounds_wanted.set(how_many)
+        # record the game's rounds in the history database
+        self.store_session_id = None
+        if game_store is not None:
+            self.store_session_id = game_store.attach(self.session)
 
-        self.rounds_won = IntVar()
+        # set once the game has been saved and its callbacks stopped
+        self.game_ended = False
 
-        # Colours lists and score list
-        self.round_colour_list = []
-        self.all_scores_list = []
-        self.all_high_score_list = []
+        # stats and hints dialogues (made the first time they are opened)
+        self.stats_window = None
+        self.hints_window = None
 
         self.play_box = Toplevel()
 
+        # all widget changes go through the renderer, which only sends
+        # Tk the options that have changed (once per event)
+        self.renderer = WidgetRenderer(self.play_box)
+        live_renderers.append(self.renderer)
+
         self.game_frame = Frame(self.play_box)
         self.game_frame.grid(padx=10, pady=10)
 
         # If users press the 'x' on the game window, end the entire game!
-        self.play_box.protocol('WM_DELETE_WINDOW', root.destroy)
+        # (after saving it - see end_game)
+        self.play_box.protocol('WM_DELETE_WINDOW', self.quit_game)
 
         # body font for most labels...
         body_font = ("Arial", 12)
@@ -213,6 +286,7 @@ class Play:
             self.make_label = Label(self.game_frame, text=item[0], font=item[1],
                                     bg=item[2], wraplength=300, justify="left")
             self.make_label.grid(row=item[3], pady=10, padx=10)
+            self.renderer.seed(self.make_label, text=item[0], font=item[1])
 
             play_labels_ref.append(self.make_label)
 
@@ -237,6 +311,7 @@ class Play:
             self.colour_button.grid(row=item // 2,
                                     column=item % 2,
                                     padx=5, pady=5)
+            self.renderer.seed(self.colour_button, text="Colour Name", state=NORMAL)
             self.colour_button_ref.append(self.colour_button)
 
         # Frame to hold hints and stats buttons
@@ -258,6 +333,8 @@ class Play:
                                          command=item[3], font=("Arial", 16, "bold"),
                                          fg="#FFFFFF", width=item[4])
             make_control_button.grid(row=item[5], column=item[6], padx=5, pady=5)
+            self.renderer.seed(make_control_button, text=item[1], bg=item[2],
+                               state=NORMAL)
 
             control_ref_list.append(make_control_button)
 
@@ -267,171 +344,267 @@ class Play:
         self.stats_button = control_ref_list[2]
         self.end_game_button = control_ref_list[3]
 
-        self.stats_button.config(state=DISABLED)
+        self.renderer.set(self.stats_button, state=DISABLED)
+
+        # update the window whenever the game changes
+        self.session.subscribe(self.session_changed)
 
         # Once interface has been created, invoke new
         # round function for first round.
         self.new_round()
 
+        # queued after the renderer's flush, so runs once the round is drawn
+        self.play_box.after_idle(first_round_shown)
+
+        # idle callback that works out the next round ahead of time
+        self.prefetch_id = None
+
+        # check for messages from the room server every so often
+        self.poll_id = None
+        if remote_server is not None:
+            self.poll_id = self.play_box.after(REMOTE_POLL_MS, self.poll_server)
+
     def new_round(self):
         """
-        Chooses four colours, works out median for score to beat, configures
-        buttons with chosen colours
+        Chooses four colours and works out median for score to beat
+        (the window is updated by show_round when the session says so)
         """
 
-        # retrieve number of rounds played, add one to it and configure heading
-        rounds_played = self.rounds_played.get()
-        self.rounds_played.set(rounds_played)
+        # buttons are only updated when Tk is idle, so ignore a
+        # click that arrives before 'Next Round' has been disabled
+        if self.session.awaiting_choice or self.session.game_over:
+            return
 
-        rounds_wanted = self.rounds_wanted.get()
+        self.session.new_round()
 
-        # get rounds colours and median score...
-        self.round_colour_list, median, highest = get_round_colours()
+    def round_results(self, user_choice):
+        """
+        Retrieves which button was pu shed (index 0 - 3) and passes it to
+        the session, which compares the score with the median and adds it
+        to the stats (the window is updated by show_result)
+        """
+
+        # ignore a second click that arrives before the buttons are disabled
+        if not self.session.awaiting_choice:
+            return
+
+        self.session.choose(user_choice)
 
-        # Set target score as median (for later comparison)
-        self.target_score.set(median)
+    def session_changed(self, kind, info):
+        """
+        Called by the session whenever the game changes
+        """
+        if kind == ROUND_STARTED:
+            self.show_round(info)
+        elif kind == CHOICE_MADE:
+            self.show_result(info)
 
-        # add median and high score to lists for stats...
-        self.all_high_score_list.append(highest)
+    def show_round(self, round_info):
+        """
+        Configures heading, target and buttons with the new round's colours
+        """
+
+        render = self.renderer.set
 
         # Update heading, and score to beat labels. "Hide results label"
-        self.heading_label.config(text=f"Round {rounds_played + 1} of {rounds_wanted}")
-        self.target_label.config(text=f"Target Score: {median}",
-                                 font=("Arial", 14, "bold"))
-        self.results_label.config(text=f"{'=' * 7}", bg="#F0F0F0")
+        render(self.heading_label, text=f"Round {round_info.round_number} "
+                                        f"of {round_info.rounds_wanted}")
+        render(self.target_label, text=f"Target Score: {round_info.target}",
+               font=("Arial", 14, "bold"))
+        render(self.results_label, text=f"{'=' * 7}", bg="#F0F0F0")
 
         # configure buttons using foreground and background colours from list
         # enable colour buttons (disabled at the end of the last round)
+        round_colours = round_info.colours
         for count, item in enumerate(self.colour_button_ref):
-            item.config(fg=self.round_colour_list[count][2],
-                        bg=self.round_colour_list[count][0],
-                        text=self.round_colour_list[count][0], state=NORMAL)
+            colour = round_colours[count]
+            render(item, fg=colour.fg, bg=colour.name,
+                   text=colour.name, state=NORMAL)
 
-        self.next_button.config(state=DISABLED)
+        render(self.next_button, state=DISABLED)
 
-    def round_results(self, user_choice):
+    def show_result(self, result):
         """
-        Retrieves which button was pu shed (index 0 - 3), retrieves
-        score and then compare sit with median, updates results
-        and adds results to stats list.
+        Shows the result of a round (and the end of game summary)
         """
-        # enable stats button after at least one round has been played.
-        self.stats_button.config(state=NORMAL)
-
-        # Get user score and colour based on button press...
-        score = int(self.round_colour_list[user_choice][1])
-
-        # Add one to the number of rounds played and retrieve
-        # the number of rounds won...
-        rounds_played = self.rounds_played.get()
-        rounds_played += 1
-        self.rounds_played.set(rounds_played)
-
-        rounds_won = self.rounds_won.get()
 
-        # alternate way to get button name. Good for if buttons have been scrambled!
-        colour_name = self.colour_button_ref[user_choice].cget('text')
+        render = self.renderer.set
+        score = result.score
+        colour_name = result.colour_name
 
-        # retrieve target score and compare with user score to find round result
-        target = self.target_score.get()
-
-        if score >= target:
+        if result.won:
             result_text = f"Success! {colour_name} earned you {score} points"
             result_bg = "#82B366"
-            self.all_scores_list.append(score)
-
-            rounds_won = self.rounds_won.get()
-            rounds_won += 1
-            self.rounds_won.set(rounds_won)
-
         else:
             result_text = f"Oops {colour_name} ({score}) is less than the target."
             result_bg = "#F8CECC"
-            self.all_scores_list.append(0)
-
-        self.results_label.config(text=result_text, bg=result_bg)
 
-        # printing area to generate test data for stats (delete when done)
-        print("all scores: ", self.all_scores_list)
-        print("highest scores: ", self.all_high_score_list)
+        render(self.results_label, text=result_text, bg=result_bg)
 
         # enable stats & next buttons, disable colour buttons
-        self.next_button.config(state=NORMAL)
-        self.stats_button.config(state=NORMAL)
-
-        # check to see if game is over
-        rounds_wanted = self.rounds_wanted.get()
+        render(self.next_button, state=NORMAL)
+        render(self.stats_button, state=NORMAL)
 
         # code for when the game ends!
-        if rounds_played == rounds_wanted:
+        if result.game_over:
 
             # work out success rate
-            success_rate = rounds_won / rounds_played * 100
+            success_rate = result.rounds_won / result.rounds_played * 100
             success_string = ("Success Rate: "
-                              f"{rounds_won} / {rounds_played} "
+                              f"{result.rounds_won} / {result.rounds_played} "
                               f"({success_rate:.0f}%)")
 
 
             # Configure 'end game' labels / buttons
-            self.heading_label.config(text="Game Over")
-            self.target_label.config(text=success_string)
-            self.choose_label.config(text="Please click the stats "
-                                          "button for more info.")
+            render(self.heading_label, text="Game Over")
+            # submitted (and saved) before anything is drawn
+            leaderboard_note = self.leaderboard_text(result)
+
+            render(self.target_label, text=success_string)
+            render(self.choose_label, text="Please click the stats "
+                                           "button for more info." + leaderboard_note)
+
+            render(self.next_button, state=DISABLED, text="Game Over")
+            render(self.end_game_button, text="Play Again", bg="#006600")
+
+        # work out the next round while the player reads the result (queued
+        # after the renderer's flush so the result is drawn first)
+        elif self.prefetch_id is None:
+            self.prefetch_id = self.play_box.after_idle(self.prefetch_round)
+
+        for item in self.colour_button_ref:
+            render(item, state=DISABLED)
+
+    def leaderboard_text(self, result):
+        """
+        Adds a finished game to the leaderboard
+        :return: text about where it came ('' if it didn't make the board)
+        """
+
+        # room games go on the room server's leaderboard instead
+        if leaderboard is None or remote_server is not None:
+            return ""
+
+        place = leaderboard.submit(player_name, self.session.stats.total_score,
+                                   result.rounds_won, result.rounds_played)
+        if place is None:
+            return ""
+
+        leaderboard.save(leaderboard_path)
+        bracket = leaderboard.bracket_name(leaderboard.bracket_for(result.rounds_played))
+        return f"\nLeaderboard: #{place} for {bracket} games!"
+
+    def prefetch_round(self):
+        self.prefetch_id = None
+        self.session.prefetch()
+
+    def poll_server(self):
+        """
+        Passes on messages from the room server (rounds and results)
+        """
+        self.poll_id = None
+        still_connected = self.session.pump()
+
+        error = self.session.take_error()
+        if error is not None:
+            self.show_server_error(error)
 
-            self.next_button.config(state=DISABLED, text="Game Over")
-            self.end_game_button.config(text="Play Again", bg="#006600")
+        if still_connected:
+            self.poll_id = self.play_box.after(REMOTE_POLL_MS, self.poll_server)
 
+    def show_server_error(self, error):
+        """
+        Tells the player what went wrong on the room server (no more
+        choices can be made until a new round arrives)
+        """
+
+        render = self.renderer.set
+        render(self.results_label, text=f"Server problem: {error}", bg="#F8CECC")
         for item in self.colour_button_ref:
-            item.config(state=DISABLED)
+            render(item, state=DISABLED)
+        render(self.next_button, state=DISABLED)
 
     def close_play(self):
         # reshow root (ie: choose rounds) and end current
         # game / allow new game to start
         root.deiconify()
+        self.end_game()
         self.play_box.destroy()
 
+    def quit_game(self):
+        # closing the game window quits, but the game is still saved
+        self.end_game()
+        root.destroy()
+
+    def end_game(self):
+        """
+        Saves the game (recording and history) and stops its callbacks -
+        both ways of closing the game window come through here
+        """
+
+        if self.game_ended:
+            return
+        self.game_ended = True
+        self.renderer.cancel()
+        live_renderers.remove(self.renderer)
+        add_counters(render_totals, self.renderer.counters())
+
+        # stop the idle / timer callbacks (a round worked out ahead
+        # of time is never going to be played)
+        if self.prefetch_id is not None:
+            self.play_box.after_cancel(self.prefetch_id)
+            self.prefetch_id = None
+        if self.poll_id is not None:
+            self.play_box.after_cancel(self.poll_id)
+            self.poll_id = None
+
+        if self.recorder is not None and self.recorder.recording.rounds_played:
+            append_recording(recording_path, self.recorder.recording)
+            self.recorder = None
+
+        self.session.close()
+        if game_store is not None:
+            game_store.end_session(self.store_session_id)
+
     def to_hints(self):
         """
         Displays hints for playing game
         :return:
         """
-        rounds_played = self.rounds_played.get()
-        DisplayHints(self, rounds_played)
+        # dialogue is only built the first time it is needed
+        if self.hints_window is None:
+            self.hints_window = DisplayHints(self)
+        self.hints_window.show(self, self.session.rounds_played)
 
     def to_stats(self):
         """
         Retrieves everything we need to display the game / round statistics
         """
 
-        # IMPORTANT: retrieve number of rounds
-        # won as a number (rather than the 'self' container)
-        rounds_won = self.rounds_won.get()
-        stats_bundle = [rounds_won, self.all_scores_list,
-                        self.all_high_score_list]
+        # dialogue is only built the first time it is needed
+        if self.stats_window is None:
+            self.stats_window = Stats(self)
 
-        Stats(self, stats_bundle)
+        # running totals are kept up to date by the session every round,
+        # so nothing needs to be added up (or sorted) here
+        lifetime_stats = None
+        if game_store is not None:
+            lifetime_stats = game_store.lifetime_stats()
 
-class Stats:
-
-    def __init__(self, partner, all_stats_info):
+        self.stats_window.show(self, self.session.stats, lifetime_stats)
 
-        # disable buttons to prevent program crashing
-        partner.hint_button.config(state=DISABLED)
-        partner.end_game_button.config(state=DISABLED)
-        partner.stats_button.config(state=DISABLED)
-
-        # Extract information from master list...
-        rounds_won = all_stats_info[0]
-        user_scores = all_stats_info[1]
-        high_scores = all_stats_info[2]
+class Stats:
+    """
+    Statistics dialogue. Built once per game window, then shown / hidden
+    (only labels whose text has changed are updated when it is shown)
+    """
 
-        # sort user scores to find high score...
-        user_scores.sort()
+    def __init__(self, partner):
 
-        self.stats_box = Toplevel()
+        self.stats_box = Toplevel(partner.play_box)
 
-        # disable help button
-        partner.stats_button.config(state=DISABLED)
+        # stay hidden until show() is called
+        self.stats_box.withdraw()
 
         # if users press cross at top, closes help and
         # 'releases' help button
@@ -441,15 +614,74 @@ class Stats:
         self.stats_frame = Frame(self.stats_box, width=350)
         self.stats_frame.grid()
 
-        # Math to populate stats dialogue...
-        rounds_played = len(user_scores)
+        heading_font = ("Arial", 16, "bold")
+        normal_font = ("Arial", 14)
+        comment_font = ("Arial", 13)
+
+        # Label list (text | font | 'sticky') - text is filled in by show()
+        all_stats_strings = [
+            ["statistics", heading_font, ""],
+            ["", normal_font, "W"],
+            ["", normal_font, "W"],
+            ["", normal_font, "W"],
+            ["", comment_font, "W"],
+            ["\nRound Stats", heading_font, ""],
+            ["", normal_font, "W"],
+            ["", normal_font, "W"]
+        ]
+
+        # lifetime stats (all games ever played) if history is being kept
+        if game_store is not None:
+            all_stats_strings += [
+                ["Lifetime Stats", heading_font, ""],
+                ["", normal_font, "W"],
+                ["", normal_font, "W"],
+                ["", normal_font, "W"]
+            ]
+
+        self.stats_label_ref_list = []
+        self.label_text = []
+        for count, item in enumerate(all_stats_strings):
+            self.stats_label = Label(self.stats_frame, text=item[0], font=item[1],
+                                     anchor="w", justify="left",
+                                     padx=30, pady=5)
+            self.stats_label.grid(row=count, sticky=item[2], padx=10)
+            self.stats_label_ref_list.append(self.stats_label)
+            self.label_text.append(item[0])
+
+        # retrieve comment label so its background can be changed
+        self.stats_comment_label = self.stats_label_ref_list[4]
+        self.comment_colour = None
+
+        self.dismiss_button = Button(self.stats_frame,
+                                     font=("Arial", 16, "bold"),
+                                     text="Dismiss", bg="#333333",
+                                     fg="#FFFFFF", width=20,
+                                     command=partial(self.close_stats,
+                                                      partner))
+        self.dismiss_button.grid(row=len(all_stats_strings), padx=10, pady=10)
+
+    def show(self, partner, running_stats, lifetime_stats=None):
+        """
+        Updates the statistics and shows the dialogue
+        :param running_stats: RunningStats for this game
+        :param lifetime_stats: totals for every game played (or None)
+        """
 
-        success_rate = (rounds_won / rounds_played) * 100
-        total_score = sum(user_scores)
-        max_possible = sum(high_scores)
+        # disable buttons to prevent program crashing
+        partner.renderer.set(partner.hint_button, state=DISABLED)
+        partner.renderer.set(partner.end_game_button, state=DISABLED)
+        partner.renderer.set(partner.stats_button, state=DISABLED)
 
-        best_score = user_scores[-1]
-        average_score = total_score / rounds_played
+        # Math to populate stats dialogue...
+        stats = running_stats.summary()
+        rounds_won = stats["rounds_won"]
+        rounds_played = stats["rounds_played"]
+        success_rate = stats["success_rate"]
+        total_score = stats["total_score"]
+        max_possible = stats["max_possible"]
+        best_score = stats["best_score"]
+        average_score = stats["average_score"]
 
         # Strings for Stats labels...
 
@@ -476,66 +708,67 @@ class Stats:
 
         average_score_string = f"Average Score: {average_score:.0f}\n"
 
-        heading_font = ("Arial", 16, "bold")
-        normal_font = ("Arial", 14)
-        comment_font = ("Arial", 13)
-
-        # Label list (text | font | 'sticky')
-        all_stats_strings = [
-            ["statistics", heading_font, ""],
-            [success_string, normal_font, "W"],
-            [total_score_string, normal_font, "W"],
-            [max_possible_string, normal_font, "W"],
-            [comment_string, comment_font, "W"],
-            ["\nRound Stats", heading_font, ""],
-            [best_score_string, normal_font, "W"],
-            [average_score_string, normal_font, "W"]
+        # label number | new text
+        new_text = [
+            [1, success_string],
+            [2, total_score_string],
+            [3, max_possible_string],
+            [4, comment_string],
+            [6, best_score_string],
+            [7, average_score_string]
         ]
 
-        stats_label_ref_list = []
-        for count, item in enumerate(all_stats_strings):
-            self.stats_label = Label(self.stats_frame, text=item[0], font=item[1],
-                                     anchor="w", justify="left",
-                                     padx=30, pady=5)
-            self.stats_label.grid(row=count, sticky=item[2], padx=10)
-            stats_label_ref_list.append(self.stats_label)
+        if lifetime_stats is not None and len(self.label_text) > 8:
+            new_text += [
+                [9, f"Games: {lifetime_stats['games']}   "
+                    f"Rounds: {lifetime_stats['rounds_played']}"],
+                [10, f"Success Rate: {lifetime_stats['rounds_won']} / "
+                     f"{lifetime_stats['rounds_played']} "
+                     f"({lifetime_stats['success_rate']:.0f}%)"],
+                [11, f"Total Score: {lifetime_stats['total_score']} / "
+                     f"{lifetime_stats['max_possible']}   "
+                     f"Best: {lifetime_stats['best_score']}"]
+            ]
+
+        # only send Tk the labels that have actually changed
+        for label_number, text in new_text:
+            if self.label_text[label_number] != text:
+                self.stats_label_ref_list[label_number].config(text=text)
+                self.label_text[label_number] = text
 
         # configure comment label background (for all won / all lost)
-        stats_comment_label = stats_label_ref_list[4]
-        stats_comment_label.config(bg=comment_colour)
+        if comment_colour != self.comment_colour:
+            self.stats_comment_label.config(bg=comment_colour)
+            self.comment_colour = comment_colour
 
-        self.dismiss_button = Button(self.stats_frame,
-                                     font=("Arial", 16, "bold"),
-                                     text="Dismiss", bg="#333333",
-                                     fg="#FFFFFF", width=20,
-                                     command=partial(self.close_stats,
-                                                      partner))
-        self.dismiss_button.grid(row=8, padx=10, pady=10)
+        self.stats_box.deiconify()
+        self.stats_box.lift()
 
     def close_stats(self, partner):
         """
-        closes help dialogue box ( and enables help button )
+        hides stats dialogue box ( and enables help button )
         """
         # Put help button back to normal...
-        partner.stats_button.config(state=NORMAL)
-        partner.end_game_button.config(state=NORMAL)
-        partner.hint_button.config(state=NORMAL)
-        self.stats_box.destroy()
+        partner.renderer.set(partner.stats_button, state=NORMAL)
+        partner.renderer.set(partner.end_game_button, state=NORMAL)
+        partner.renderer.set(partner.hint_button, state=NORMAL)
+        self.stats_box.withdraw()
 
 
 class DisplayHints:
+    """
+    Hints dialogue. Built once per game window, then shown / hidden
+    """
 
-    def __init__(self, partner, rounds_played):
-        self.rounds_played = rounds_played
+    def __init__(self, partner):
+        self.rounds_played = 0
 
         # setup dialogue box and background colour
         background = "#ffe6cc"
-        self.hint_box = Toplevel()
+        self.hint_box = Toplevel(partner.play_box)
 
-        # disable help button
-        partner.hint_button.config(state=DISABLED)
-        partner.end_game_button.config(state=DISABLED)
-        partner.stats_button.config(state=DISABLED)
+        # stay hidden until show() is called
+        self.hint_box.withdraw()
 
         # if users press cross at top, closes help and
         # 'releases' help button
@@ -580,26 +813,160 @@ class DisplayHints:
         for item in recolour_list:
             item.config(bg=background)
 
+    def show(self, partner, rounds_played):
+        """
+        Shows the hints (the text never changes, so nothing is reconfigured)
+        """
+        self.rounds_played = rounds_played
+
+        # disable help button
+        partner.renderer.set(partner.hint_button, state=DISABLED)
+        partner.renderer.set(partner.end_game_button, state=DISABLED)
+        partner.renderer.set(partner.stats_button, state=DISABLED)
+
+        self.hint_box.deiconify()
+        self.hint_box.lift()
+
     def close_hints(self, partner):
         """
-        closes hint dialogue box ( and enables hint button )
+        hides hint dialogue box ( and enables hint button )
         """
         # Put hint button back to normal...
-        partner.hint_button.config(state=NORMAL)
-        partner.end_game_button.config(state=NORMAL)
+        partner.renderer.set(partner.hint_button, state=NORMAL)
+        partner.renderer.set(partner.end_game_button, state=NORMAL)
 
 
         # only enable stats button if we have
         # played at least one round.
         if self.rounds_played >= 1:
-            partner.stats_button.config(state=NORMAL)
+            partner.renderer.set(partner.stats_button, state=NORMAL)
 
-        self.hint_box.destroy()
+        self.hint_box.withdraw()
 
 
 # main routine
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Colour Quest")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="record round events to a JSON lines file")
+    parser.add_argument("--trace-level", choices=LEVEL_NAMES, default="info",
+                        help="debug also records every round generated")
+    parser.add_argument("--render-stats", action="store_true",
+                        help="print how many widget changes were sent to Tk / "
+                             "skipped at exit")
+    parser.add_argument("--history-db", default=DATABASE_FILE,
+                        help="SQLite file that every game is saved to")
+    parser.add_argument("--no-history", action="store_true",
+                        help="don't save games (or keep a leaderboard)")
+    parser.add_argument("--leaderboard", default=LEADERBOARD_FILE, metavar="FILE",
+                        help="file the best games are kept in")
+    parser.add_argument("--procedural", action="store_true",
+                        help="play with every 24 bit colour instead of the csv list")
+    parser.add_argument("--server", metavar="HOST:PORT",
+                        help="play in a room on a room server (see room_server.py)")
+    parser.add_argument("--room", default="colour-quest",
+                        help="room to join on the server")
+    parser.add_argument("--name", default="player", help="your name in the room")
+    parser.add_argument("--record", metavar="FILE",
+                        help="add every game (seed and choices) to a recording "
+                             "file that replay.py can play back")
+    parser.add_argument("--startup-report", nargs="?", const="text",
+                        choices=["text", "json"],
+                        help="print how long starting up took once the first round is ready")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help="start a one round game straight away and quit as soon as "
+                             "it is ready (for timing startup)")
+    parser.add_argument("--profile-callbacks", nargs="?", const="-", metavar="FILE",
+                        help="time every button / window / timer callback and write a "
+                             "summary at exit or when F12 is pressed (to FILE - .json "
+                             "for JSON - or printed if no file is given)")
+    parser.add_argument("--slow-ms", type=float, default=DEFAULT_SLOW_MS,
+                        help="callbacks slower than this count as slow")
+    parser.add_argument("--profile-sample", type=float, default=0, metavar="FRACTION",
+                        help="fraction of callbacks run under cProfile (the slowest "
+                             "slow ones are kept for the summary)")
+    parser.add_argument("--stall-monitor", nargs="?", const="-", metavar="FILE",
+                        help="watch for the window freezing and write a report of "
+                             "the stalls at exit or when F12 is pressed (to FILE - "
+                             ".json for JSON - or printed if no file is given)")
+    parser.add_argument("--stall-ms", type=float, default=DEFAULT_STALL_MS,
+                        help="freezes longer than this count as stalls")
+    parser.add_argument("--debug-overlay", action="store_true",
+                        help="show a small window with the event loop's lag")
+    args = parser.parse_args()
+
+    if not 0 <= args.profile_sample <= 1:
+        parser.error("--profile-sample must be a fraction from 0 to 1")
+
+    startup_report = args.startup_report
+    recording_path = args.record
+    remote_server = args.server
+    room_name = args.room
+    player_name = args.name
+    quit_after_startup = args.quit_after_startup
+
+    if not args.no_history:
+        game_store = GameStore(args.history_db)
+        leaderboard_path = args.leaderboard
+        try:
+            leaderboard = Leaderboard.load(leaderboard_path)
+        except ValueError as error:
+            # start a new one rather than refusing to play
+            print(f"not using the leaderboard: {error}")
+            leaderboard = Leaderboard()
+
+    if args.trace:
+        tracer = RoundTracer(level=LEVEL_NAMES[args.trace_level],
+                             sink=JsonlSink(args.trace))
+
+    if args.profile_callbacks:
+        # installed before any widgets so that every callback is timed
+        callback_profile_path = args.profile_callbacks
+        callback_profiler = CallbackProfiler(args.slow_ms, args.profile_sample)
+        callback_profiler.install()
+
     root = Tk()
     root.title("Colour Quest")
-    StartGame()
-    root.mainloop()
\ No newline at end of file
+
+    if args.stall_monitor or args.debug_overlay:
+        stall_report_path = args.stall_monitor
+        stall_monitor = StallMonitor(root, stall_ms=args.stall_ms,
+                                     profiler=callback_profiler)
+        stall_monitor.start()
+        if args.debug_overlay:
+            stall_monitor.show_overlay()
+
+    if callback_profiler is not None or stall_report_path is not None:
+        root.bind_all("<F12>", dump_debug_reports)
+    start_game = StartGame()
+
+    # draw the start window before doing anything slow
+    root.update_idletasks()
+    startup_timer.mark("first_window")
+
+    def load_colours():
+        colours = procedural_catalogue() if args.procedural else get_colours()
+        startup_timer.mark("catalogue_loaded")
+        return colours
+
+    # the colours load while the player decides how many rounds to play
+    catalogue_loader = BackgroundLoader(load_colours)
+
+    if quit_after_startup:
+        start_game.num_rounds_entry.insert(0, "1")
+        root.after_idle(start_game.check_rounds)
+
+    root.mainloop()
+
+    if stall_monitor is not None:
+        stall_monitor.stop()
+    dump_debug_reports()
+    if tracer is not None:
+        tracer.close()
+    if game_store is not None:
+        game_store.close()
+
+    if args.render_stats:
+        for renderer in live_renderers:
+            add_counters(render_totals, renderer.counters())
+        print(format_counters(render_totals), flush=True)
@@ -0,0 +1,408 @@
+"""
+Benchmarks for the hot paths in Colour Quest.
+
+Examples:
+    python benchmarks.py                               # shipped csv + synthetic lists
+    python benchmarks.py --sizes shipped 1000000 --json results.json
+    python benchmarks.py --save-baseline baseline.json
+    python benchmarks.py --baseline baseline.json      # flags regressions
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from colour_catalogue import (CSV_FILE, catalogue_cache, compile_catalogue,
+                              compiled_path_for, get_colours, open_compiled)
+from game_session import GameSession, RunningStats, get_round_colours, round_ans
+from leaderboard import Leaderboard
+from procedural_catalogue import procedural_catalogue
+
+DEFAULT_SIZES = ["shipped", "1000", "100000", "1000000"]
+
+# a case counts as a regression if it is this much slower than the baseline
+DEFAULT_TOLERANCE = 0.20
+
+# the game (started in a new process to time startup)
+GAME_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "B_01_Colour_Quest_v2.py")
+
+# times from the game's startup report that are recorded
+STARTUP_STAGES = ["imports", "first_window", "first_round"]
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    """
+    Writes a made up colour list (random hex codes, score from the hex code)
+    :param path: file to write
+    :param rows: number of colours
+    :param seed: seed so the same list is made every time
+    """
+
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        file.write("Hex Code,Score,Text Colour\n")
+        for _ in range(rows):
+            value = rng.randrange(0x1000000)
+            fg = "#000000" if value >= 0x800000 else "#FFFFFF"
+            file.write(f"#{value:06X},{value * 100 // 0xFFFFFF},{fg}\n")
+
+
+def percentile(sorted_values, fraction):
+    """
+    :param sorted_values: values sorted smallest to largest
+    :param fraction: 0.5 for median, 0.99 for 99th percentile etc
+    :return: value at that percentile (nearest rank)
+    """
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(func, min_time=0.5, max_samples=2000):
+    """
+    Times a function. Very quick functions are timed in batches so the
+    timer itself doesn't get in the way - each sample is one batch.
+    :param func: function to time (no arguments)
+    :param min_time: seconds to spend timing (roughly)
+    :param max_samples: maximum number of samples to take
+    :return: ops/sec, p50 and p99 latency (nanoseconds), number of calls
+    """
+
+    perf_counter_ns = time.perf_counter_ns
+
+    # find a batch size that takes at least ~20 microseconds
+    batch = 1
+    while True:
+        start = perf_counter_ns()
+        for _ in range(batch):
+            func()
+        elapsed = perf_counter_ns() - start
+        if elapsed >= 20_000 or batch >= 1 << 20:
+            break
+        batch *= 4
+
+    samples = []
+    calls = 0
+    total_ns = 0
+    deadline = perf_counter_ns() + int(min_time * 1e9)
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(samples) < max_samples:
+            start = perf_counter_ns()
+            for _ in range(batch):
+                func()
+            elapsed = perf_counter_ns() - start
+
+            samples.append(elapsed / batch)
+            calls += batch
+            total_ns += elapsed
+            if perf_counter_ns() >= deadline and len(samples) >= 5:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    samples.sort()
+    ops_per_sec = calls / (total_ns / 1e9) if total_ns else 0
+    return ops_per_sec, percentile(samples, 0.50), percentile(samples, 0.99), calls
+
+
+def peak_memory(func, calls=1):
+    """
+    :param func: function to measure
+    :param calls: number of times to call it
+    :return: peak memory allocated while running it (bytes)
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in range(calls):
+            func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return max(0, peak - baseline)
+
+
+def play_game(rounds, catalogue, rng):
+    """
+    Plays a full game through the game rules, choosing at random
+    """
+    session = GameSession(rounds, catalogue, rng)
+    rand = rng.random
+    while not session.game_over:
+        session.new_round()
+        session.choose(int(rand() * 4))
+    return session
+
+
+def build_cases(csv_paths, game_rounds, work_dir):
+    """
+    :param csv_paths: {size label: csv path}
+    :param game_rounds: rounds in the full game case
+    :param work_dir: folder for the compiled colour lists
+    :return: list of (case name, size label, function)
+    """
+
+    cases = [("round_ans", "-", lambda: round_ans(12.5))]
+
+    for label, path in csv_paths.items():
+        catalogue = get_colours(path)
+        rng = random.Random(1)
+
+        def cold_load(path=path):
+            catalogue_cache.clear()
+            get_colours(path)
+
+        def round_colours(path=path, rng=rng):
+            get_round_colours(get_colours(path), rng)
+
+        # kept away from the csv so that the cold case still reads the csv
+        compiled_dir = os.path.join(work_dir, "compiled")
+        os.makedirs(compiled_dir, exist_ok=True)
+        compiled_path = compile_catalogue(
+            path, os.path.join(compiled_dir, os.path.basename(compiled_path_for(path))))
+
+        cases += [
+            ("get_colours[cold]", label, cold_load),
+            ("get_colours[compiled]", label,
+             lambda path=path, compiled_path=compiled_path: open_compiled(compiled_path, path)),
+            ("get_colours[cached]", label, lambda path=path: get_colours(path)),
+            ("get_round_colours", label, round_colours),
+            (f"game[{game_rounds} rounds]", label,
+             lambda catalogue=catalogue, rng=rng: play_game(game_rounds, catalogue, rng)),
+        ]
+
+        # leave the cache warm for the next size
+        get_colours(path)
+
+    # every 24 bit colour, worked out as needed rather than stored
+    catalogue = procedural_catalogue()
+    rng = random.Random(1)
+    cases += [
+        ("procedural_catalogue", "16.7M colours", procedural_catalogue),
+        ("get_round_colours", "procedural",
+         lambda: get_round_colours(catalogue, rng)),
+        (f"game[{game_rounds} rounds]", "procedural",
+         lambda: play_game(game_rounds, catalogue, rng)),
+    ]
+
+    # a full board (most games are turned away) and an empty one being filled
+    rng = random.Random(1)
+    full_board = Leaderboard()
+    for _ in range(10000):
+        full_board.submit("bot", rng.randrange(1000), 5, 10)
+    cases += [
+        ("leaderboard.submit", "full board",
+         lambda: full_board.submit("bot", rng.randrange(1000), 5, 10)),
+        ("leaderboard.top", "after a change",
+         lambda: (full_board.submit("bot", 10 ** 9, 10, 10), full_board.top(10))),
+    ]
+
+    # stats maths for short and very long games
+    for rounds in (10, 1000, 100000):
+        rng = random.Random(rounds)
+        running_stats = RunningStats()
+        for _ in range(rounds):
+            points = rng.randrange(100)
+            running_stats.add(points, points + rng.randrange(10), points > 0)
+
+        cases.append(("stats", f"{rounds} rounds", running_stats.summary))
+
+    return cases
+
+
+def run(sizes, min_time=0.5, game_rounds=100, only=None, work_dir=None, quiet=False):
+    """
+    Runs the benchmark cases
+    :param sizes: 'shipped' and / or numbers of rows for synthetic colour lists
+    :param min_time: seconds to spend on each case (roughly)
+    :param game_rounds: rounds in the full game case
+    :param only: run only cases whose name contains this text
+    :param work_dir: folder for the synthetic csv and compiled files
+    :param quiet: don't print progress
+    :return: list of result dictionaries
+    """
+
+    csv_paths = {}
+    for size in sizes:
+        if size == "shipped":
+            if os.path.exists(CSV_FILE):
+                csv_paths["shipped"] = CSV_FILE
+            elif not quiet:
+                print(f"skipping shipped colour list ({CSV_FILE} not found)")
+            continue
+
+        rows = int(size)
+        path = os.path.join(work_dir, f"synthetic_{rows}.csv")
+        if not os.path.exists(path):
+            write_synthetic_csv(path, rows)
+        csv_paths[f"{rows} rows"] = path
+
+    results = []
+    for name, size, func in build_cases(csv_paths, game_rounds, work_dir):
+        if only and only not in name:
+            continue
+
+        ops_per_sec, p50, p99, calls = measure(func, min_time)
+        peak = peak_memory(func, calls=1)
+
+        result = {"case": name, "size": size, "ops_per_sec": ops_per_sec,
+                  "p50_us": p50 / 1000, "p99_us": p99 / 1000,
+                  "peak_kib": peak / 1024, "calls": calls}
+        results.append(result)
+
+        if not quiet:
+            print(f"{name:<26} {size:<14} {ops_per_sec:>14,.1f} ops/s  "
+                  f"p50 {result['p50_us']:>11,.2f} us  p99 {result['p99_us']:>11,.2f} us  "
+                  f"peak {result['peak_kib']:>10,.1f} KiB")
+
+    return results
+
+
+def measure_startup(runs, quiet=False):
+    """
+    Launches the game (in the current folder) several times, starting a one
+    round game straight away, and collects its startup reports. Needs a
+    display - returns no results if the game can't open a window.
+    :param runs: number of launches
+    :param quiet: don't print progress
+    :return: list of result dictionaries (ops/s is launches per second)
+    """
+
+    command = [sys.executable, GAME_FILE, "--startup-report", "json",
+               "--quit-after-startup", "--no-history"]
+
+    reports = []
+    for _ in range(runs):
+        finished = subprocess.run(command, capture_output=True, text=True, timeout=60)
+        lines = finished.stdout.strip().splitlines()
+        if finished.returncode != 0 or not lines:
+            if not quiet:
+                error = finished.stderr.strip().splitlines() or ["no report"]
+                print(f"skipping startup ({error[-1]})")
+            return []
+        reports.append(json.loads(lines[-1]))
+
+    results = []
+    for stage in STARTUP_STAGES:
+        times = sorted(report[stage] for report in reports if stage in report)
+        if not times:
+            continue
+
+        mean_ms = sum(times) / len(times)
+        result = {"case": f"startup[{stage}]", "size": "shipped",
+                  "ops_per_sec": 1000 / mean_ms if mean_ms else 0,
+                  "p50_us": percentile(times, 0.50) * 1000,
+                  "p99_us": percentile(times, 0.99) * 1000,
+                  "peak_kib": None, "calls": len(times)}
+        results.append(result)
+
+        if not quiet:
+            print(f"{result['case']:<26} {'shipped':<14} {result['ops_per_sec']:>14,.1f} ops/s  "
+                  f"p50 {result['p50_us']:>11,.2f} us  p99 {result['p99_us']:>11,.2f} us")
+
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares results with a saved baseline
+    :param results: results from run()
+    :param baseline: results loaded from a baseline file
+    :param tolerance: fraction slower than baseline that is allowed
+    :return: list of regressions (case, size, baseline ops/s, ops/s, change)
+    """
+
+    previous = {(item["case"], item["size"]): item for item in baseline}
+
+    regressions = []
+    for item in results:
+        old = previous.get((item["case"], item["size"]))
+        if old is None or not old["ops_per_sec"]:
+            continue
+
+        change = item["ops_per_sec"] / old["ops_per_sec"] - 1
+        if change < -tolerance:
+            regressions.append((item["case"], item["size"], old["ops_per_sec"],
+                                item["ops_per_sec"], change))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest benchmarks")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="'shipped' and / or numbers of rows for synthetic colour lists")
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="seconds to spend on each case")
+    parser.add_argument("--game-rounds", type=int, default=100,
+                        help="rounds in the full game case")
+    parser.add_argument("--only", help="only run cases whose name contains this")
+    parser.add_argument("--json", metavar="FILE", help="write results to a JSON file")
+    parser.add_argument("--save-baseline", metavar="FILE",
+                        help="save results as a baseline to compare against later")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare results with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slow down before a case is a regression (0.1 = 10%%)")
+    parser.add_argument("--startup-runs", type=int, default=5,
+                        help="times to launch the game to time startup (0 to skip, "
+                             "needs a display)")
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        if size != "shipped" and not (size.isdigit() and int(size) > 0):
+            parser.error(f"sizes must be 'shipped' or a number of rows, not {size!r}")
+
+    with tempfile.TemporaryDirectory(prefix="colour_quest_bench_") as work_dir:
+        results = run(args.sizes, args.min_time, args.game_rounds, args.only, work_dir)
+
+    if (args.startup_runs > 0 and "shipped" in args.sizes and os.path.exists(CSV_FILE)
+            and (not args.only
+                 or any(args.only in f"startup[{stage}]" for stage in STARTUP_STAGES))):
+        results += measure_startup(args.startup_runs)
+
+    report = {
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+
+        regressions = compare(results, baseline, args.tolerance)
+        for case, size, old, new, change in regressions:
+            print(f"REGRESSION {case} [{size}]: {old:,.1f} -> {new:,.1f} ops/s ({change:+.0%})")
+        if regressions:
+            return 1
+        print("no regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Opt-in timing of every Tk callback (button commands, window close
+handlers, key bindings and after / after_idle callbacks).
+
+Tk calls Python through tkinter.CallWrapper, so install() swaps in a
+subclass that times each call with perf_counter_ns and adds it to a
+histogram for that callback. A sample of calls can also be run under
+cProfile - the profiles of the slowest sampled calls are kept so there is
+something to look at when a callback is slow.
+
+Example (see B_01_Colour_Quest_v2.py --profile-callbacks):
+    profiler = CallbackProfiler(slow_ms=50, sample_rate=0.1)
+    profiler.install()          # before any widgets are made
+    ...
+    print(profiler.format_summary())
+"""
+
+import cProfile
+from functools import partial
+import io
+import json
+import pstats
+import random
+import time
+import tkinter
+
+from latency_histogram import NS_PER_MS, LatencyHistogram
+
+# calls slower than this count as slow
+DEFAULT_SLOW_MS = 50
+
+# slowest sampled profiles kept for each callback
+DEFAULT_MAX_CAPTURES = 3
+
+# functions shown from each captured profile
+PROFILE_LINES = 15
+
+
+def callback_name(func):
+    """
+    :return: readable name for a Tk callback, e.g. 'Play.new_round' or
+    'after: flush' (partials and after's wrapper are looked through)
+    """
+
+    prefix = ""
+    if getattr(func, "__qualname__", "").endswith(".after.<locals>.callit"):
+        # after() wraps the function in a closure - find the real one
+        prefix = "after: "
+        cells = dict(zip(func.__code__.co_freevars, func.__closure__ or ()))
+        if "func" in cells:
+            func = cells["func"].cell_contents
+
+    while isinstance(func, partial):
+        func = func.func
+
+    name = getattr(func, "__qualname__", None) or type(func).__qualname__
+    return prefix + name
+
+
+class CallbackStats:
+    """
+    Timings for one callback
+    """
+
+    __slots__ = ("histogram", "slow_calls", "captures")
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.slow_calls = 0
+
+        # (ns, profile text) for the slowest sampled calls, slowest first
+        self.captures = []
+
+
+class CallbackProfiler:
+    """
+    Times every Tk callback once installed. Everything happens on Tk's
+    thread, apart from reading `running` (see stall_monitor.py).
+    """
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_MS, sample_rate=0.0,
+                 max_captures=DEFAULT_MAX_CAPTURES, rng=None):
+        """
+        :param slow_ms: calls slower than this are counted (and kept if profiled)
+        :param sample_rate: fraction of calls run under cProfile (0 for none -
+        profiled calls run slower, so keep this small)
+        :param max_captures: slowest profiles kept for each callback
+        """
+
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f"sample rate must be 0 to 1, not {sample_rate}")
+
+        self.slow_ns = int(slow_ms * NS_PER_MS)
+        self.sample_rate = sample_rate
+        self.max_captures = max_captures
+        self.rng = random.Random() if rng is None else rng
+
+        # callback name -> CallbackStats
+        self.callbacks = {}
+
+        # (name, start ns) of callbacks running now, innermost last
+        # (a callback that calls update() can run others inside it)
+        self.running = []
+
+        self.profiling = False
+        self.original_wrapper = None
+
+    def install(self):
+        """
+        Starts timing callbacks (only ones registered with Tk after this)
+        """
+
+        if self.original_wrapper is not None:
+            return
+
+        profiler = self
+        original = tkinter.CallWrapper
+
+        class TimedCallWrapper(original):
+            def __init__(self, func, subst, widget):
+                super().__init__(func, subst, widget)
+                self.name = callback_name(func)
+
+            def __call__(self, *args):
+                return profiler.call(self.name, super().__call__, args)
+
+        self.original_wrapper = original
+        tkinter.CallWrapper = TimedCallWrapper
+
+    def uninstall(self):
+        if self.original_wrapper is not None:
+            tkinter.CallWrapper = self.original_wrapper
+            self.original_wrapper = None
+
+    @property
+    def current(self):
+        """
+        :return: (name, start ns) of the innermost callback running, or None
+        """
+        running = self.running
+        return running[-1] if running else None
+
+    def call(self, name, func, args):
+        """
+        Runs a callback, timing it (and profiling it if it's sampled)
+        """
+
+        profile = None
+        if (self.sample_rate and not self.profiling
+                and self.rng.random() < self.sample_rate):
+            profile = cProfile.Profile()
+
+        clock = time.perf_counter_ns
+        self.running.append((name, clock()))
+        try:
+            if profile is None:
+                return func(*args)
+
+            self.profiling = True
+            profile.enable()
+            try:
+                return func(*args)
+            finally:
+                profile.disable()
+                self.profiling = False
+        finally:
+            start = self.running.pop()[1]
+            self.record(name, clock() - start, profile)
+
+    def record(self, name, elapsed, profile=None):
+        stats = self.callbacks.get(name)
+        if stats is None:
+            stats = self.callbacks[name] = CallbackStats()
+
+        stats.histogram.record(elapsed)
+        if elapsed < self.slow_ns:
+            return
+
+        stats.slow_calls += 1
+        captures = stats.captures
+        if profile is None or (len(captures) >= self.max_captures
+                               and elapsed <= captures[-1][0]):
+            return
+
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        captures.append((elapsed, text.getvalue()))
+        captures.sort(key=lambda capture: -capture[0])
+        del captures[self.max_captures:]
+
+    def summary(self):
+        """
+        :return: list of dictionaries (one per callback), most total time first
+        """
+
+        rows = []
+        for name, stats in self.callbacks.items():
+            histogram = stats.histogram
+            row = {"callback": name, **histogram.summary(),
+                   "total": histogram.total / NS_PER_MS, "slow_calls": stats.slow_calls,
+                   "captures": [{"ms": elapsed / NS_PER_MS, "profile": text}
+                                for elapsed, text in stats.captures]}
+            rows.append(row)
+
+        rows.sort(key=lambda row: -row["total"])
+        return rows
+
+    def format_summary(self, style="text"):
+        """
+        :param style: 'text' for people to read, 'json' for scripts
+        :return: the summary as a string
+        """
+
+        rows = self.summary()
+        if style == "json":
+            return json.dumps({"slow_ms": self.slow_ns / NS_PER_MS,
+                               "sample_rate": self.sample_rate, "callbacks": rows},
+                              indent=2)
+
+        lines = [f"Tk callbacks (ms, slow = over {self.slow_ns / NS_PER_MS:g} ms)",
+                 f"  {'callback':<40} {'calls':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+                 f"{'max':>8} {'total':>9} {'slow':>5}"]
+        for row in rows:
+            lines.append(f"  {row['callback'][:40]:<40} {row['count']:>7,} "
+                         f"{row['p50']:>8.2f} {row['p95']:>8.2f} {row['p99']:>8.2f} "
+                         f"{row['max']:>8.2f} {row['total']:>9.1f} {row['slow_calls']:>5}")
+
+        for row in rows:
+            for capture in row["captures"]:
+                lines.append("")
+                lines.append(f"Sampled slow call of {row['callback']} "
+                             f"({capture['ms']:.1f} ms):")
+                lines.append(capture["profile"].rstrip())
+
+        return "\n".join(lines)
+
+    def dump(self, path="-"):
+        """
+        :param path: file to write ('.json' files get JSON), '-' prints the text summary
+        """
+
+        if path == "-":
+            print(self.format_summary(), flush=True)
+            return
+
+        style = "json" if path.endswith(".json") else "text"
+        with open(path, "w", encoding="utf-8") as summary_file:
+            summary_file.write(self.format_summary(style) + "\n")
@@ -0,0 +1,683 @@
+"""
+Loads the colour list. A csv file can be compiled into a binary file that
+is mapped straight into memory (much faster for big colour lists):
+
+    python colour_catalogue.py
+    python colour_catalogue.py my_colours.csv -o my_colours.cqc
+    python colour_catalogue.py my_colours.csv -o my_colours.cqc --verify
+"""
+
+import argparse
+from array import array
+from bisect import bisect_right, insort
+import csv
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+
+# default colour list (relative to the folder the game is run from)
+CSV_FILE = "00_colour_list_hex_v3.csv"
+
+# number of colours offered in each round
+ROUND_SIZE = 4
+
+# compiled (binary) copy of a colour list - see compile_catalogue()
+COMPILED_SUFFIX = ".cqc"
+COMPILED_MAGIC = b"CQCATLOG"
+COMPILED_VERSION = 1
+
+# magic | version | byte order check | colours | different scores |
+# foreground colours | score size | foreground id size | csv modified (ns) |
+# csv size | name bytes | crc32 of everything after the header
+COMPILED_HEADER = struct.Struct("=8sIIIIIBB2xqqQI4x")
+
+# written in the machine's own byte order, so a file compiled on a machine
+# with the other byte order is spotted (and the csv used instead)
+BYTE_ORDER_CHECK = 0x01020304
+
+# packed rgb value for names that are not #RRGGBB hex codes
+NO_RGB = 0xFFFFFFFF
+
+
+def read_colour_csv(path=CSV_FILE):
+    """
+    Reads the colour csv file (without any caching)
+    :param path: csv file to be read
+    :return: list of colours where each list item has the
+    colour name, associated score and foreground colour for the text
+    """
+
+    with open(path, "r", newline="") as file:
+        all_colours = list(csv.reader(file, delimiter=","))
+
+    # remove the first row (headings)
+    all_colours.pop(0)
+
+    return all_colours
+
+
+class ColourRow:
+    """
+    One colour from the catalogue. Can still be used like the old
+    [name, score, fg] lists (ie: row[1] is the score)
+    """
+
+    __slots__ = ("name", "score", "fg")
+
+    def __init__(self, name, score, fg):
+        self.name = name
+        self.score = score
+        self.fg = fg
+
+    def __getitem__(self, index):
+        return (self.name, self.score, self.fg)[index]
+
+    def __len__(self):
+        return 3
+
+    def __iter__(self):
+        return iter((self.name, self.score, self.fg))
+
+    def __eq__(self, other):
+        if isinstance(other, ColourRow):
+            return (self.name, self.score, self.fg) == (other.name, other.score, other.fg)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.name, self.score, self.fg))
+
+    def __repr__(self):
+        return f"ColourRow({self.name!r}, {self.score!r}, {self.fg!r})"
+
+
+def colour_rgb(name):
+    """
+    :param name: colour name (eg: #FF8000)
+    :return: colour as a 0xRRGGBB number (NO_RGB if it isn't a hex code)
+    """
+    if len(name) == 7 and name[0] == "#":
+        try:
+            return int(name[1:], 16)
+        except ValueError:
+            pass
+    return NO_RGB
+
+
+class ColourCatalogue:
+    """
+    All of the colours, parsed once. Names are kept in a tuple, scores in a
+    compact integer array and foreground colours as ids into a small palette
+    (there are only ever a handful of different text colours).
+
+    A score index is built at the same time: colour ids sorted by score
+    (order) and the position where each different score starts in that
+    order (bucket_starts), so rounds can be drawn without rejection.
+
+    A catalogue loaded from a compiled file already has its index, and its
+    columns are memoryviews of the mapped file rather than arrays.
+    """
+
+    __slots__ = ("names", "scores", "fg_ids", "fg_palette", "rgb",
+                 "order", "bucket_starts", "bucket_scores", "source",
+                 "known_fingerprint")
+
+    def __init__(self, names, scores, fg_ids, fg_palette, rgb=None,
+                 score_index=None, source=None, fingerprint=None):
+        if not len(names) == len(scores) == len(fg_ids):
+            raise ValueError("names, scores and foreground ids must be the same length")
+
+        self.names = names
+        self.scores = scores
+        self.fg_ids = fg_ids
+        self.fg_palette = fg_palette
+
+        # packed 0xRRGGBB for each colour (NO_RGB if the name isn't a hex code)
+        if rgb is None:
+            rgb = array("I", map(colour_rgb, names))
+        self.rgb = rgb
+
+        # mapped file the columns point into (kept open while in use)
+        self.source = source
+
+        # worked out when first needed (see fingerprint)
+        self.known_fingerprint = fingerprint
+
+        if score_index is None:
+            self.build_score_index()
+        else:
+            order, bucket_starts = score_index
+            self.order = order
+            self.bucket_starts = bucket_starts
+            self.bucket_scores = array("I", [scores[order[start]]
+                                             for start in bucket_starts[:-1]])
+
+    def build_score_index(self):
+        """
+        Groups colour ids by score (done once, when the catalogue is made)
+        """
+
+        scores = self.scores
+        order = sorted(range(len(scores)), key=scores.__getitem__)
+
+        bucket_starts = []
+        bucket_scores = []
+        previous = None
+        for position, colour_id in enumerate(order):
+            score = scores[colour_id]
+            if score != previous:
+                bucket_starts.append(position)
+                bucket_scores.append(score)
+                previous = score
+
+        # extra 'start' at the end makes working out bucket sizes easy
+        bucket_starts.append(len(order))
+
+        self.order = array("I", order)
+        self.bucket_starts = array("I", bucket_starts)
+        self.bucket_scores = array(scores.typecode, bucket_scores)
+
+    def fingerprint(self):
+        """
+        :return: crc32 of every colour's name, score and text colour, so a
+        recorded game can check it is replayed with the same colours
+        """
+
+        if self.known_fingerprint is None:
+            fingerprint = zlib.crc32("\n".join(self.names).encode("utf-8"))
+            fingerprint = zlib.crc32(bytes(self.scores), fingerprint)
+            fingerprint = zlib.crc32(bytes(self.fg_ids), fingerprint)
+            fingerprint = zlib.crc32("\n".join(self.fg_palette).encode("utf-8"), fingerprint)
+            self.known_fingerprint = fingerprint
+
+        return self.known_fingerprint
+
+    @property
+    def distinct_scores(self):
+        """
+        :return: number of different scores in the catalogue
+        """
+        return len(self.bucket_scores)
+
+    def draw_round_ids(self, rng=random):
+        """
+        Chooses colours for a round, all with different scores. This gives
+        exactly the same odds as picking colours at random and throwing
+        away repeated scores, but always finishes in four steps.
+        :param rng: random number generator (random module or random.Random)
+        :return: list of four colour ids
+        """
+
+        if len(self.bucket_scores) < ROUND_SIZE:
+            raise ValueError(f"the colour list needs at least {ROUND_SIZE} "
+                             f"different scores to make a round (it has "
+                             f"{len(self.bucket_scores)})")
+
+        order = self.order
+        bucket_starts = self.bucket_starts
+        rand = rng.random
+
+        # ranges of 'order' that have been used up (sorted by start)
+        taken = []
+        remaining = len(order)
+        round_ids = []
+
+        for _ in range(ROUND_SIZE):
+            # pick one of the colours that are still allowed, then skip
+            # over the used up ranges to find where it sits in 'order'
+            position = int(rand() * remaining)
+            for start, end in taken:
+                if position >= start:
+                    position += end - start
+                else:
+                    break
+
+            round_ids.append(order[position])
+
+            # rule out every other colour with the same score
+            bucket = bisect_right(bucket_starts, position)
+            start = bucket_starts[bucket - 1]
+            end = bucket_starts[bucket]
+            insort(taken, (start, end))
+            remaining -= end - start
+
+        return round_ids
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds a catalogue from [name, score, fg] rows (as read from the csv)
+        :param rows: iterable of colour rows
+        :return: ColourCatalogue
+        """
+
+        names = []
+        scores = []
+        fg_ids = []
+        fg_palette = []
+        palette_lookup = {}
+
+        for line, row in enumerate(rows, start=1):
+            # skip blank lines
+            if not row:
+                continue
+
+            if len(row) < 3:
+                raise ValueError(f"colour row {line} should have a name, score "
+                                 f"and foreground colour: {row!r}")
+
+            name, score, fg = row[0], row[1], row[2]
+
+            try:
+                score = int(score)
+            except ValueError:
+                raise ValueError(f"colour row {line} has a score that is not "
+                                 f"a whole number: {score!r}") from None
+            if score < 0:
+                raise ValueError(f"colour row {line} has a negative score: {score}")
+
+            # each foreground colour is only stored once
+            fg_id = palette_lookup.get(fg)
+            if fg_id is None:
+                fg_id = len(fg_palette)
+                palette_lookup[fg] = fg_id
+                fg_palette.append(fg)
+
+            names.append(name)
+            scores.append(score)
+            fg_ids.append(fg_id)
+
+        # use the smallest array type that will hold the values
+        score_type = "H" if not scores or max(scores) <= 0xFFFF else "I"
+        fg_type = "B" if len(fg_palette) <= 0xFF else "H"
+
+        return cls(tuple(names), array(score_type, scores),
+                   array(fg_type, fg_ids), tuple(fg_palette))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, colour_id):
+        return ColourRow(self.names[colour_id], self.scores[colour_id],
+                         self.fg_palette[self.fg_ids[colour_id]])
+
+    def __iter__(self):
+        for colour_id in range(len(self.names)):
+            yield self[colour_id]
+
+    def fg(self, colour_id):
+        """
+        :param colour_id: position of colour in catalogue
+        :return: foreground (text) colour for that colour
+        """
+        return self.fg_palette[self.fg_ids[colour_id]]
+
+
+class NameTable:
+    """
+    Colour names read straight out of a compiled catalogue. Each name is
+    only decoded when it is asked for.
+    """
+
+    __slots__ = ("ends", "text")
+
+    def __init__(self, ends, text):
+        """
+        :param ends: where each name ends in text
+        :param text: utf-8 bytes of every name, one after the other
+        """
+        self.ends = ends
+        self.text = text
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self.ends)
+        if not 0 <= index < len(self.ends):
+            raise IndexError("colour name index out of range")
+
+        start = self.ends[index - 1] if index else 0
+        return str(self.text[start:self.ends[index]], "utf-8")
+
+    def __iter__(self):
+        for index in range(len(self.ends)):
+            yield self[index]
+
+
+def compiled_path_for(csv_path):
+    """
+    :param csv_path: colour csv file
+    :return: where the compiled copy of that file lives
+    """
+    return os.path.splitext(csv_path)[0] + COMPILED_SUFFIX
+
+
+def compiled_layout(count, distinct, palette, score_size, fg_size, text_size):
+    """
+    Works out where each column of a compiled catalogue goes (every column
+    starts on an 8 byte boundary so it can be used in place)
+    :return: list of (offset, size in bytes) - scores, rgb, foreground ids,
+    order, bucket starts, name ends, palette ends, text
+    """
+
+    sizes = (count * score_size, count * 4, count * fg_size, count * 4,
+             (distinct + 1) * 4, count * 4, palette * 4, text_size)
+
+    sections = []
+    offset = COMPILED_HEADER.size
+    for size in sizes:
+        offset = (offset + 7) & ~7
+        sections.append((offset, size))
+        offset += size
+    return sections
+
+
+def compile_catalogue(csv_path=CSV_FILE, compiled_path=None):
+    """
+    Turns a colour csv file into a binary file that can be mapped straight
+    into memory (see open_compiled)
+    :param csv_path: colour csv file
+    :param compiled_path: file to write (defaults to the csv name with .cqc)
+    :return: path of the compiled file
+    """
+
+    if compiled_path is None:
+        compiled_path = compiled_path_for(csv_path)
+
+    # taken before reading, so a csv changed while we read it counts as stale
+    file_info = os.stat(csv_path)
+    catalogue = ColourCatalogue.from_rows(read_colour_csv(csv_path))
+
+    # names (then palette colours) are stored end to end, with an array
+    # saying where each one finishes - palette ends count from the first
+    # palette colour
+    text = bytearray()
+    name_ends = array("I")
+    palette_ends = array("I")
+    for strings, ends in ((catalogue.names, name_ends),
+                          (catalogue.fg_palette, palette_ends)):
+        first = len(text)
+        for string in strings:
+            text += string.encode("utf-8")
+            if len(text) > 0xFFFFFFFF:
+                raise ValueError("colour names are too long to compile (over 4 GiB)")
+            ends.append(len(text) - first)
+
+    columns = (catalogue.scores, catalogue.rgb, catalogue.fg_ids, catalogue.order,
+               catalogue.bucket_starts, name_ends, palette_ends, text)
+    sections = compiled_layout(len(catalogue), catalogue.distinct_scores,
+                               len(catalogue.fg_palette), catalogue.scores.itemsize,
+                               catalogue.fg_ids.itemsize, len(text))
+
+    data = bytearray(sections[-1][0] + sections[-1][1])
+    for (offset, size), column in zip(sections, columns):
+        data[offset:offset + size] = column
+
+    checksum = zlib.crc32(memoryview(data)[COMPILED_HEADER.size:])
+    COMPILED_HEADER.pack_into(data, 0, COMPILED_MAGIC, COMPILED_VERSION, BYTE_ORDER_CHECK,
+                              len(catalogue), catalogue.distinct_scores,
+                              len(catalogue.fg_palette), catalogue.scores.itemsize,
+                              catalogue.fg_ids.itemsize, file_info.st_mtime_ns,
+                              file_info.st_size, len(text), checksum)
+
+    # write to a temporary file first so a game starting up never sees half a file
+    temporary_path = compiled_path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+    os.replace(temporary_path, compiled_path)
+
+    return compiled_path
+
+
+def open_compiled(compiled_path, csv_path=None, verify=False):
+    """
+    Maps a compiled catalogue into memory. The columns are used where they
+    are (nothing is parsed or copied), so every process that opens the same
+    file shares the same pages.
+    :param compiled_path: file made by compile_catalogue
+    :param csv_path: csv it was made from - if given, the file must be up to date
+    :param verify: check the checksum too (reads the whole file, so it is
+    left to compiling and --verify rather than every start - the header,
+    size and csv checks catch a stale or cut short file)
+    :return: ColourCatalogue
+    """
+
+    with open(compiled_path, "rb") as file:
+        file_size = os.fstat(file.fileno()).st_size
+        if file_size < COMPILED_HEADER.size:
+            raise ValueError(f"{compiled_path} is too short to be a compiled catalogue")
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (magic, version, byte_order, count, distinct, palette, score_size, fg_size,
+     source_mtime, source_size, text_size, checksum) = COMPILED_HEADER.unpack_from(mapped)
+
+    if magic != COMPILED_MAGIC:
+        raise ValueError(f"{compiled_path} is not a compiled catalogue")
+    if version != COMPILED_VERSION:
+        raise ValueError(f"{compiled_path} is version {version} "
+                         f"(expected {COMPILED_VERSION}) - compile it again")
+    if byte_order != BYTE_ORDER_CHECK:
+        raise ValueError(f"{compiled_path} was compiled on a machine with a "
+                         f"different byte order")
+
+    if csv_path is not None:
+        file_info = os.stat(csv_path)
+        if (file_info.st_mtime_ns, file_info.st_size) != (source_mtime, source_size):
+            raise ValueError(f"{compiled_path} is out of date (the csv has changed)")
+
+    score_type = {2: "H", 4: "I"}.get(score_size)
+    fg_type = {1: "B", 2: "H"}.get(fg_size)
+    if score_type is None or fg_type is None:
+        raise ValueError(f"{compiled_path} has an unknown column size")
+
+    sections = compiled_layout(count, distinct, palette, score_size, fg_size, text_size)
+    if sections[-1][0] + sections[-1][1] != file_size:
+        raise ValueError(f"{compiled_path} is the wrong size (it may be cut short)")
+
+    view = memoryview(mapped)
+    if verify and zlib.crc32(view[COMPILED_HEADER.size:]) != checksum:
+        raise ValueError(f"{compiled_path} is damaged (checksum does not match)")
+
+    (scores, rgb, fg_ids, order, bucket_starts,
+     name_ends, palette_ends, text) = [view[offset:offset + size]
+                                       for offset, size in sections]
+
+    names = NameTable(name_ends.cast("I"), text)
+    names_size = names.ends[-1] if count else 0
+    palette_names = NameTable(palette_ends.cast("I"), text[names_size:])
+
+    return ColourCatalogue(names, scores.cast(score_type),
+                           fg_ids.cast(fg_type), tuple(palette_names), rgb=rgb.cast("I"),
+                           score_index=(order.cast("I"), bucket_starts.cast("I")),
+                           source=mapped)
+
+
+def load_catalogue(path=CSV_FILE):
+    """
+    Loads a colour csv file into a ColourCatalogue (no caching). If there is
+    an up to date compiled copy of the file it is mapped instead of reading
+    the csv.
+    :param path: csv file to be read
+    :return: ColourCatalogue
+    """
+
+    try:
+        return open_compiled(compiled_path_for(path), path)
+    except (OSError, ValueError):
+        # no compiled copy (or it is stale / damaged) - read the csv
+        return ColourCatalogue.from_rows(read_colour_csv(path))
+
+
+class CatalogueCache:
+    """
+    Keeps parsed colour catalogues for the lifetime of the process. A file is
+    only read again when its modification time or size changes.
+    """
+
+    def __init__(self, loader=load_catalogue):
+        self.loader = loader
+        self.lock = threading.Lock()
+
+        # path -> ((mtime in ns, size in bytes), catalogue)
+        self.entries = {}
+
+        # counters so that we can check the cache is doing its job
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path=CSV_FILE):
+        """
+        Returns the colours for a file, reading it only if it is new or has changed
+        :param path: csv file to be read
+        :return: ColourCatalogue for the file (shared between callers)
+        """
+
+        file_info = os.stat(path)
+        signature = (file_info.st_mtime_ns, file_info.st_size)
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            catalogue = self.loader(path)
+            self.loads += 1
+            self.entries[path] = (signature, catalogue)
+
+        return catalogue
+
+    def clear(self):
+        """
+        Forgets everything that has been loaded (counters are kept)
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        :return: dictionary with the load / hit / miss counters
+        """
+        with self.lock:
+            return {"loads": self.loads, "hits": self.hits,
+                    "misses": self.misses, "files": len(self.entries)}
+
+
+# one cache shared by everything in this process
+catalogue_cache = CatalogueCache()
+
+
+def get_colours(path=CSV_FILE):
+    """
+    Retrieves colours from csv file (loaded once per process and
+    re-read only when the file changes)
+    :param path: csv file holding the colours
+    :return: ColourCatalogue - each item has the colour name,
+    associated score and foreground colour for the text
+    """
+    return catalogue_cache.get(path)
+
+
+def cache_stats():
+    """
+    :return: load / hit / miss counters for the shared catalogue cache
+    """
+    return catalogue_cache.stats()
+
+
+class BackgroundLoader:
+    """
+    Loads a catalogue on a background thread so the window can carry on
+    while the csv is read. result() only waits if it hasn't finished yet.
+    """
+
+    def __init__(self, load=get_colours, args=()):
+        """
+        :param load: function that returns a catalogue
+        :param args: tuple of arguments for load (eg: (csv path,))
+        """
+        self.catalogue = None
+        self.error = None
+
+        # how long the load took (seconds), once it has finished
+        self.seconds = None
+
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self.load, args=(load, args),
+                                       name="catalogue-loader", daemon=True)
+        self.thread.start()
+
+    def load(self, load, args):
+        start = time.perf_counter()
+        try:
+            self.catalogue = load(*args)
+        except Exception as error:
+            # kept so it can be raised on the thread that wants the colours
+            self.error = error
+        finally:
+            self.seconds = time.perf_counter() - start
+            self.finished.set()
+
+    def ready(self):
+        """
+        :return: True if the catalogue has loaded (or failed to)
+        """
+        return self.finished.is_set()
+
+    def result(self, timeout=None):
+        """
+        :param timeout: seconds to wait (None waits for as long as it takes)
+        :return: the catalogue (raises the load's exception if it failed)
+        """
+
+        if not self.finished.wait(timeout):
+            raise TimeoutError("the colour list is still loading")
+        if self.error is not None:
+            raise self.error
+        return self.catalogue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compile the colour list into a binary file the game can map "
+                    "straight into memory")
+    parser.add_argument("csv", nargs="?", default=CSV_FILE,
+                        help="colour csv file (default: %(default)s)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="compiled file (default: the csv name ending in "
+                             f"{COMPILED_SUFFIX})")
+    parser.add_argument("--verify", action="store_true",
+                        help="check the checksum of an existing compiled file "
+                             "instead of compiling")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        compiled_path = args.output or compiled_path_for(args.csv)
+        try:
+            catalogue = open_compiled(compiled_path, args.csv, verify=True)
+        except (OSError, ValueError) as error:
+            print(error)
+            return 1
+        print(f"{compiled_path} is OK ({len(catalogue)} colours)")
+        return 0
+
+    compiled_path = compile_catalogue(args.csv, args.output)
+    catalogue = open_compiled(compiled_path, args.csv, verify=True)
+    print(f"compiled {len(catalogue)} colours ({catalogue.distinct_scores} different "
+          f"scores) into {compiled_path} ({os.path.getsize(compiled_path)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
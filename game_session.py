@@ -0,0 +1,423 @@
+import random
+
+from colour_catalogue import ROUND_SIZE, get_colours
+from round_history import RoundHistory
+from round_trace import DEBUG, INFO, ChoiceMade, GameOver, RoundGenerated
+
+# kinds of change a GameSession tells its listeners about
+ROUND_STARTED = "round_started"
+CHOICE_MADE = "choice_made"
+
+
+def round_ans(val):
+    """
+    Rounds numbers to nearest integer
+    :param val: number to be rounded.
+    :return: Rounded number (an integer)
+    """
+
+    var_rounded = (val * 2 + 1) // 2
+    raw_rounded = "{:.0f}".format(var_rounded)
+    return int(raw_rounded)
+
+
+def round_targets(scores):
+    """
+    Works out the score to beat (median) and the best possible score for a round
+    :param scores: the four scores in the round
+    :return: median (rounded half up), highest score
+    """
+
+    int_scores = sorted(scores)
+
+    # same as round_ans((a + b) / 2) for whole numbers, without going via a float
+    median = (int_scores[1] + int_scores[2] + 1) // 2
+    return median, int_scores[-1]
+
+
+def new_seed():
+    """
+    :return: a random 64 bit seed for a game
+    """
+    return random.SystemRandom().getrandbits(64)
+
+
+def get_round_colours(catalogue=None, rng=random):
+    """
+    Choose four colours form larger list ensuring that the scores are all different.
+    Raises ValueError if the colour list doesn't have four different scores.
+    :param catalogue: colours to choose from (defaults to the csv file)
+    :param rng: random number generator (random module or random.Random)
+    :return: list of colours and score to beat (median of course)
+    """
+
+    if catalogue is None:
+        catalogue = get_colours()
+
+    # four colours with different scores (the catalogue's score
+    # index means we never have to throw a choice away and try again)
+    round_ids = catalogue.draw_round_ids(rng)
+
+    round_colours = [catalogue[colour_id] for colour_id in round_ids]
+    median, highest = round_targets([colour.score for colour in round_colours])
+
+    return round_colours, median, highest
+
+
+class RunningStats:
+    """
+    Totals for the stats window, updated once per round so that opening
+    the stats takes the same time however long the game has been
+    """
+
+    __slots__ = ("rounds_played", "rounds_won", "total_score",
+                 "max_possible", "best_score")
+
+    def __init__(self):
+        self.rounds_played = 0
+        self.rounds_won = 0
+        self.total_score = 0
+        self.max_possible = 0
+        self.best_score = 0
+
+    def add(self, points, highest, won):
+        """
+        Adds a finished round to the totals
+        :param points: points earned (0 if the round was lost)
+        :param highest: best possible score for the round
+        :param won: True if the round was won
+        """
+
+        self.rounds_played += 1
+        if won:
+            self.rounds_won += 1
+        self.total_score += points
+        self.max_possible += highest
+        if points > self.best_score:
+            self.best_score = points
+
+    @property
+    def success_rate(self):
+        if self.rounds_played == 0:
+            return 0
+        return self.rounds_won / self.rounds_played * 100
+
+    @property
+    def average_score(self):
+        if self.rounds_played == 0:
+            return 0
+        return self.total_score / self.rounds_played
+
+    def summary(self):
+        """
+        :return: dictionary of the numbers shown in the stats window
+        """
+        return {"rounds_won": self.rounds_won, "rounds_played": self.rounds_played,
+                "success_rate": self.success_rate, "total_score": self.total_score,
+                "max_possible": self.max_possible, "best_score": self.best_score,
+                "average_score": self.average_score}
+
+
+class RoundInfo:
+    """
+    Everything needed to show a new round
+    """
+
+    __slots__ = ("round_number", "rounds_wanted", "catalogue", "colour_ids",
+                 "target", "highest")
+
+    def __init__(self, round_number, rounds_wanted, catalogue, colour_ids,
+                 target, highest):
+        self.round_number = round_number
+        self.rounds_wanted = rounds_wanted
+        self.catalogue = catalogue
+        self.colour_ids = colour_ids
+        self.target = target
+        self.highest = highest
+
+    @property
+    def colours(self):
+        """
+        :return: the four colours (name, score, fg) for the round
+        """
+        return [self.catalogue[colour_id] for colour_id in self.colour_ids]
+
+
+class ChoiceResult:
+    """
+    Outcome of choosing a colour
+    """
+
+    __slots__ = ("choice", "colour_name", "score", "won", "rounds_played",
+                 "rounds_won", "game_over")
+
+    def __init__(self, choice, colour_name, score, won, rounds_played,
+                 rounds_won, game_over):
+        self.choice = choice
+        self.colour_name = colour_name
+        self.score = score
+        self.won = won
+        self.rounds_played = rounds_played
+        self.rounds_won = rounds_won
+        self.game_over = game_over
+
+
+class GameSession:
+    """
+    The Colour Quest game rules with no user interface (so it can be
+    used by the Tkinter game, simulations and benchmarks alike)
+    """
+
+    __slots__ = ("catalogue", "rng", "seed", "rounds_wanted", "rounds_played",
+                 "rounds_won", "target_score", "highest_score",
+                 "round_ids", "round_scores", "history", "stats",
+                 "awaiting_choice", "tracer", "listeners", "prefetched")
+
+    def __init__(self, rounds_wanted, catalogue=None, rng=None, tracer=None,
+                 history=None, seed=None):
+        """
+        :param rounds_wanted: number of rounds in the game (1 or more)
+        :param catalogue: colours to play with (defaults to the csv file)
+        :param rng: random number generator (random module or random.Random) -
+        defaults to the session's own generator, made from seed
+        :param tracer: RoundTracer to record round events in (None for no tracing)
+        :param history: RoundHistory to keep the rounds in (defaults to a new one)
+        :param seed: seed for the session's generator (a random one is
+        picked if not given) - the same seed and choices always give the
+        same game. If rng is given as well, seed is only remembered.
+        """
+
+        if rounds_wanted < 1:
+            raise ValueError("a game needs at least one round")
+
+        if catalogue is None:
+            catalogue = get_colours()
+
+        # each game has its own generator so it can be played again exactly
+        if rng is None:
+            if seed is None:
+                seed = new_seed()
+            rng = random.Random(seed)
+
+        self.catalogue = catalogue
+        self.rng = rng
+        self.seed = seed
+
+        self.rounds_wanted = rounds_wanted
+        self.rounds_played = 0
+        self.rounds_won = 0
+        self.target_score = 0
+        self.highest_score = 0
+
+        # colours (ids into the catalogue) and scores for the current round
+        self.round_ids = []
+        self.round_scores = []
+
+        # round by round history (never reordered) and running totals for stats
+        if history is None:
+            history = RoundHistory()
+        self.history = history
+        self.stats = RunningStats()
+
+        self.awaiting_choice = False
+        self.tracer = tracer
+
+        # functions called as listener(kind, info) when the game changes
+        self.listeners = []
+
+        # (rng state before drawing, drawn round) for a round worked out
+        # ahead of time - never more than one
+        self.prefetched = None
+
+    def subscribe(self, listener):
+        """
+        Asks for a function to be called whenever the game changes. It is
+        given the kind of change (ROUND_STARTED / CHOICE_MADE) and the
+        RoundInfo / ChoiceResult.
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, kind, info):
+        for listener in self.listeners:
+            listener(kind, info)
+
+    @property
+    def game_over(self):
+        return self.rounds_played >= self.rounds_wanted
+
+    @property
+    def success_rate(self):
+        """
+        :return: percentage of rounds won so far (0 if none played)
+        """
+        if self.rounds_played == 0:
+            return 0
+        return self.rounds_won / self.rounds_played * 100
+
+    @property
+    def all_scores_list(self):
+        """
+        :return: points earned each round (read only view of the history)
+        """
+        return self.history.scores
+
+    @property
+    def all_high_score_list(self):
+        """
+        :return: highest possible score each round (read only view of the history)
+        """
+        return self.history.high_scores
+
+    @property
+    def round_colour_list(self):
+        """
+        :return: the colours (name, score, fg) for the current round
+        """
+        return [self.catalogue[colour_id] for colour_id in self.round_ids]
+
+    def draw_round(self):
+        """
+        :return: colour ids, scores, target and highest score for a new round
+        """
+
+        catalogue = self.catalogue
+        round_ids = catalogue.draw_round_ids(self.rng)
+        scores = catalogue.scores
+        round_scores = [scores[colour_id] for colour_id in round_ids]
+        median, highest = round_targets(round_scores)
+        return round_ids, round_scores, median, highest
+
+    def prefetch(self):
+        """
+        Works out the next round ahead of time (eg: while the player reads
+        the result) so new_round only has to hand it over. Rounds come out
+        exactly the same as they would without prefetching.
+        :return: True if a round is waiting, False if there are no more rounds
+        """
+
+        if self.prefetched is not None:
+            return True
+
+        # the round being played (if there is one) counts as well
+        if self.rounds_played + self.awaiting_choice >= self.rounds_wanted:
+            return False
+
+        # kept so the draw can be undone if the round is never played
+        getstate = getattr(self.rng, "getstate", None)
+        state = getstate() if getstate is not None else None
+
+        self.prefetched = (state, self.draw_round())
+        return True
+
+    def cancel_prefetch(self):
+        """
+        Throws away a round worked out ahead of time (eg: when the game is
+        closed early) and puts the random number generator back the way it
+        was, so the next draw is the same as if there had been no prefetch
+        """
+
+        if self.prefetched is None:
+            return
+
+        state = self.prefetched[0]
+        self.prefetched = None
+        if state is not None:
+            self.rng.setstate(state)
+
+    def close(self):
+        """
+        Finishes with the session (eg: when the window is closed) - throws
+        away any prefetched round and empties the history
+        """
+        self.cancel_prefetch()
+        self.history.close()
+
+    def new_round(self):
+        """
+        Chooses four colours and works out the target score for the next round
+        :return: RoundInfo
+        """
+
+        if self.game_over:
+            raise RuntimeError("the game is over - no more rounds to play")
+        if self.awaiting_choice:
+            raise RuntimeError("a colour has not been chosen for this round yet")
+
+        # use the round worked out ahead of time if there is one
+        if self.prefetched is not None:
+            round_ids, round_scores, median, highest = self.prefetched[1]
+            self.prefetched = None
+        else:
+            round_ids, round_scores, median, highest = self.draw_round()
+
+        catalogue = self.catalogue
+        self.round_ids = round_ids
+        self.round_scores = round_scores
+        self.target_score = median
+        self.highest_score = highest
+        self.awaiting_choice = True
+
+        tracer = self.tracer
+        if tracer is not None and tracer.wants(DEBUG):
+            names = catalogue.names
+            tracer.record(RoundGenerated(self.rounds_played + 1,
+                                         [names[colour_id] for colour_id in round_ids],
+                                         median, highest))
+
+        round_info = RoundInfo(self.rounds_played + 1, self.rounds_wanted,
+                               catalogue, round_ids, median, highest)
+        if self.listeners:
+            self.notify(ROUND_STARTED, round_info)
+
+        return round_info
+
+    def choose(self, choice):
+        """
+        Records the colour chosen for the current round
+        :param choice: index of the colour chosen (0 - 3)
+        :return: ChoiceResult
+        """
+
+        if not self.awaiting_choice:
+            raise RuntimeError("there is no round waiting for a choice")
+
+        # a negative index would wrap round to the end of the list
+        if (not isinstance(choice, int) or isinstance(choice, bool)
+                or not 0 <= choice < ROUND_SIZE):
+            raise ValueError(f"choice must be 0 to {ROUND_SIZE - 1}")
+
+        score = self.round_scores[choice]
+
+        self.rounds_played += 1
+        self.awaiting_choice = False
+
+        won = score >= self.target_score
+        if won:
+            self.rounds_won += 1
+            points = score
+        else:
+            points = 0
+
+        self.history.append(points, self.highest_score)
+        self.stats.add(points, self.highest_score, won)
+
+        colour_name = self.catalogue.names[self.round_ids[choice]]
+        game_over = self.rounds_played >= self.rounds_wanted
+
+        tracer = self.tracer
+        if tracer is not None and tracer.wants(INFO):
+            tracer.record(ChoiceMade(self.rounds_played, choice, colour_name, score, won))
+            if game_over:
+                stats = self.stats
+                tracer.record(GameOver(stats.rounds_played, stats.rounds_won,
+                                       stats.total_score, stats.max_possible))
+
+        result = ChoiceResult(choice, colour_name, score, won, self.rounds_played,
+                              self.rounds_won, game_over)
+        if self.listeners:
+            self.notify(CHOICE_MADE, result)
+
+        return result
@@ -0,0 +1,192 @@
+import sqlite3
+import time
+
+from game_session import CHOICE_MADE
+
+# default database (relative to the folder the game is run from)
+DATABASE_FILE = "colour_quest_history.db"
+
+# rounds written to the database in one transaction
+DEFAULT_BATCH_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended REAL,
+    rounds_wanted INTEGER NOT NULL,
+    rounds_played INTEGER NOT NULL DEFAULT 0,
+    rounds_won INTEGER NOT NULL DEFAULT 0,
+    total_score INTEGER NOT NULL DEFAULT 0,
+    max_possible INTEGER NOT NULL DEFAULT 0,
+    best_score INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    round_number INTEGER NOT NULL,
+    played REAL NOT NULL,
+    colour TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    target INTEGER NOT NULL,
+    highest INTEGER NOT NULL,
+    won INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS rounds_by_session ON rounds (session_id);
+CREATE INDEX IF NOT EXISTS rounds_by_time ON rounds (played);
+CREATE INDEX IF NOT EXISTS rounds_by_colour ON rounds (colour);
+"""
+
+# statements are kept as constants so sqlite3's statement cache reuses
+# the prepared versions instead of compiling them every time
+INSERT_SESSION = "INSERT INTO sessions (started, rounds_wanted) VALUES (?, ?)"
+
+INSERT_ROUND = """
+INSERT INTO rounds (session_id, round_number, played, colour, score,
+                    points, target, highest, won)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPDATE_SESSION_TOTALS = """
+UPDATE sessions SET rounds_played = rounds_played + ?,
+                    rounds_won = rounds_won + ?,
+                    total_score = total_score + ?,
+                    max_possible = max_possible + ?,
+                    best_score = MAX(best_score, ?)
+WHERE id = ?
+"""
+
+END_SESSION = "UPDATE sessions SET ended = ? WHERE id = ?"
+
+# lifetime totals come from the per-session totals (one row per game)
+# rather than adding up every round ever played
+LIFETIME_STATS = """
+SELECT COUNT(*), COALESCE(SUM(rounds_played), 0), COALESCE(SUM(rounds_won), 0),
+       COALESCE(SUM(total_score), 0), COALESCE(SUM(max_possible), 0),
+       COALESCE(MAX(best_score), 0)
+FROM sessions
+"""
+
+
+class GameStore:
+    """
+    Keeps every game and round in a local SQLite database. Rounds are
+    buffered and written in batches (one transaction per batch).
+    """
+
+    def __init__(self, path=DATABASE_FILE, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+
+        # transactions are started / committed by hand
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        # rounds waiting to be written
+        self.pending = []
+
+    def start_session(self, rounds_wanted):
+        """
+        :param rounds_wanted: number of rounds in the game
+        :return: id of the new session
+        """
+        cursor = self.connection.execute(INSERT_SESSION, (time.time(), rounds_wanted))
+        return cursor.lastrowid
+
+    def record_round(self, session_id, round_number, colour, score, target,
+                     highest, won):
+        """
+        Buffers a finished round (written when the batch is full)
+        """
+
+        points = score if won else 0
+        self.pending.append((session_id, round_number, time.time(), colour, score,
+                             points, target, highest, int(won)))
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes all buffered rounds (and session totals) in one transaction
+        """
+
+        if not self.pending:
+            return
+
+        pending = self.pending
+        self.pending = []
+
+        # work out how much each session's totals change by
+        # (rounds played | rounds won | points | max possible | best score)
+        totals = {}
+        for row in pending:
+            session_id, points, highest, won = row[0], row[5], row[7], row[8]
+            change = totals.setdefault(session_id, [0, 0, 0, 0, 0])
+            change[0] += 1
+            change[1] += won
+            change[2] += points
+            change[3] += highest
+            change[4] = max(change[4], points)
+
+        connection = self.connection
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(INSERT_ROUND, pending)
+            connection.executemany(UPDATE_SESSION_TOTALS,
+                                   [(*change, session_id)
+                                    for session_id, change in totals.items()])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def end_session(self, session_id):
+        """
+        Writes any buffered rounds and marks the session as finished
+        """
+        self.flush()
+        self.connection.execute(END_SESSION, (time.time(), session_id))
+
+    def attach(self, session):
+        """
+        Starts a new stored session and records each round of a GameSession
+        as it is played
+        :param session: GameSession
+        :return: id of the stored session
+        """
+
+        session_id = self.start_session(session.rounds_wanted)
+
+        def round_played(kind, result):
+            if kind == CHOICE_MADE:
+                self.record_round(session_id, result.rounds_played, result.colour_name,
+                                  result.score, session.target_score,
+                                  session.highest_score, result.won)
+
+        session.subscribe(round_played)
+        return session_id
+
+    def lifetime_stats(self):
+        """
+        :return: dictionary of totals over every game ever stored
+        """
+
+        self.flush()
+        (games, rounds_played, rounds_won, total_score,
+         max_possible, best_score) = self.connection.execute(LIFETIME_STATS).fetchone()
+
+        return {"games": games, "rounds_played": rounds_played,
+                "rounds_won": rounds_won,
+                "success_rate": rounds_won / rounds_played * 100 if rounds_played else 0,
+                "total_score": total_score, "max_possible": max_possible,
+                "best_score": best_score}
+
+    def close(self):
+        self.flush()
+        self.connection.close()
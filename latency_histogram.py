@@ -0,0 +1,160 @@
+"""
+HDR-style latency histogram - values are counted in buckets whose width
+grows with the value, so every value is kept to a fixed relative precision
+(about 1% with the default 2 significant figures) in a few KiB, however
+many values are recorded or however slow the slowest one was.
+
+Buckets: values below 2 ** bits each get their own bucket. Above that, each
+power of two is split into 2 ** (bits - 1) equal buckets.
+"""
+
+import math
+
+# values are recorded as whole nanoseconds
+NS_PER_MS = 1_000_000
+
+
+class LatencyHistogram:
+    """
+    Counts of values (whole numbers, e.g. nanoseconds) to a fixed relative precision
+    """
+
+    __slots__ = ("significant_figures", "bits", "half", "counts", "count", "total",
+                 "min", "max")
+
+    def __init__(self, significant_figures=2):
+        """
+        :param significant_figures: decimal digits of precision kept (1 to 5)
+        """
+
+        if not 1 <= significant_figures <= 5:
+            raise ValueError(f"significant figures must be 1 to 5, not {significant_figures}")
+
+        self.significant_figures = significant_figures
+
+        # enough buckets per power of two to tell 10 ** figures values apart
+        self.bits = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self.half = 1 << (self.bits - 1)
+
+        self.counts = []
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def bucket_index(self, value):
+        shift = value.bit_length() - self.bits
+        if shift <= 0:
+            return value
+        return shift * self.half + (value >> shift)
+
+    def bucket_range(self, index):
+        """
+        :return: lowest and highest value that go in a bucket
+        """
+
+        if index < 2 * self.half:
+            return index, index
+
+        shift = index // self.half - 1
+        low = (index - shift * self.half) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value, times=1):
+        """
+        :param value: whole number, 0 or more (e.g. nanoseconds)
+        """
+
+        if value < 0:
+            raise ValueError(f"can't record a negative value ({value})")
+
+        index = self.bucket_index(value)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += times
+
+        self.count += times
+        self.total += value * times
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Adds another histogram's counts to this one (same precision only)
+        """
+
+        if other.bits != self.bits:
+            raise ValueError("can't merge histograms with different precision")
+        if not other.count:
+            return
+
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+
+        self.count += other.count
+        self.total += other.total
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def value_at(self, percentile):
+        """
+        :param percentile: 0 to 100
+        :return: value that percentile of the recorded values are at or below
+        (the top of its bucket, so never an underestimate - and never more
+        than the largest value recorded)
+        """
+
+        if not self.count:
+            return 0
+
+        wanted = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= wanted:
+                return min(self.bucket_range(index)[1], self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def summary(self, scale=NS_PER_MS):
+        """
+        :param scale: what to divide values by (default reports nanoseconds as ms)
+        :return: dictionary of count, mean, p50, p95, p99, p99.9 and max
+        """
+
+        return {"count": self.count, "mean": self.mean / scale,
+                "p50": self.value_at(50) / scale, "p95": self.value_at(95) / scale,
+                "p99": self.value_at(99) / scale, "p99.9": self.value_at(99.9) / scale,
+                "max": self.max / scale}
+
+    def to_dict(self):
+        """
+        :return: JSON-ready dictionary (only buckets with something in them)
+        """
+        return {"significant_figures": self.significant_figures, "count": self.count,
+                "total": self.total, "min": self.min, "max": self.max,
+                "buckets": [[index, bucket_count]
+                            for index, bucket_count in enumerate(self.counts) if bucket_count]}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["significant_figures"])
+        for index, bucket_count in data["buckets"]:
+            low, _ = histogram.bucket_range(index)
+            histogram.record(low, bucket_count)
+
+        # the bucket's lowest value was recorded - put back the real totals
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
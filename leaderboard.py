@@ -0,0 +1,277 @@
+"""
+Leaderboard of finished games - the best K games for each length of game
+(1-4 rounds, 5-9 rounds and so on), so long games don't push short ones
+off the board.
+
+Each bracket is a min-heap of its K best games, so the worst game on the
+board is always at the top of the heap: a game that doesn't make the board
+is turned away after one comparison, and one that does replaces the worst
+game in O(log K). Working out the place a new game came is an O(K) look
+through the heap (a heap isn't sorted), but only games that make the board
+pay for it. The best-first list is sorted once when it's asked for and
+kept until the bracket next changes.
+
+Example:
+    python leaderboard.py colour_quest_leaderboard.json --rounds 10
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import os
+import threading
+import time
+
+# default file (relative to the folder the game is run from)
+LEADERBOARD_FILE = "colour_quest_leaderboard.json"
+
+SNAPSHOT_VERSION = 1
+
+# games kept for each bracket
+DEFAULT_SIZE = 10
+
+# first round count of each bracket (the last one has no upper end)
+DEFAULT_BRACKETS = (1, 5, 10, 20, 50, 100)
+
+
+class LeaderboardEntry:
+    """
+    One finished game
+    """
+
+    __slots__ = ("name", "total_score", "rounds_won", "rounds_played", "when", "order")
+
+    def __init__(self, name, total_score, rounds_won, rounds_played, when, order):
+        self.name = name
+        self.total_score = total_score
+        self.rounds_won = rounds_won
+        self.rounds_played = rounds_played
+        self.when = when
+
+        # submission number (on equal games the earlier one ranks higher)
+        self.order = order
+
+    @property
+    def success_rate(self):
+        return self.rounds_won / self.rounds_played * 100 if self.rounds_played else 0
+
+    def key(self):
+        """
+        :return: sort key - bigger is better (score, then success rate, then earliest)
+        """
+        return self.total_score, self.rounds_won / self.rounds_played, -self.order
+
+    def to_list(self):
+        return [self.name, self.total_score, self.rounds_won, self.rounds_played,
+                self.when, self.order]
+
+    def to_dict(self):
+        return {"name": self.name, "total_score": self.total_score,
+                "rounds_won": self.rounds_won, "rounds_played": self.rounds_played,
+                "success_rate": self.success_rate, "when": self.when}
+
+
+class Leaderboard:
+    """
+    Top K games for each bracket of round counts. Safe to use from several
+    threads (every call takes the board's lock, and none of them wait on
+    anything else while holding it).
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, brackets=DEFAULT_BRACKETS):
+        """
+        :param size: games kept in each bracket
+        :param brackets: first round count of each bracket, smallest first
+        """
+
+        if size < 1:
+            raise ValueError(f"leaderboard size must be at least 1, not {size}")
+        if not brackets or list(brackets) != sorted(set(brackets)) or brackets[0] < 1:
+            raise ValueError("brackets must be round counts from 1 up, smallest first")
+
+        self.size = size
+        self.brackets = tuple(brackets)
+        self.lock = threading.Lock()
+
+        # per bracket: heap of (key, entry) with the worst game at [0], and
+        # the best-first list (None until asked for after a change)
+        self.heaps = [[] for _ in self.brackets]
+        self.sorted_entries = [None] * len(self.brackets)
+
+        self.submissions = 0
+        self.changed = False
+
+    def bracket_for(self, rounds_played):
+        """
+        :return: index of the bracket a game of this length goes in
+        """
+        if rounds_played < self.brackets[0]:
+            raise ValueError(f"a game needs at least {self.brackets[0]} rounds "
+                             f"to go on the leaderboard")
+        return bisect.bisect_right(self.brackets, rounds_played) - 1
+
+    def bracket_name(self, index):
+        low = self.brackets[index]
+        if index + 1 == len(self.brackets):
+            return f"{low}+ rounds"
+        high = self.brackets[index + 1] - 1
+        return f"{low} round" if low == high else f"{low}-{high} rounds"
+
+    def submit(self, name, total_score, rounds_won, rounds_played, when=None):
+        """
+        Adds a finished game
+        :return: its place in the bracket (1 is best), or None if it didn't make the board
+        """
+
+        if when is None:
+            when = time.time()
+        index = self.bracket_for(rounds_played)
+
+        with self.lock:
+            self.submissions += 1
+            entry = LeaderboardEntry(name, total_score, rounds_won, rounds_played,
+                                     when, self.submissions)
+            return self.add(index, entry)
+
+    def add(self, index, entry):
+        """
+        Puts an entry in a bracket's heap (call with the lock held)
+        :return: place it came on the board (None if it didn't make it)
+        """
+
+        heap = self.heaps[index]
+        item = (entry.key(), entry)
+
+        if len(heap) < self.size:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
+        else:
+            return None
+
+        self.sorted_entries[index] = None
+        self.changed = True
+
+        # games on the board that beat this one - O(K), but K is small and
+        # only games that made the board get here
+        return 1 + sum(1 for key, _ in heap if key > item[0])
+
+    def top(self, rounds_played):
+        """
+        :return: best-first list of LeaderboardEntry for games of this length
+        """
+
+        index = self.bracket_for(rounds_played)
+        with self.lock:
+            entries = self.sorted_entries[index]
+            if entries is None:
+                entries = [entry for _, entry in sorted(self.heaps[index], reverse=True)]
+                self.sorted_entries[index] = entries
+            return list(entries)
+
+    def snapshot(self):
+        """
+        :return: the whole board as a JSON-ready dictionary
+        """
+
+        with self.lock:
+            return {"version": SNAPSHOT_VERSION, "size": self.size,
+                    "brackets": list(self.brackets), "submissions": self.submissions,
+                    "entries": [[entry.to_list() for _, entry in heap]
+                                for heap in self.heaps]}
+
+    def save(self, path):
+        """
+        Writes a snapshot (to a temporary file first so a crash part way
+        through never leaves half a leaderboard)
+        """
+
+        # cleared first, so a game submitted while saving is saved next time
+        with self.lock:
+            self.changed = False
+        snapshot = self.snapshot()
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as snapshot_file:
+            json.dump(snapshot, snapshot_file, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def save_if_changed(self, path):
+        """
+        :return: True if there was anything new to save
+        """
+        if not self.changed:
+            return False
+        self.save(path)
+        return True
+
+    @classmethod
+    def load(cls, path, size=DEFAULT_SIZE, brackets=DEFAULT_BRACKETS):
+        """
+        Reads a snapshot (a missing file gives an empty leaderboard). Raises
+        ValueError if the file isn't a leaderboard snapshot.
+        """
+
+        board = cls(size, brackets)
+        try:
+            with open(path, encoding="utf-8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except FileNotFoundError:
+            return board
+
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} leaderboard")
+
+        try:
+            brackets = [[LeaderboardEntry(*fields) for fields in bracket]
+                        for bracket in snapshot["entries"]]
+        except (KeyError, TypeError):
+            raise ValueError(f"{path} has badly formed leaderboard entries") from None
+        entries = [entry for bracket in brackets for entry in bracket]
+
+        if (snapshot.get("size") == board.size
+                and snapshot.get("brackets") == list(board.brackets)):
+            # same layout - just rebuild each heap (O(K))
+            for index, bracket in enumerate(brackets):
+                heap = [(entry.key(), entry) for entry in bracket]
+                heapq.heapify(heap)
+                board.heaps[index] = heap
+        else:
+            # sort the games into the new brackets
+            for entry in entries:
+                if entry.rounds_played >= board.brackets[0]:
+                    board.add(board.bracket_for(entry.rounds_played), entry)
+
+        board.submissions = max([snapshot.get("submissions", 0)]
+                                + [entry.order for entry in entries])
+        board.changed = False
+        return board
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest leaderboard")
+    parser.add_argument("path", nargs="?", default=LEADERBOARD_FILE,
+                        help="leaderboard snapshot file")
+    parser.add_argument("--rounds", type=int,
+                        help="only show the bracket for games this long")
+    args = parser.parse_args(argv)
+
+    board = Leaderboard.load(args.path)
+    indexes = range(len(board.brackets))
+    if args.rounds is not None:
+        indexes = [board.bracket_for(args.rounds)]
+
+    for index in indexes:
+        entries = board.top(board.brackets[index])
+        if not entries:
+            continue
+        print(board.bracket_name(index))
+        for place, entry in enumerate(entries, start=1):
+            print(f"  {place:>3}. {entry.name:<20} {entry.total_score:>7,} points  "
+                  f"{entry.rounds_won}/{entry.rounds_played} won "
+                  f"({entry.success_rate:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
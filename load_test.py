@@ -0,0 +1,327 @@
+"""
+Load generator for the server modes - starts N simulated players as asyncio
+tasks, each playing full games (get a round, think, answer) against the
+room server or the round API, and reports requests / sec, latency
+percentiles (from HDR-style histograms) and errors. --output writes the
+results (histograms included) as JSON so runs can be compared with
+--baseline.
+
+With --local the server runs in this process, which is handy but shares
+the CPU with the players - to find out what one box can serve, start the
+server on its own and point the load test at it.
+
+Examples:
+    python load_test.py rooms --local --players 2000 --games 2 --rounds 10
+    python load_test.py rooms --port 8765 --players 4000 --players-per-room 4 --ramp 5
+    python load_test.py api --local --players 200 --think 0.05 0.2 --output api.json
+    python load_test.py api --port 8080 --players 200 --baseline api.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+
+from benchmarks import DEFAULT_TOLERANCE
+from colour_catalogue import CSV_FILE, ROUND_SIZE, get_colours
+from latency_histogram import LatencyHistogram
+from leaderboard import Leaderboard
+from procedural_catalogue import procedural_catalogue
+from room_bot import BotStats, run_bot
+from room_server import DEFAULT_PORT as ROOM_PORT, RoomServer
+from round_api import DEFAULT_PORT as API_PORT, RoundAPI, RoundTokens, make_server
+
+# what the two timed steps of a round are called in each mode
+STEP_NAMES = {"rooms": ("ready -> round", "choose -> result"),
+              "api": ("GET /round", "POST /answer")}
+
+# settings that change the numbers too much for runs to be compared
+COMPARED_SETTINGS = ("players", "games", "rounds", "think", "players_per_room", "local")
+
+
+async def http_request(reader, writer, method, path, body=None):
+    """
+    Sends one request on a kept-alive HTTP/1.1 connection and reads the response
+    :return: status, decoded JSON body
+    """
+
+    head = f"{method} {path} HTTP/1.1\r\nHost: colour-quest\r\n"
+    data = b""
+    if body is not None:
+        data = json.dumps(body).encode("utf-8")
+        head += f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+    writer.write(head.encode("ascii") + b"\r\n" + data)
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    status = int(status_line.split()[1])
+
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def run_api_player(host, port, games, rounds, think, rng, stats):
+    """
+    Plays games on the round API over one kept-alive connection
+    """
+
+    reader, writer = await asyncio.open_connection(host, port)
+    clock = time.perf_counter_ns
+    try:
+        for _ in range(games):
+            for _ in range(rounds):
+                start = clock()
+                stats.requests += 1
+                status, round_info = await http_request(reader, writer, "GET", "/round")
+                stats.round_latency.record(clock() - start)
+                if status != 200:
+                    stats.errors += 1
+                    continue
+
+                if think[1] > 0:
+                    await asyncio.sleep(rng.uniform(*think))
+
+                start = clock()
+                stats.requests += 1
+                status, result = await http_request(
+                    reader, writer, "POST", "/answer",
+                    {"token": round_info["token"], "choice": rng.randrange(ROUND_SIZE)})
+                stats.answer_latency.record(clock() - start)
+                if status != 200:
+                    stats.errors += 1
+                    continue
+
+                stats.rounds_answered += 1
+                stats.rounds_won += result["won"]
+            stats.games_finished += 1
+    finally:
+        writer.close()
+
+
+async def run_players(mode, host, port, players, games, rounds, think,
+                      players_per_room=1, ramp=0, seed=None):
+    """
+    Runs every simulated player at once
+    :return: BotStats for the whole run, seconds taken
+    """
+
+    rng = random.Random(seed)
+    stats = BotStats()
+    prefix = f"load-{rng.getrandbits(32):08x}"
+
+    async def player(number, player_rng):
+        # spread the players' start times over the ramp
+        if ramp > 0:
+            await asyncio.sleep(ramp * number / players)
+        try:
+            if mode == "api":
+                await run_api_player(host, port, games, rounds, think, player_rng, stats)
+                return
+            # the last room waits for only the players it will actually get
+            # (when players isn't a multiple of players_per_room)
+            room = number // players_per_room
+            room_size = min(players_per_room, players - room * players_per_room)
+            for game in range(games):
+                await run_bot(host, port, f"{prefix}-{game}-{room}", f"player{number}",
+                              rounds, room_size, think, player_rng, stats)
+        except (OSError, EOFError, ValueError):
+            stats.failed_bots += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(player(number, random.Random(rng.getrandbits(64)))
+                           for number in range(players)))
+    return stats, time.perf_counter() - start
+
+
+async def run_local(mode, catalogue, **settings):
+    """
+    Starts the server in this process (on a free port) and runs the players against it
+    """
+
+    if mode == "rooms":
+        server = RoomServer(catalogue, seed=settings.get("seed"), leaderboard=Leaderboard())
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            result = await run_players(mode, "127.0.0.1", port, **settings)
+
+            # let the server finish with the players' connections before it stops
+            deadline = time.perf_counter() + 5
+            while server.open_connections and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+        return result
+
+    api = RoundAPI(catalogue, RoundTokens(os.urandom(32), catalogue))
+    server = make_server(api, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, name="round-api", daemon=True).start()
+    try:
+        return await run_players(mode, "127.0.0.1", server.server_address[1], **settings)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def summarise(mode, settings, stats, seconds):
+    """
+    :return: JSON-ready results dictionary
+    """
+
+    round_name, answer_name = STEP_NAMES[mode]
+    both = LatencyHistogram()
+    both.merge(stats.round_latency)
+    both.merge(stats.answer_latency)
+
+    return {"mode": mode, "settings": settings,
+            "platform": platform.platform(), "python": platform.python_version(),
+            "seconds": seconds, "games_finished": stats.games_finished,
+            "failed_players": stats.failed_bots, "rounds_answered": stats.rounds_answered,
+            "requests": stats.requests, "errors": stats.errors,
+            "requests_per_sec": stats.requests / seconds if seconds else 0,
+            "latency_ms": {round_name: stats.round_latency.summary(),
+                           answer_name: stats.answer_latency.summary(),
+                           "all": both.summary()},
+            "histograms_ns": {round_name: stats.round_latency.to_dict(),
+                              answer_name: stats.answer_latency.to_dict()}}
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    :return: list of what got worse than the baseline by more than the tolerance
+    (raises ValueError if the runs are of different modes or settings)
+    """
+
+    if baseline.get("mode") != results["mode"]:
+        raise ValueError(f"the baseline was run in {baseline.get('mode')} mode, "
+                         f"not {results['mode']}")
+
+    old_settings, new_settings = baseline.get("settings", {}), results["settings"]
+    different = [name for name in COMPARED_SETTINGS
+                 if old_settings.get(name) != new_settings.get(name)]
+    if different:
+        raise ValueError("the baseline was run with different settings: " + ", ".join(
+            f"{name} {old_settings.get(name)} -> {new_settings.get(name)}"
+            for name in different))
+
+    regressions = []
+    old_rate, new_rate = baseline["requests_per_sec"], results["requests_per_sec"]
+    if old_rate and new_rate < old_rate * (1 - tolerance):
+        regressions.append(f"requests / sec {old_rate:,.0f} -> {new_rate:,.0f}")
+
+    for step, latency in results["latency_ms"].items():
+        old = baseline["latency_ms"].get(step)
+        if old is None:
+            continue
+        for percentile in ("p50", "p99"):
+            if old[percentile] and latency[percentile] > old[percentile] * (1 + tolerance):
+                regressions.append(f"{step} {percentile} {old[percentile]:.2f} ms -> "
+                                   f"{latency[percentile]:.2f} ms")
+
+    if results["errors"] + results["failed_players"] > (baseline["errors"]
+                                                        + baseline["failed_players"]):
+        regressions.append("more errors / failed players")
+    return regressions
+
+
+def print_results(results):
+    settings = results["settings"]
+    print(f"{results['mode']}: {settings['players']:,} players, "
+          f"{results['games_finished']:,} games of {settings['rounds']} rounds "
+          f"({results['seconds']:.2f} s)")
+    print(f"  Requests: {results['requests']:,} ({results['requests_per_sec']:,.0f} / sec)")
+    print(f"  Errors: {results['errors']:,}, failed players: {results['failed_players']:,}")
+    print(f"  {'latency (ms)':<18} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for step, latency in results["latency_ms"].items():
+        print(f"  {step:<18} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+              f"{latency['p99']:>9.2f} {latency['max']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest server load test")
+    parser.add_argument("mode", choices=sorted(STEP_NAMES),
+                        help="rooms (room_server.py) or api (round_api.py)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int,
+                        help=f"server port (default {ROOM_PORT} for rooms, {API_PORT} for api)")
+    parser.add_argument("--local", action="store_true",
+                        help="start the server in this process instead of connecting to one")
+    parser.add_argument("--csv", default=CSV_FILE, help="colour list (with --local)")
+    parser.add_argument("--procedural", action="store_true",
+                        help="every 24 bit colour instead of a csv (with --local)")
+    parser.add_argument("--players", type=int, default=100, help="players at once")
+    parser.add_argument("--games", type=int, default=1, help="games each player plays")
+    parser.add_argument("--rounds", type=int, default=10, help="rounds in each game")
+    parser.add_argument("--players-per-room", type=int, default=1,
+                        help="players sharing each room (rooms mode)")
+    parser.add_argument("--think", type=float, nargs=2, default=[0, 0],
+                        metavar=("MIN", "MAX"), help="seconds each player takes to answer")
+    parser.add_argument("--ramp", type=float, default=0,
+                        help="seconds over which the players start")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare with results saved by --output (exits 1 if worse, "
+                             "2 if the runs can't be compared)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="how much worse than the baseline counts as a regression")
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON instead of text")
+    args = parser.parse_args(argv)
+
+    if min(args.players, args.games, args.rounds, args.players_per_room) < 1:
+        parser.error("--players, --games, --rounds and --players-per-room must be "
+                     "more than zero")
+
+    settings = {"players": args.players, "games": args.games, "rounds": args.rounds,
+                "think": args.think, "players_per_room": args.players_per_room,
+                "ramp": args.ramp, "seed": args.seed}
+
+    if args.local:
+        catalogue = procedural_catalogue() if args.procedural else get_colours(args.csv)
+        stats, seconds = asyncio.run(run_local(args.mode, catalogue, **settings))
+    else:
+        port = args.port or (ROOM_PORT if args.mode == "rooms" else API_PORT)
+        stats, seconds = asyncio.run(run_players(args.mode, args.host, port, **settings))
+
+    settings["local"] = args.local
+    results = summarise(args.mode, settings, stats, seconds)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.json:
+        print(json.dumps({key: value for key, value in results.items()
+                          if key != "histograms_ns"}, indent=2))
+    else:
+        print_results(results)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        try:
+            regressions = compare(results, baseline, args.tolerance)
+        except ValueError as error:
+            print(f"Can't compare with {args.baseline}: {error}")
+            return 2
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
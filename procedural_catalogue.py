@@ -0,0 +1,133 @@
+from array import array
+import zlib
+
+from colour_catalogue import ColourCatalogue
+
+# every 24 bit colour, #000000 to #FFFFFF (a colour's id is its hex value)
+SPACE_SIZE = 1 << 24
+WHITE = SPACE_SIZE - 1
+
+# scores go from 0 (black) up to this (white)
+DEFAULT_MAX_SCORE = 100
+
+# text colours - white text on dark colours, black text on light ones
+FG_PALETTE = ("#FFFFFF", "#000000")
+
+# colours with a relative luminance above this have more contrast with
+# black text than white text, ie: (L + 0.05) / 0.05 > 1.05 / (L + 0.05)
+LUMINANCE_THRESHOLD = 0.0525 ** 0.5 - 0.05
+
+
+class ComputedColumn:
+    """
+    List-like column whose values are worked out from the colour id when
+    they are asked for, instead of being stored.
+
+    The score and text colour functions only use arithmetic, so they work
+    on a whole NumPy array of ids at once as well (see batch).
+    """
+
+    __slots__ = ("length", "func")
+
+    def __init__(self, length, func):
+        self.length = length
+        self.func = func
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("colour id out of range")
+        return self.func(index)
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.func(index)
+
+    def batch(self, ids):
+        """
+        :param ids: NumPy array of colour ids
+        :return: array of values for those ids
+        """
+        return self.func(ids)
+
+
+def hex_name(value):
+    """
+    :param value: colour as a 0xRRGGBB number
+    :return: hex code (eg: #FF8000)
+    """
+    return f"#{value:06X}"
+
+
+def linear_channel(channel):
+    """
+    sRGB channel (0 - 255) to linear light, as in the WCAG definition of
+    relative luminance (works on NumPy arrays too)
+    """
+    low = channel <= 10
+    high = channel > 10
+    return low * (channel / 3294.6) + high * ((channel / 255 + 0.055) / 1.055) ** 2.4
+
+
+def relative_luminance(value):
+    """
+    :param value: colour as a 0xRRGGBB number (or NumPy array of them)
+    :return: WCAG relative luminance, 0 for black up to 1 for white
+    """
+    return (0.2126 * linear_channel(value >> 16)
+            + 0.7152 * linear_channel((value >> 8) & 0xFF)
+            + 0.0722 * linear_channel(value & 0xFF))
+
+
+def foreground_id(value):
+    """
+    :param value: colour as a 0xRRGGBB number (or NumPy array of them)
+    :return: position in FG_PALETTE of the text colour with the most contrast
+    """
+    return (relative_luminance(value) > LUMINANCE_THRESHOLD) * 1
+
+
+def score_function(max_score):
+    """
+    :param max_score: score for white
+    :return: function turning a hex value into a score (the bigger the
+    hex code, the bigger the score)
+    """
+
+    def hex_score(value):
+        return value * max_score // WHITE
+
+    return hex_score
+
+
+def procedural_catalogue(max_score=DEFAULT_MAX_SCORE):
+    """
+    Makes a catalogue of every 24 bit colour without storing them. Names,
+    scores and text colours are worked out from the hex value, and because
+    the score only goes up as the hex value goes up, each score covers one
+    run of hex values - so the score index is just where each run starts.
+    :param max_score: score for white (at least 3, so a round can be made)
+    :return: ColourCatalogue that can be used anywhere a csv one can
+    """
+
+    if not 3 <= max_score <= WHITE:
+        raise ValueError(f"max_score must be between 3 and {WHITE}")
+
+    hex_score = score_function(max_score)
+
+    # first hex value with each score (smallest value where
+    # value * max_score // WHITE reaches the score), plus the end
+    bucket_starts = array("I", [(score * WHITE + max_score - 1) // max_score
+                                for score in range(max_score + 1)])
+    bucket_starts.append(SPACE_SIZE)
+
+    return ColourCatalogue(ComputedColumn(SPACE_SIZE, hex_name),
+                           ComputedColumn(SPACE_SIZE, hex_score),
+                           ComputedColumn(SPACE_SIZE, foreground_id),
+                           FG_PALETTE, rgb=range(SPACE_SIZE),
+                           score_index=(range(SPACE_SIZE), bucket_starts),
+                           fingerprint=zlib.crc32(f"procedural {max_score}".encode()))
@@ -0,0 +1,248 @@
+import json
+import queue
+import socket
+import threading
+
+from colour_catalogue import ColourRow
+from game_session import (CHOICE_MADE, ROUND_STARTED, ChoiceResult, RoundInfo,
+                          RunningStats)
+from room_protocol import DEFAULT_PORT, encode
+from round_history import RoundHistory
+
+# text shown instead of a colour name when time ran out
+NO_ANSWER = "(no answer)"
+
+
+def parse_address(address):
+    """
+    :param address: 'host:port' or just 'host'
+    :return: (host, port)
+    """
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, DEFAULT_PORT
+    return host, int(port)
+
+
+class RemoteGameSession:
+    """
+    Plays a game in a room on a room server, looking like a GameSession to
+    the window (same listeners, new_round / choose, stats and history).
+
+    The server decides the colours: new_round tells it this player is ready
+    and choose sends the answer, then the round / result arrive later. Two
+    background threads talk to the server (so the window never waits on the
+    network) - call pump() regularly (from the window's thread) to hand
+    what has arrived to the listeners.
+    """
+
+    def __init__(self, address, room, name, rounds_wanted, timeout=5):
+        """
+        :param address: 'host:port' of the room server
+        :param room: room to join (made if it doesn't exist)
+        :param name: player's name
+        :param rounds_wanted: rounds in the game (if this player makes the room)
+        """
+
+        self.rounds_wanted = rounds_wanted
+        self.rounds_played = 0
+        self.rounds_won = 0
+        self.round_number = 0
+        self.target_score = 0
+        self.highest_score = 0
+        self.history = RoundHistory()
+        self.stats = RunningStats()
+
+        # remote games can't be replayed from a seed
+        self.seed = None
+
+        self.awaiting_choice = False
+        self.ready_sent = False
+        self.finished = False
+
+        # newest error from the server / connection, until take_error()
+        self.last_error = None
+
+        self.listeners = []
+
+        self.socket = socket.create_connection(parse_address(address), timeout)
+        self.socket.settimeout(None)
+
+        # messages from the server, waiting for pump()
+        self.incoming = queue.SimpleQueue()
+        self.reader = threading.Thread(target=self.read_messages,
+                                       name="room-client-reader", daemon=True)
+        self.reader.start()
+
+        # messages waiting to be sent (None closes the connection)
+        self.outgoing = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self.write_messages,
+                                       name="room-client-writer", daemon=True)
+        self.writer.start()
+
+        self.send({"type": "join", "room": room, "name": name, "rounds": rounds_wanted})
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, kind, info):
+        for listener in self.listeners:
+            listener(kind, info)
+
+    @property
+    def game_over(self):
+        return self.finished
+
+    def send(self, message):
+        # queued for the writer thread, so a slow server can't hold up the window
+        self.outgoing.put(encode(message))
+
+    def write_messages(self):
+        try:
+            while True:
+                data = self.outgoing.get()
+                if data is None:
+                    break
+                self.socket.sendall(data)
+        except OSError as error:
+            # pump() shows it like an error from the server
+            self.incoming.put({"type": "error", "message": str(error)})
+        finally:
+            # also stops the reader thread
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.socket.close()
+
+    def read_messages(self):
+        try:
+            with self.socket.makefile("rb") as lines:
+                for line in lines:
+                    self.incoming.put(json.loads(line))
+        except (OSError, ValueError) as error:
+            self.incoming.put({"type": "error", "message": str(error)})
+        finally:
+            # tells pump() the connection has gone
+            self.incoming.put(None)
+
+    def pump(self):
+        """
+        Deals with every message that has arrived from the server
+        :return: False once the connection has closed
+        """
+
+        while True:
+            try:
+                message = self.incoming.get_nowait()
+            except queue.Empty:
+                return True
+
+            if message is None:
+                if not self.finished and self.last_error is None:
+                    self.last_error = "the connection to the server was lost"
+                self.finished = True
+                return False
+
+            kind = message.get("type")
+            if kind == "joined":
+                self.rounds_wanted = message["rounds"]
+            elif kind == "round":
+                self.show_round(message)
+            elif kind == "result":
+                self.show_result(message)
+            elif kind == "game_over":
+                self.finished = True
+            elif kind == "error":
+                self.last_error = message.get("message")
+
+    def take_error(self):
+        """
+        :return: error that has happened since the last call (None if there wasn't one)
+        """
+        error = self.last_error
+        self.last_error = None
+        return error
+
+    def show_round(self, message):
+        self.round_number = message["round"]
+        self.target_score = message["target"]
+        self.awaiting_choice = True
+        self.ready_sent = False
+
+        # the colours are only names and text colours - scores are secret
+        round_colours = [ColourRow(name, None, fg) for name, fg in message["colours"]]
+        self.notify(ROUND_STARTED, RoundInfo(self.round_number, self.rounds_wanted,
+                                             round_colours, range(len(round_colours)),
+                                             self.target_score, 0))
+
+    def show_result(self, message):
+        score = message["score"]
+        won = message["won"]
+        highest = message["highest"]
+        points = score if won else 0
+
+        self.awaiting_choice = False
+        self.rounds_played += 1
+        if won:
+            self.rounds_won += 1
+        self.highest_score = highest
+        self.history.append(points, highest)
+        self.stats.add(points, highest, won)
+        if message["game_over"]:
+            self.finished = True
+
+        self.notify(CHOICE_MADE, ChoiceResult(message["choice"],
+                                              message["colour"] or NO_ANSWER,
+                                              score, won, self.rounds_played,
+                                              self.rounds_won, message["game_over"]))
+
+    def new_round(self):
+        """
+        Tells the server this player is ready (the round arrives later)
+        """
+
+        if self.game_over:
+            raise RuntimeError("the game is over - no more rounds to play")
+        if self.awaiting_choice:
+            raise RuntimeError("a colour has not been chosen for this round yet")
+
+        if not self.ready_sent:
+            self.ready_sent = True
+            self.send({"type": "ready"})
+
+    def choose(self, choice):
+        """
+        Sends the colour chosen (the result arrives later)
+        """
+
+        if not self.awaiting_choice:
+            raise RuntimeError("there is no round waiting for a choice")
+        if not 0 <= choice < 4:
+            raise ValueError(f"choice must be 0 to 3, not {choice}")
+
+        self.awaiting_choice = False
+        self.send({"type": "choose", "round": self.round_number, "choice": choice})
+
+    def prefetch(self):
+        # rounds come from the server
+        return False
+
+    def cancel_prefetch(self):
+        pass
+
+    def close(self):
+        """
+        Leaves the room and closes the connection
+        """
+
+        if not self.finished:
+            self.send({"type": "leave"})
+        self.finished = True
+
+        # the writer closes the connection once everything before it has been sent
+        self.outgoing.put(None)
+        self.history.close()
@@ -0,0 +1,154 @@
+"""
+Replays recorded games (see B_01_Colour_Quest_v2.py --record) through the
+game rules as fast as possible, checking every round turns out the same
+and reporting how many rounds per second were replayed.
+
+Examples:
+    python replay.py sessions.cqr
+    python replay.py sessions.cqr --repeat 20 --json
+    python replay.py made_up.cqr --generate 1000 --rounds 50   # record random games first
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from colour_catalogue import CSV_FILE, get_colours
+from game_session import GameSession
+from procedural_catalogue import procedural_catalogue
+from session_recording import (CHOICE_MASK, WON_FLAG, SessionRecorder, append_recording,
+                               read_recordings)
+
+
+def replay_game(recording, catalogue):
+    """
+    Plays a recorded game again with the same seed and choices
+    :param recording: Recording
+    :param catalogue: colours the game was played with
+    :return: number of the first round that turned out differently (None if
+    every round matched)
+    """
+
+    session = GameSession(recording.rounds_wanted, catalogue, seed=recording.seed)
+    new_round = session.new_round
+    choose = session.choose
+
+    for round_number, (move, score) in enumerate(zip(recording.moves, recording.scores),
+                                                 start=1):
+        new_round()
+        result = choose(move & CHOICE_MASK)
+        if result.score != score or result.won != bool(move & WON_FLAG):
+            return round_number
+
+    return None
+
+
+def replay(recordings, catalogue, repeat=1):
+    """
+    Replays every recording (repeat times over) and times it
+    :param recordings: list of Recording
+    :param catalogue: colours the games were played with
+    :param repeat: number of times to replay the whole list
+    :return: summary dictionary
+    """
+
+    fingerprint = catalogue.fingerprint()
+    playable = [recording for recording in recordings
+                if recording.fingerprint == fingerprint]
+
+    mismatches = []
+    rounds = 0
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for index, recording in enumerate(playable):
+            round_number = replay_game(recording, catalogue)
+            if round_number is not None:
+                mismatches.append({"game": index, "seed": recording.seed,
+                                   "round": round_number})
+            rounds += recording.rounds_played
+    seconds = time.perf_counter() - start
+
+    games = len(playable) * repeat
+    return {"games": games, "rounds": rounds,
+            "wrong_colours": len(recordings) - len(playable),
+            "mismatches": mismatches, "seconds": seconds,
+            "games_per_sec": games / seconds if seconds else 0,
+            "rounds_per_sec": rounds / seconds if seconds else 0}
+
+
+def record_random_games(path, games, rounds, catalogue, seed=None):
+    """
+    Plays games with random choices and adds them to a recording file
+    (handy for trying the replay out when there are no real recordings)
+    """
+
+    rng = random.Random(seed)
+    for _ in range(games):
+        session = GameSession(rounds, catalogue, seed=rng.getrandbits(64))
+        recorder = SessionRecorder(session)
+        while not session.game_over:
+            session.new_round()
+            session.choose(rng.randrange(4))
+        append_recording(path, recorder.recording)
+
+
+def print_summary(summary):
+    print(f"Replayed {summary['games']:,} games ({summary['rounds']:,} rounds) "
+          f"in {summary['seconds']:.3f} s")
+    print(f"  Rounds / sec: {summary['rounds_per_sec']:,.0f}")
+    print(f"  Games / sec: {summary['games_per_sec']:,.0f}")
+
+    if summary["wrong_colours"]:
+        print(f"  Skipped {summary['wrong_colours']} games recorded with a different "
+              f"colour list")
+
+    if summary["mismatches"]:
+        print(f"  {len(summary['mismatches'])} games turned out differently:")
+        for mismatch in summary["mismatches"][:10]:
+            print(f"    game {mismatch['game']} (seed {mismatch['seed']}) "
+                  f"round {mismatch['round']}")
+    elif summary["games"]:
+        print("  Every round matched the recording")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest replay")
+    parser.add_argument("recordings", help="recording file")
+    parser.add_argument("--csv", default=CSV_FILE, help="colour list the games used")
+    parser.add_argument("--procedural", action="store_true",
+                        help="the games used every 24 bit colour instead of a csv")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="times to replay the recordings (for steadier timings)")
+    parser.add_argument("--generate", type=int, metavar="GAMES",
+                        help="first add this many games with random choices to the file")
+    parser.add_argument("--rounds", type=int, default=20,
+                        help="rounds in each generated game")
+    parser.add_argument("--seed", type=int, default=None, help="seed for generated games")
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON instead of text")
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1 or args.rounds < 1:
+        parser.error("--repeat and --rounds must be whole numbers more than zero")
+
+    catalogue = procedural_catalogue() if args.procedural else get_colours(args.csv)
+
+    if args.generate:
+        record_random_games(args.recordings, args.generate, args.rounds, catalogue, args.seed)
+
+    summary = replay(read_recordings(args.recordings), catalogue, args.repeat)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+    # a game that doesn't match (or can't be replayed) counts as a failure
+    return 1 if summary["mismatches"] or summary["wrong_colours"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Bots that play on a room server, for load testing on one machine. Each bot
+joins a room, answers every round with a random colour (after a short
+'thinking' pause) and the results are timed.
+
+Examples:
+    python room_bot.py --local --rooms 1000 --bots-per-room 4 --rounds 10
+    python room_bot.py --host 127.0.0.1 --port 8765 --rooms 200 --think 0.1 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from colour_catalogue import CSV_FILE, ROUND_SIZE, get_colours
+from latency_histogram import LatencyHistogram
+from leaderboard import Leaderboard
+from procedural_catalogue import procedural_catalogue
+from room_protocol import DEFAULT_PORT, encode
+from room_server import RoomServer
+
+
+class BotStats:
+    """
+    Totals for every bot in the run
+    """
+
+    def __init__(self):
+        self.games_finished = 0
+        self.rounds_answered = 0
+        self.rounds_won = 0
+        self.errors = 0
+        self.failed_bots = 0
+
+        # messages sent that the server answers (ready and choose)
+        self.requests = 0
+
+        # ns from being ready to getting the round (includes waiting for
+        # the rest of the room), and from answering to getting the result
+        self.round_latency = LatencyHistogram()
+        self.answer_latency = LatencyHistogram()
+
+
+async def run_bot(host, port, room, name, rounds, players, think, rng, stats):
+    """
+    Plays one bot's game from joining to game over
+    """
+
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    try:
+        writer.write(encode({"type": "join", "room": room, "name": name,
+                             "rounds": rounds, "players": players}))
+
+        clock = time.perf_counter_ns
+        ready_at = sent_at = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            message = json.loads(line)
+            kind = message["type"]
+
+            if kind in ("joined", "round_over"):
+                ready_at = clock()
+                stats.requests += 1
+                writer.write(encode({"type": "ready"}))
+
+            elif kind == "round":
+                if ready_at is not None:
+                    stats.round_latency.record(clock() - ready_at)
+                    ready_at = None
+                if think[1] > 0:
+                    await asyncio.sleep(rng.uniform(*think))
+                sent_at = clock()
+                stats.requests += 1
+                writer.write(encode({"type": "choose", "round": message["round"],
+                                     "choice": rng.randrange(ROUND_SIZE)}))
+
+            elif kind == "result":
+                if sent_at is not None and message["choice"] is not None:
+                    stats.answer_latency.record(clock() - sent_at)
+                sent_at = None
+                stats.rounds_answered += 1
+                stats.rounds_won += message["won"]
+
+            elif kind == "game_over":
+                stats.games_finished += 1
+                break
+
+            elif kind == "error":
+                stats.errors += 1
+
+        writer.write(encode({"type": "leave"}))
+    finally:
+        writer.close()
+
+
+async def run_bots(host, port, rooms, bots_per_room, rounds, think, seed=None):
+    """
+    Runs rooms * bots_per_room bots at once
+    :return: summary dictionary
+    """
+
+    rng = random.Random(seed)
+    stats = BotStats()
+    prefix = f"bots-{rng.getrandbits(32):08x}"
+
+    async def bot(room_number, bot_number):
+        try:
+            await run_bot(host, port, f"{prefix}-{room_number}", f"bot{bot_number}",
+                          rounds, bots_per_room, think, random.Random(rng.getrandbits(64)),
+                          stats)
+        except (OSError, ValueError):
+            stats.failed_bots += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bot(room_number, bot_number)
+                           for room_number in range(rooms)
+                           for bot_number in range(bots_per_room)))
+    seconds = time.perf_counter() - start
+
+    answer_latency = stats.answer_latency.summary()
+    return {"bots": rooms * bots_per_room, "rooms": rooms, "seconds": seconds,
+            "games_finished": stats.games_finished, "failed_bots": stats.failed_bots,
+            "rounds_answered": stats.rounds_answered, "rounds_won": stats.rounds_won,
+            "errors": stats.errors,
+            "answers_per_sec": stats.rounds_answered / seconds if seconds else 0,
+            "p50_ms": answer_latency["p50"], "p99_ms": answer_latency["p99"]}
+
+
+async def run_local(catalogue, rooms, bots_per_room, rounds, think, seed):
+    """
+    Starts a server in this process (on a free port, with an in-memory
+    leaderboard) and runs the bots against it
+    """
+
+    server = RoomServer(catalogue, seed=seed, leaderboard=Leaderboard())
+    listener = await server.start("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        summary = await run_bots("127.0.0.1", port, rooms, bots_per_room, rounds,
+                                 think, seed)
+
+        # let the server finish with the bots' connections before it stops
+        deadline = time.perf_counter() + 5
+        while server.open_connections and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+    summary["server"] = server.stats()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest room server bots")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--local", action="store_true",
+                        help="start a server in this process instead of connecting to one")
+    parser.add_argument("--csv", default=CSV_FILE, help="colour list (with --local)")
+    parser.add_argument("--procedural", action="store_true",
+                        help="every 24 bit colour instead of a csv (with --local)")
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--bots-per-room", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=10, help="rounds in each game")
+    parser.add_argument("--think", type=float, nargs=2, default=[0, 0],
+                        metavar=("MIN", "MAX"), help="seconds each bot takes to answer")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON instead of text")
+    args = parser.parse_args(argv)
+
+    if args.rooms < 1 or args.bots_per_room < 1 or args.rounds < 1:
+        parser.error("--rooms, --bots-per-room and --rounds must be more than zero")
+
+    if args.local:
+        catalogue = procedural_catalogue() if args.procedural else get_colours(args.csv)
+        summary = asyncio.run(run_local(catalogue, args.rooms, args.bots_per_room,
+                                        args.rounds, args.think, args.seed))
+    else:
+        summary = asyncio.run(run_bots(args.host, args.port, args.rooms,
+                                       args.bots_per_room, args.rounds, args.think,
+                                       args.seed))
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"{summary['bots']:,} bots in {summary['rooms']:,} rooms "
+          f"({summary['seconds']:.2f} s)")
+    print(f"  Games finished: {summary['games_finished']:,} "
+          f"(failed bots: {summary['failed_bots']:,}, errors: {summary['errors']:,})")
+    print(f"  Answers / sec: {summary['answers_per_sec']:,.0f}")
+    print(f"  Answer -> result: p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+What room server clients and the server agree on (see room_server.py for
+the messages). Kept apart from the server so that clients - the game
+window especially - don't have to import asyncio to talk to it.
+"""
+
+import json
+
+DEFAULT_PORT = 8765
+
+MAX_ROUNDS = 1000
+MAX_PLAYERS = 64
+MAX_NAME_LENGTH = 64
+
+# longest line a client can send
+MAX_LINE_BYTES = 4096
+
+
+def encode(message):
+    """
+    :return: message as a line of JSON (bytes)
+    """
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
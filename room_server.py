@@ -0,0 +1,540 @@
+"""
+Multiplayer Colour Quest - everyone in a room gets the same four colours
+each round and races to answer. Clients talk to the server with one JSON
+object per line (see the protocol below). One event loop hosts every room.
+
+Examples:
+    python room_server.py --port 8765
+    python room_server.py --procedural --round-seconds 10
+    python B_01_Colour_Quest_v2.py --server localhost:8765 --room friends --name Sam
+    python room_bot.py --port 8765 --rooms 1000 --bots-per-room 4
+    python room_server.py --leaderboard colour_quest_leaderboard.json
+
+Protocol (client -> server):
+    {"type": "join", "room": "friends", "name": "Sam", "rounds": 10, "players": 2}
+                                              (rounds / players only count when
+                                              the room is made - players is how
+                                              many to wait for before starting)
+    {"type": "ready"}                         ready for the next round
+    {"type": "choose", "round": 1, "choice": 2}
+    {"type": "leave"}
+    {"type": "leaderboard", "rounds": 10}     best games of that length
+
+Protocol (server -> client):
+    joined, player_joined, player_left, round (colours and target),
+    result (your answer), round_over (everyone's standings), game_over (with
+    the leaderboard if the server keeps one), leaderboard, error
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from colour_catalogue import CSV_FILE, ROUND_SIZE, get_colours
+from game_session import get_round_colours
+from leaderboard import LEADERBOARD_FILE, Leaderboard
+from procedural_catalogue import procedural_catalogue
+from room_protocol import (DEFAULT_PORT, MAX_LINE_BYTES, MAX_NAME_LENGTH, MAX_PLAYERS,
+                           MAX_ROUNDS, encode)
+
+# seconds players get to answer, and to wait for slow players to be ready
+DEFAULT_ROUND_SECONDS = 20
+DEFAULT_READY_SECONDS = 5
+
+# clients with more than this waiting to be sent to them are dropped
+# (so one slow client can't make the server's memory grow)
+MAX_WRITE_BUFFER = 256 * 1024
+
+# how often the leaderboard is saved (if it has changed)
+LEADERBOARD_SAVE_SECONDS = 10
+
+# room states
+WAITING = 0
+PLAYING = 1
+FINISHED = 2
+
+
+class Player:
+    """
+    One connection (room and name are set when it joins a room)
+    """
+
+    __slots__ = ("name", "writer", "room", "total_score", "rounds_won",
+                 "answered_round", "ready")
+
+    def __init__(self, writer):
+        self.name = None
+        self.writer = writer
+        self.room = None
+        self.total_score = 0
+        self.rounds_won = 0
+
+        # last round this player answered
+        self.answered_round = 0
+        self.ready = False
+
+
+class Room:
+    """
+    A game shared by everyone in the room. Only the current round's colour
+    names and scores are kept (plus a small amount for each player).
+    """
+
+    __slots__ = ("name", "rounds_wanted", "players_wanted", "players", "rng", "state",
+                 "round_number", "round_names", "round_fgs", "round_scores", "target", "highest",
+                 "answers", "ready_count", "timer")
+
+    def __init__(self, name, rounds_wanted, players_wanted, seed):
+        self.name = name
+        self.rounds_wanted = rounds_wanted
+
+        # the first round waits until this many players have joined
+        self.players_wanted = players_wanted
+        self.players = []
+        self.rng = random.Random(seed)
+
+        self.state = WAITING
+        self.round_number = 0
+        self.round_names = ()
+        self.round_fgs = ()
+        self.round_scores = ()
+        self.target = 0
+        self.highest = 0
+
+        # answers this round / players ready for the next one
+        self.answers = 0
+        self.ready_count = 0
+
+        # asyncio TimerHandle for the round / ready time limit
+        self.timer = None
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def standings(self):
+        """
+        :return: [name, total score, rounds won] for each player, best first
+        """
+        return sorted(([player.name, player.total_score, player.rounds_won]
+                       for player in self.players), key=lambda item: -item[1])
+
+
+class RoomServer:
+    """
+    Runs every room. All of the game happens on the event loop's thread,
+    so rooms need no locks; time limits use loop.call_later rather than a
+    task per room.
+    """
+
+    def __init__(self, catalogue=None, round_seconds=DEFAULT_ROUND_SECONDS,
+                 ready_seconds=DEFAULT_READY_SECONDS, seed=None,
+                 max_write_buffer=MAX_WRITE_BUFFER, leaderboard=None):
+        """
+        :param catalogue: colours to play with (defaults to the csv file)
+        :param round_seconds: time limit for answering
+        :param ready_seconds: time to wait for everyone to be ready once
+        one player is
+        :param seed: seed for the rooms' seeds (None for random rooms)
+        :param leaderboard: Leaderboard that finished games are added to (optional)
+        """
+
+        if catalogue is None:
+            catalogue = get_colours()
+
+        self.catalogue = catalogue
+        self.round_seconds = round_seconds
+        self.ready_seconds = ready_seconds
+        self.max_write_buffer = max_write_buffer
+        self.seeds = random.Random(seed)
+        self.leaderboard = leaderboard
+
+        # room name -> Room (finished rooms are removed)
+        self.rooms = {}
+
+        # counters for the load tests
+        self.connections = 0
+        self.open_connections = 0
+        self.rounds_played = 0
+        self.answers = 0
+        self.messages_sent = 0
+        self.clients_dropped = 0
+
+        self.handlers = {"join": self.join, "ready": self.ready,
+                         "choose": self.choose, "leave": self.leave,
+                         "leaderboard": self.show_leaderboard}
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """
+        :return: the asyncio server (already listening)
+        """
+        return await asyncio.start_server(self.handle_connection, host, port,
+                                          limit=MAX_LINE_BYTES)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Reads one client's messages until it leaves or disconnects
+        """
+
+        self.connections += 1
+        self.open_connections += 1
+        player = Player(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    self.send(writer, {"type": "error", "message": "line too long"})
+                    break
+                if not line:
+                    break
+
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    self.send(writer, {"type": "error", "message": "not valid JSON"})
+                    continue
+
+                handler = None
+                if isinstance(message, dict):
+                    handler = self.handlers.get(message.get("type"))
+                if handler is None:
+                    self.send(writer, {"type": "error", "message": "unknown message"})
+                    continue
+
+                error = handler(player, message)
+                if error is not None:
+                    self.send(writer, {"type": "error", "message": error})
+
+        except ConnectionError:
+            pass
+        finally:
+            self.remove_player(player)
+            writer.close()
+            self.open_connections -= 1
+
+    def send(self, writer, message):
+        self.write(writer, encode(message))
+
+    def write(self, writer, data):
+        """
+        Queues data for a client without waiting for it to be sent
+        """
+
+        transport = writer.transport
+        if transport.is_closing():
+            return
+
+        if transport.get_write_buffer_size() > self.max_write_buffer:
+            # too far behind - drop the client rather than buffer forever
+            self.clients_dropped += 1
+            transport.abort()
+            return
+
+        writer.write(data)
+        self.messages_sent += 1
+
+    def broadcast(self, room, message):
+        # encoded once for the whole room
+        data = encode(message)
+        for player in room.players:
+            self.write(player.writer, data)
+
+    # message handlers - each returns an error message (or None)
+
+    def join(self, player, message):
+        if player.room is not None:
+            return "already in a room"
+
+        room_name = message.get("room")
+        name = message.get("name")
+        rounds_wanted = message.get("rounds", 10)
+        players_wanted = message.get("players", 1)
+
+        if not isinstance(room_name, str) or not 0 < len(room_name) <= MAX_NAME_LENGTH:
+            return "room must be a name up to 64 characters long"
+        if not isinstance(name, str) or not 0 < len(name) <= MAX_NAME_LENGTH:
+            return "name must be up to 64 characters long"
+        if (not isinstance(rounds_wanted, int) or isinstance(rounds_wanted, bool)
+                or not 1 <= rounds_wanted <= MAX_ROUNDS):
+            return f"rounds must be a whole number from 1 to {MAX_ROUNDS}"
+        if (not isinstance(players_wanted, int) or isinstance(players_wanted, bool)
+                or not 1 <= players_wanted <= MAX_PLAYERS):
+            return f"players must be a whole number from 1 to {MAX_PLAYERS}"
+
+        room = self.rooms.get(room_name)
+        if room is None:
+            room = Room(room_name, rounds_wanted, players_wanted,
+                        self.seeds.getrandbits(64))
+            self.rooms[room_name] = room
+        elif len(room.players) >= MAX_PLAYERS:
+            return "room is full"
+
+        self.broadcast(room, {"type": "player_joined", "name": name})
+        player.name = name
+        player.room = room
+        room.players.append(player)
+
+        self.send(player.writer, {"type": "joined", "room": room_name,
+                           "rounds": room.rounds_wanted, "round": room.round_number,
+                           "players": [other.name for other in room.players]})
+
+        # joining part way through a round - they can still answer it
+        if room.state == PLAYING:
+            self.send(player.writer, self.round_message(room))
+        return None
+
+    def ready(self, player, message):
+        if player.room is None:
+            return "join a room first"
+
+        room = player.room
+        if room.state == FINISHED or player.ready:
+            return None
+
+        # a player can be ready for the next round before the others have
+        # answered this one - it counts once the round is over
+        player.ready = True
+        room.ready_count += 1
+        if room.state == WAITING:
+            self.check_ready(room)
+        return None
+
+    def choose(self, player, message):
+        if player.room is None:
+            return "join a room first"
+
+        room = player.room
+        choice = message.get("choice")
+        if room.state != PLAYING or message.get("round") != room.round_number:
+            return "that round is over"
+        if player.answered_round == room.round_number:
+            return "already answered this round"
+        if (not isinstance(choice, int) or isinstance(choice, bool)
+                or not 0 <= choice < ROUND_SIZE):
+            return f"choice must be 0 to {ROUND_SIZE - 1}"
+
+        score = room.round_scores[choice]
+        won = score >= room.target
+        player.answered_round = room.round_number
+        if won:
+            player.total_score += score
+            player.rounds_won += 1
+
+        room.answers += 1
+        self.answers += 1
+
+        self.send(player.writer, {
+            "type": "result", "round": room.round_number, "choice": choice,
+            "colour": room.round_names[choice], "score": score,
+            "won": won, "target": room.target, "highest": room.highest,
+            "place": room.answers, "game_over": room.round_number >= room.rounds_wanted})
+
+        if room.answers >= len(room.players):
+            self.end_round(room)
+        return None
+
+    def leave(self, player, message):
+        # closing the connection ends handle_connection's loop
+        self.remove_player(player)
+        player.writer.close()
+        return None
+
+    def show_leaderboard(self, player, message):
+        if self.leaderboard is None:
+            return "this server doesn't keep a leaderboard"
+
+        rounds = message.get("rounds", 10)
+        if not isinstance(rounds, int) or isinstance(rounds, bool) or rounds < 1:
+            return "rounds must be a whole number more than zero"
+
+        self.send(player.writer, self.leaderboard_message(rounds))
+        return None
+
+    def leaderboard_message(self, rounds):
+        board = self.leaderboard
+        return {"type": "leaderboard", "rounds": rounds,
+                "bracket": board.bracket_name(board.bracket_for(rounds)),
+                "entries": [entry.to_dict() for entry in board.top(rounds)]}
+
+    # rounds
+
+    def check_ready(self, room):
+        """
+        Starts the next round if everyone in a waiting room is ready, or
+        starts the clock on the players who aren't
+        """
+
+        # the first round waits for everyone to turn up
+        if room.round_number == 0 and len(room.players) < room.players_wanted:
+            return
+
+        if room.ready_count >= len(room.players):
+            self.start_round(room)
+        elif room.ready_count and room.timer is None:
+            # don't wait forever for players who aren't ready
+            room.timer = asyncio.get_running_loop().call_later(
+                self.ready_seconds, self.start_round, room)
+
+    def start_round(self, room):
+        room.cancel_timer()
+        if room.state != WAITING or not room.players:
+            return
+
+        round_colours, median, highest = get_round_colours(self.catalogue, room.rng)
+
+        room.state = PLAYING
+        room.round_number += 1
+        room.round_names = tuple(colour.name for colour in round_colours)
+        room.round_scores = tuple(colour.score for colour in round_colours)
+        room.target = median
+        room.highest = highest
+        room.answers = 0
+        room.ready_count = 0
+        for player in room.players:
+            player.ready = False
+
+        room.round_fgs = tuple(colour.fg for colour in round_colours)
+        self.broadcast(room, self.round_message(room))
+
+        room.timer = asyncio.get_running_loop().call_later(
+            self.round_seconds, self.end_round, room)
+
+    def round_message(self, room):
+        return {"type": "round", "round": room.round_number, "rounds": room.rounds_wanted,
+                "target": room.target,
+                "colours": [list(colour) for colour in zip(room.round_names, room.round_fgs)]}
+
+    def end_round(self, room):
+        room.cancel_timer()
+        if room.state != PLAYING:
+            return
+
+        self.rounds_played += 1
+
+        # players who ran out of time
+        for player in room.players:
+            if player.answered_round != room.round_number:
+                player.answered_round = room.round_number
+                self.send(player.writer, {
+                    "type": "result", "round": room.round_number, "choice": None,
+                    "colour": None, "score": 0, "won": False, "target": room.target,
+                    "highest": room.highest, "place": None,
+                    "game_over": room.round_number >= room.rounds_wanted})
+
+        self.broadcast(room, {"type": "round_over", "round": room.round_number,
+                              "scores": room.round_scores, "highest": room.highest,
+                              "standings": room.standings()})
+
+        if room.round_number >= room.rounds_wanted:
+            room.state = FINISHED
+            game_over = {"type": "game_over", "standings": room.standings()}
+            if self.leaderboard is not None:
+                for player in room.players:
+                    self.leaderboard.submit(player.name, player.total_score,
+                                            player.rounds_won, room.round_number)
+                game_over["leaderboard"] = self.leaderboard_message(room.round_number)
+            self.broadcast(room, game_over)
+            # the name can be used for a new game straight away
+            if self.rooms.get(room.name) is room:
+                del self.rooms[room.name]
+        else:
+            room.state = WAITING
+            # players who were ready before the round ended
+            self.check_ready(room)
+
+    def remove_player(self, player):
+        room = player.room
+        if room is None:
+            return
+
+        player.room = None
+        room.players.remove(player)
+        if player.ready:
+            room.ready_count -= 1
+
+        if not room.players:
+            room.cancel_timer()
+            room.state = FINISHED
+            if self.rooms.get(room.name) is room:
+                del self.rooms[room.name]
+            return
+
+        self.broadcast(room, {"type": "player_left", "name": player.name})
+
+        # the players left might all be done now
+        if room.state == PLAYING:
+            if all(other.answered_round == room.round_number for other in room.players):
+                self.end_round(room)
+        elif room.state == WAITING and room.ready_count >= len(room.players):
+            self.check_ready(room)
+
+    def stats(self):
+        """
+        :return: dictionary of server counters
+        """
+        return {"rooms": len(self.rooms),
+                "players": sum(len(room.players) for room in self.rooms.values()),
+                "connections": self.connections,
+                "open_connections": self.open_connections, "rounds_played": self.rounds_played,
+                "answers": self.answers, "messages_sent": self.messages_sent,
+                "clients_dropped": self.clients_dropped,
+                "leaderboard_submissions": (self.leaderboard.submissions
+                                            if self.leaderboard is not None else 0)}
+
+
+def save_leaderboard_every(server, path, seconds):
+    """
+    Saves the server's leaderboard (if it has changed) every so many seconds
+    """
+    server.leaderboard.save_if_changed(path)
+    asyncio.get_running_loop().call_later(seconds, save_leaderboard_every,
+                                          server, path, seconds)
+
+
+async def serve(server, host, port, leaderboard_path=None):
+    listener = await server.start(host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f"Colour Quest room server listening on {addresses}")
+    if leaderboard_path is not None:
+        save_leaderboard_every(server, leaderboard_path, LEADERBOARD_SAVE_SECONDS)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest multiplayer room server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--csv", default=CSV_FILE, help="colour list to use")
+    parser.add_argument("--procedural", action="store_true",
+                        help="play with every 24 bit colour instead of the csv list")
+    parser.add_argument("--round-seconds", type=float, default=DEFAULT_ROUND_SECONDS,
+                        help="time limit for answering")
+    parser.add_argument("--ready-seconds", type=float, default=DEFAULT_READY_SECONDS,
+                        help="time to wait for slow players between rounds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--leaderboard", nargs="?", const=LEADERBOARD_FILE, metavar="FILE",
+                        help="keep a leaderboard of finished games (saved to FILE)")
+    args = parser.parse_args(argv)
+
+    catalogue = procedural_catalogue() if args.procedural else get_colours(args.csv)
+    leaderboard = None
+    if args.leaderboard:
+        leaderboard = Leaderboard.load(args.leaderboard)
+    server = RoomServer(catalogue, args.round_seconds, args.ready_seconds, args.seed,
+                        leaderboard=leaderboard)
+
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.leaderboard))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if leaderboard is not None:
+            leaderboard.save_if_changed(args.leaderboard)
+
+
+if __name__ == "__main__":
+    main()
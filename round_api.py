@@ -0,0 +1,315 @@
+"""
+Stateless HTTP API for Colour Quest rounds. Everything a server needs to
+mark an answer travels in the round's token (encrypted so the scores stay
+secret, and signed so it can't be changed), so any server sharing the
+secret can mark it - nothing is remembered between requests.
+
+Examples:
+    python round_api.py --port 8080 --secret "shared by every server"
+    curl localhost:8080/round
+    curl -d '{"token": "...", "choice": 2}' localhost:8080/answer
+
+Endpoints:
+    GET  /round    {"colours": [[name, text colour] x 4], "target": 12, "token": "..."}
+    POST /answer   {"token": "...", "choice": 0-3} -> colour, score, won, highest
+    GET  /health   {"ok": true}
+
+A token can be answered more than once (that would need shared state), so
+tokens expire after --token-seconds.
+"""
+
+import argparse
+import base64
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import random
+import struct
+import threading
+import time
+
+from colour_catalogue import CSV_FILE, ROUND_SIZE, get_colours
+from game_session import round_targets
+from procedural_catalogue import procedural_catalogue
+
+DEFAULT_PORT = 8080
+
+# how long a round can be answered for
+DEFAULT_TOKEN_SECONDS = 300
+
+TOKEN_VERSION = 1
+NONCE_BYTES = 12
+TAG_BYTES = 16
+
+# version | catalogue fingerprint | issued (unix time) | 4 colour ids |
+# 4 scores | target | highest
+TOKEN_PAYLOAD = struct.Struct("<BII4I4III")
+
+# biggest request body accepted (an answer is tiny)
+MAX_BODY_BYTES = 4096
+
+
+class RoundTokens:
+    """
+    Makes and checks round tokens. A token is nonce | encrypted payload |
+    signature, base64 encoded. The payload is encrypted with a keystream
+    made from HMAC-SHA256, and nonce + encrypted payload are signed with a
+    second HMAC-SHA256 key - both keys come from the shared secret.
+    """
+
+    def __init__(self, secret, catalogue, token_seconds=DEFAULT_TOKEN_SECONDS):
+        """
+        :param secret: bytes or str shared by every server
+        :param catalogue: colours the rounds come from (must be the same on every server)
+        :param token_seconds: how long a token can be answered for
+        """
+
+        if isinstance(secret, str):
+            secret = secret.encode("utf-8")
+        if not secret:
+            raise ValueError("the token secret can't be empty")
+
+        self.encrypt_key = hmac.digest(secret, b"colour quest round encrypt", "sha256")
+        self.sign_key = hmac.digest(secret, b"colour quest round sign", "sha256")
+        self.catalogue = catalogue
+        self.fingerprint = catalogue.fingerprint()
+        self.token_seconds = token_seconds
+
+    def keystream(self, nonce, length):
+        blocks = []
+        for counter in range((length + 31) // 32):
+            blocks.append(hmac.digest(self.encrypt_key, nonce + bytes((counter,)), "sha256"))
+        return b"".join(blocks)[:length]
+
+    def crypt(self, nonce, data):
+        """
+        Encrypts (or decrypts - it's the same) data
+        """
+        stream = self.keystream(nonce, len(data))
+        return (int.from_bytes(data, "little")
+                ^ int.from_bytes(stream, "little")).to_bytes(len(data), "little")
+
+    def issue(self, colour_ids, scores, target, highest):
+        """
+        :return: token (str) holding the round
+        """
+
+        payload = TOKEN_PAYLOAD.pack(TOKEN_VERSION, self.fingerprint, int(time.time()),
+                                     *colour_ids, *scores, target, highest)
+        nonce = os.urandom(NONCE_BYTES)
+        sealed = nonce + self.crypt(nonce, payload)
+        tag = hmac.digest(self.sign_key, sealed, "sha256")[:TAG_BYTES]
+        return base64.urlsafe_b64encode(sealed + tag).rstrip(b"=").decode("ascii")
+
+    def read(self, token):
+        """
+        Checks a token and gets the round back out of it (raises ValueError
+        if it has been changed, has expired or is for other colours)
+        :return: colour ids, scores, target, highest
+        """
+
+        if not isinstance(token, str):
+            raise ValueError("token must be a string")
+
+        try:
+            data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except ValueError:
+            raise ValueError("token is not valid base64") from None
+
+        if len(data) != NONCE_BYTES + TOKEN_PAYLOAD.size + TAG_BYTES:
+            raise ValueError("token is the wrong length")
+
+        sealed, tag = data[:-TAG_BYTES], data[-TAG_BYTES:]
+        expected = hmac.digest(self.sign_key, sealed, "sha256")[:TAG_BYTES]
+        if not hmac.compare_digest(tag, expected):
+            raise ValueError("token signature does not match")
+
+        nonce = sealed[:NONCE_BYTES]
+        fields = TOKEN_PAYLOAD.unpack(self.crypt(nonce, sealed[NONCE_BYTES:]))
+        version, fingerprint, issued = fields[:3]
+
+        if version != TOKEN_VERSION:
+            raise ValueError(f"token is version {version} (expected {TOKEN_VERSION})")
+        if fingerprint != self.fingerprint:
+            raise ValueError("token is for a different colour list")
+        if time.time() - issued > self.token_seconds:
+            raise ValueError("token has expired")
+
+        colour_ids = fields[3:3 + ROUND_SIZE]
+        scores = fields[3 + ROUND_SIZE:3 + 2 * ROUND_SIZE]
+        target, highest = fields[-2:]
+        return colour_ids, scores, target, highest
+
+
+class RoundAPI:
+    """
+    The API's logic (kept apart from the HTTP handling)
+    """
+
+    def __init__(self, catalogue, tokens):
+        self.catalogue = catalogue
+        self.tokens = tokens
+
+        # each server thread has its own generator
+        self.local = threading.local()
+
+    def rng(self):
+        rng = getattr(self.local, "rng", None)
+        if rng is None:
+            rng = self.local.rng = random.Random(os.urandom(16))
+        return rng
+
+    def new_round(self):
+        """
+        :return: response for GET /round
+        """
+
+        catalogue = self.catalogue
+        colour_ids = catalogue.draw_round_ids(self.rng())
+        scores = [catalogue.scores[colour_id] for colour_id in colour_ids]
+        target, highest = round_targets(scores)
+
+        names = catalogue.names
+        return {"colours": [[names[colour_id], catalogue.fg(colour_id)]
+                            for colour_id in colour_ids],
+                "target": target,
+                "token": self.tokens.issue(colour_ids, scores, target, highest)}
+
+    def answer(self, request):
+        """
+        :param request: decoded JSON body of POST /answer
+        :return: response (raises ValueError for a bad request / token)
+        """
+
+        if not isinstance(request, dict):
+            raise ValueError("body must be a JSON object")
+
+        choice = request.get("choice")
+        if (not isinstance(choice, int) or isinstance(choice, bool)
+                or not 0 <= choice < ROUND_SIZE):
+            raise ValueError(f"choice must be 0 to {ROUND_SIZE - 1}")
+
+        colour_ids, scores, target, highest = self.tokens.read(request.get("token"))
+        score = scores[choice]
+        won = score >= target
+        return {"colour": self.catalogue.names[colour_ids[choice]], "score": score,
+                "won": won, "points": score if won else 0, "target": target,
+                "highest": highest}
+
+
+class RoundRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests
+    protocol_version = "HTTP/1.1"
+    server_version = "ColourQuest/1"
+
+    # headers and body are written separately - without this the body waits
+    # ~40 ms for the client's delayed ACK on a kept-alive connection...
+    disable_nagle_algorithm = True
+
+    # set on the class by make_server
+    api = None
+    quiet = True
+
+    def send_json(self, status, body):
+        data = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/round":
+            self.send_json(200, self.api.new_round())
+        elif self.path == "/health":
+            self.send_json(200, {"ok": True})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        # without a usable length there's no telling where the body ends,
+        # so the connection is closed as well
+        length = (self.headers.get("Content-Length") or "0").strip()
+        if not (length.isascii() and length.isdigit()):
+            self.send_json(400, {"error": "Content-Length must be a whole number"})
+            self.close_connection = True
+            return
+
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            self.send_json(413, {"error": "request too large"})
+            self.close_connection = True
+            return
+
+        body = self.rfile.read(length)
+        if self.path != "/answer":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self.send_json(400, {"error": "body is not valid JSON"})
+            return
+
+        try:
+            self.send_json(200, self.api.answer(request))
+        except ValueError as error:
+            self.send_json(400, {"error": str(error)})
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class RoundServer(ThreadingHTTPServer):
+    # the default listen backlog of 5 makes clients that connect at
+    # the same time wait a second for the kernel to retry...
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def make_server(api, host="127.0.0.1", port=DEFAULT_PORT, quiet=True):
+    """
+    :return: RoundServer (not started - call serve_forever)
+    """
+    handler = type("Handler", (RoundRequestHandler,), {"api": api, "quiet": quiet})
+    return RoundServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest stateless round API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--secret", default=os.environ.get("COLOUR_QUEST_SECRET"),
+                        help="secret shared by every server (default: "
+                             "$COLOUR_QUEST_SECRET, or a random one for a single server)")
+    parser.add_argument("--token-seconds", type=int, default=DEFAULT_TOKEN_SECONDS,
+                        help="how long a round can be answered for")
+    parser.add_argument("--csv", default=CSV_FILE, help="colour list to use")
+    parser.add_argument("--procedural", action="store_true",
+                        help="play with every 24 bit colour instead of the csv list")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    secret = args.secret
+    if not secret:
+        secret = os.urandom(32)
+        print("no --secret given - using a random one (tokens only work on this server)")
+
+    catalogue = procedural_catalogue() if args.procedural else get_colours(args.csv)
+    api = RoundAPI(catalogue, RoundTokens(secret, catalogue, args.token_seconds))
+
+    server = make_server(api, args.host, args.port, quiet=not args.verbose)
+    print(f"Colour Quest round API on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Throughput benchmark for the round API (round_api.py). Each client thread
+keeps one HTTP/1.1 connection open and plays rounds back to back
+(GET /round then POST /answer), so the numbers show the server rather than
+the cost of opening connections.
+
+Examples:
+    python round_api_bench.py --local --clients 8 --seconds 10
+    python round_api_bench.py --host 10.0.0.5 --port 8080 --clients 32 --json
+    python round_api_bench.py --local --new-connections   # compare with no keep-alive
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import threading
+import time
+
+from colour_catalogue import CSV_FILE, ROUND_SIZE, get_colours
+from latency_histogram import LatencyHistogram
+from procedural_catalogue import procedural_catalogue
+from round_api import DEFAULT_PORT, RoundAPI, RoundTokens, make_server
+
+
+class ClientStats:
+    """
+    What one client thread did (kept per thread so nothing is shared while timing)
+    """
+
+    __slots__ = ("requests", "errors", "rounds_won", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.rounds_won = 0
+
+        # ns for each request (round and answer alike)
+        self.latency = LatencyHistogram()
+
+
+def request_json(connection, method, path, body=None):
+    """
+    :return: status, decoded response
+    """
+
+    headers = {}
+    if body is not None:
+        body = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+
+    connection.request(method, path, body, headers)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def run_client(host, port, deadline_ns, keep_alive, rng, stats):
+    """
+    Plays rounds until the deadline (time.perf_counter_ns)
+    """
+
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    clock = time.perf_counter_ns
+    try:
+        while clock() < deadline_ns:
+            if not keep_alive:
+                connection.close()
+
+            try:
+                start = clock()
+                status, round_info = request_json(connection, "GET", "/round")
+                middle = clock()
+                if status != 200:
+                    stats.errors += 1
+                    continue
+
+                status, result = request_json(connection, "POST", "/answer",
+                                              {"token": round_info["token"],
+                                               "choice": rng.randrange(ROUND_SIZE)})
+                end = clock()
+            except (OSError, http.client.HTTPException, ValueError):
+                stats.errors += 1
+                connection.close()
+                continue
+
+            stats.requests += 2
+            stats.latency.record(middle - start)
+            stats.latency.record(end - middle)
+            if status == 200:
+                stats.rounds_won += result["won"]
+            else:
+                stats.errors += 1
+    finally:
+        connection.close()
+
+
+def run_benchmark(host, port, clients, seconds, keep_alive=True, seed=None):
+    """
+    Runs the client threads for a number of seconds
+    :return: summary dictionary
+    """
+
+    rng = random.Random(seed)
+    all_stats = [ClientStats() for _ in range(clients)]
+
+    start = time.perf_counter()
+    deadline_ns = time.perf_counter_ns() + int(seconds * 1e9)
+    threads = [threading.Thread(target=run_client,
+                                args=(host, port, deadline_ns, keep_alive,
+                                      random.Random(rng.getrandbits(64)), stats),
+                                daemon=True)
+               for stats in all_stats]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latency = LatencyHistogram()
+    for stats in all_stats:
+        latency.merge(stats.latency)
+    latency = latency.summary()
+    requests = sum(stats.requests for stats in all_stats)
+
+    return {"clients": clients, "keep_alive": keep_alive, "seconds": elapsed,
+            "requests": requests, "rounds": requests // 2,
+            "errors": sum(stats.errors for stats in all_stats),
+            "requests_per_sec": requests / elapsed if elapsed else 0,
+            "p50_ms": latency["p50"], "p99_ms": latency["p99"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest round API benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--local", action="store_true",
+                        help="start a server in this process instead of connecting to one")
+    parser.add_argument("--csv", default=CSV_FILE, help="colour list (with --local)")
+    parser.add_argument("--procedural", action="store_true",
+                        help="every 24 bit colour instead of a csv (with --local)")
+    parser.add_argument("--clients", type=int, default=8, help="connections at once")
+    parser.add_argument("--seconds", type=float, default=5, help="how long to run for")
+    parser.add_argument("--new-connections", action="store_true",
+                        help="open a new connection for every round (no keep-alive)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON instead of text")
+    args = parser.parse_args(argv)
+
+    if args.clients < 1 or args.seconds <= 0:
+        parser.error("--clients and --seconds must be more than zero")
+
+    server = None
+    host, port = args.host, args.port
+    if args.local:
+        catalogue = procedural_catalogue() if args.procedural else get_colours(args.csv)
+        api = RoundAPI(catalogue, RoundTokens(os.urandom(32), catalogue))
+        server = make_server(api, "127.0.0.1", 0)
+        host, port = server.server_address[:2]
+        threading.Thread(target=server.serve_forever, name="round-api", daemon=True).start()
+
+    try:
+        summary = run_benchmark(host, port, args.clients, args.seconds,
+                                not args.new_connections, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    connections = "keep-alive" if summary["keep_alive"] else "new connection per round"
+    print(f"{summary['clients']} clients, {connections} ({summary['seconds']:.2f} s)")
+    print(f"  Requests: {summary['requests']:,} (errors: {summary['errors']:,})")
+    print(f"  Requests / sec: {summary['requests_per_sec']:,.0f}")
+    print(f"  Latency: p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
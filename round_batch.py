@@ -0,0 +1,167 @@
+import numpy as np
+
+from colour_catalogue import ROUND_SIZE, get_colours
+from procedural_catalogue import ComputedColumn
+
+# rounds worked out at a time (keeps the temporary arrays a sensible size)
+CHUNK_ROUNDS = 1 << 20
+
+
+class RoundBatch:
+    """
+    Lots of rounds at once. Row i of each array belongs to round i.
+    """
+
+    __slots__ = ("colour_ids", "scores", "medians", "highest")
+
+    def __init__(self, colour_ids, scores, medians, highest):
+        self.colour_ids = colour_ids
+        self.scores = scores
+        self.medians = medians
+        self.highest = highest
+
+    def __len__(self):
+        return len(self.medians)
+
+
+def catalogue_arrays(catalogue):
+    """
+    Views of the catalogue's score index as NumPy arrays (no copying)
+    :param catalogue: ColourCatalogue
+    :return: order, bucket starts and scores arrays (order is None when the
+    ids are already in score order, and scores is left as a ComputedColumn
+    for a procedural catalogue)
+    """
+
+    # works for arrays and for memoryviews of a compiled catalogue
+    order = catalogue.order
+    order = None if isinstance(order, range) else np.asarray(order)
+    bucket_starts = np.asarray(catalogue.bucket_starts)
+
+    scores = catalogue.scores
+    if not isinstance(scores, ComputedColumn):
+        scores = np.asarray(scores)
+    return order, bucket_starts, scores
+
+
+def column_values(column, colour_ids):
+    """
+    :param column: NumPy array or ComputedColumn
+    :param colour_ids: array of colour ids
+    :return: the column's values for those ids
+    """
+    if isinstance(column, ComputedColumn):
+        return column.batch(colour_ids)
+    return column[colour_ids]
+
+
+def foreground_ids(catalogue, colour_ids):
+    """
+    :param catalogue: ColourCatalogue
+    :param colour_ids: array of colour ids
+    :return: array of positions in catalogue.fg_palette (text colour for each id)
+    """
+    fg_ids = catalogue.fg_ids
+    if not isinstance(fg_ids, ComputedColumn):
+        fg_ids = np.asarray(fg_ids)
+    return column_values(fg_ids, colour_ids)
+
+
+def draw_ids(uniforms, order, bucket_starts):
+    """
+    Vectorised version of ColourCatalogue.draw_round_ids. Given the same
+    random numbers (uniforms[i, k] used for pick k of round i) it chooses
+    exactly the same colours.
+    :param uniforms: (n, 4) array of random numbers in [0, 1)
+    :param order: colour ids sorted by score (None if ids are positions)
+    :param bucket_starts: where each score starts in order (plus the end)
+    :return: (n, 4) array of colour ids
+    """
+
+    n = len(uniforms)
+    total = int(bucket_starts[-1])
+    starts = bucket_starts.astype(np.int64)
+
+    colour_ids = np.empty((n, ROUND_SIZE), dtype=np.int64)
+
+    # used up ranges of 'order' for each round, kept sorted by start
+    taken_start = np.empty((n, ROUND_SIZE), dtype=np.int64)
+    taken_end = np.empty((n, ROUND_SIZE), dtype=np.int64)
+    remaining = np.full(n, total, dtype=np.int64)
+
+    for pick in range(ROUND_SIZE):
+        position = (uniforms[:, pick] * remaining).astype(np.int64)
+
+        # skip over the used up ranges (sorted, so the scalar 'break' isn't needed)
+        for used in range(pick):
+            start = taken_start[:, used]
+            position += np.where(position >= start, taken_end[:, used] - start, 0)
+
+        colour_ids[:, pick] = position if order is None else order[position]
+
+        # rule out the rest of the colours with the same score
+        bucket = np.searchsorted(starts, position, side="right")
+        taken_start[:, pick] = starts[bucket - 1]
+        taken_end[:, pick] = starts[bucket]
+        remaining -= taken_end[:, pick] - taken_start[:, pick]
+
+        if pick:
+            by_start = np.argsort(taken_start[:, :pick + 1], axis=1, kind="stable")
+            taken_start[:, :pick + 1] = np.take_along_axis(taken_start[:, :pick + 1], by_start, axis=1)
+            taken_end[:, :pick + 1] = np.take_along_axis(taken_end[:, :pick + 1], by_start, axis=1)
+
+    return colour_ids
+
+
+def round_targets(scores):
+    """
+    Vectorised version of game_session.round_targets
+    :param scores: (n, 4) array of round scores
+    :return: medians (rounded half up like round_ans) and highest scores
+    """
+
+    sorted_scores = np.sort(scores, axis=1)
+    medians = (sorted_scores[:, 1] + sorted_scores[:, 2] + 1) // 2
+    return medians, sorted_scores[:, -1]
+
+
+def generate_rounds(n, seed=None, catalogue=None):
+    """
+    Generates lots of rounds using the same rules as get_round_colours
+    (four colours, all with different scores, median target)
+    :param n: number of rounds
+    :param seed: seed for the NumPy random generator (None for a random seed)
+    :param catalogue: colours to choose from (defaults to the csv file)
+    :return: RoundBatch with (n, 4) colour ids and scores, plus
+    medians and highest scores
+    """
+
+    if n < 0:
+        raise ValueError("number of rounds can't be negative")
+
+    if catalogue is None:
+        catalogue = get_colours()
+
+    if catalogue.distinct_scores < ROUND_SIZE:
+        raise ValueError(f"the colour list needs at least {ROUND_SIZE} "
+                         f"different scores to make a round (it has "
+                         f"{catalogue.distinct_scores})")
+
+    rng = np.random.default_rng(seed)
+    order, bucket_starts, catalogue_scores = catalogue_arrays(catalogue)
+
+    colour_ids = np.empty((n, ROUND_SIZE), dtype=np.int64)
+    scores = np.empty((n, ROUND_SIZE), dtype=np.int64)
+    medians = np.empty(n, dtype=np.int64)
+    highest = np.empty(n, dtype=np.int64)
+
+    for first in range(0, n, CHUNK_ROUNDS):
+        last = min(first + CHUNK_ROUNDS, n)
+        uniforms = rng.random((last - first, ROUND_SIZE))
+
+        chunk_ids = draw_ids(uniforms, order, bucket_starts)
+        colour_ids[first:last] = chunk_ids
+        scores[first:last] = column_values(catalogue_scores, chunk_ids)
+        medians[first:last], highest[first:last] = round_targets(scores[first:last])
+
+    return RoundBatch(colour_ids, scores, medians, highest)
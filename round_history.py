@@ -0,0 +1,184 @@
+from array import array
+import os
+import tempfile
+
+# rounds kept in memory before older rounds are moved to a temporary file
+DEFAULT_MEMORY_ROUNDS = 1 << 20
+
+# each round is stored as two unsigned 32 bit numbers (score, highest)
+ROUND_TYPE = "I"
+ROUND_BYTES = 2 * array(ROUND_TYPE).itemsize
+
+
+class ColumnView:
+    """
+    Read only list-like view of one column (scores or highest scores)
+    """
+
+    def __init__(self, history, column):
+        self.history = history
+        self.column = column
+
+    def __len__(self):
+        return len(self.history)
+
+    def __getitem__(self, index):
+        """
+        :return: value for a round, or a list of values for a slice
+        """
+        if isinstance(index, slice):
+            column = self.column
+            return [round_values[column] for round_values in self.history[index]]
+        return self.history[index][self.column]
+
+    def __iter__(self):
+        column = self.column
+        for round_values in self.history:
+            yield round_values[column]
+
+    def __repr__(self):
+        return f"ColumnView({self.column}, {len(self)} rounds)"
+
+
+class RoundHistory:
+    """
+    Score and highest possible score for every round played, in order.
+
+    The most recent rounds are kept in a compact array. Once there are more
+    than memory_rounds of them, they are written to a temporary file as a
+    fixed width chunk, so memory use stays the same however long the game
+    goes on. Reading works the same way wherever the rounds are.
+    """
+
+    def __init__(self, memory_rounds=DEFAULT_MEMORY_ROUNDS):
+        if memory_rounds < 1:
+            raise ValueError("memory_rounds must be at least 1")
+
+        self.memory_rounds = memory_rounds
+
+        # score, highest, score, highest... for rounds not yet spilled
+        self.recent = array(ROUND_TYPE)
+
+        self.spill_file = None
+        self.spilled_rounds = 0
+
+        self.scores = ColumnView(self, 0)
+        self.high_scores = ColumnView(self, 1)
+
+    def __len__(self):
+        return self.spilled_rounds + len(self.recent) // 2
+
+    def append(self, score, highest):
+        """
+        Adds a round to the end of the history
+        :param score: points earned (0 for a lost round)
+        :param highest: best possible score for the round
+        """
+
+        recent = self.recent
+        recent.append(score)
+        recent.append(highest)
+
+        if len(recent) >= 2 * self.memory_rounds:
+            self.spill()
+
+    def spill(self):
+        """
+        Moves the rounds held in memory to the end of the temporary file
+        """
+
+        if not self.recent:
+            return
+
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="colour_quest_history_")
+
+        self.spill_file.seek(0, os.SEEK_END)
+        self.recent.tofile(self.spill_file)
+        self.spill_file.flush()
+
+        self.spilled_rounds += len(self.recent) // 2
+        self.recent = array(ROUND_TYPE)
+
+    def read_spilled(self, first, count):
+        """
+        :param first: first round to read from the file
+        :param count: number of rounds to read
+        :return: array of score, highest, score, highest...
+        """
+
+        values = array(ROUND_TYPE)
+        self.spill_file.seek(first * ROUND_BYTES)
+        values.fromfile(self.spill_file, count * 2)
+        return values
+
+    def __getitem__(self, index):
+        """
+        :return: (score, highest) for a round (negative indexes count from the
+        end), or a list of them for a slice
+        """
+
+        if isinstance(index, slice):
+            return self.rounds_in(index)
+
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("round history index out of range")
+
+        if index >= self.spilled_rounds:
+            position = 2 * (index - self.spilled_rounds)
+            return self.recent[position], self.recent[position + 1]
+
+        values = self.read_spilled(index, 1)
+        return values[0], values[1]
+
+    def rounds_in(self, index):
+        """
+        :param index: slice of rounds
+        :return: list of (score, highest) for the rounds in the slice
+        """
+
+        first, stop, step = index.indices(len(self))
+        if step != 1:
+            return [self[position] for position in range(first, stop, step)]
+        if first >= stop:
+            return []
+
+        # one read for the spilled part, then the rounds still in memory
+        values = array(ROUND_TYPE)
+        if first < self.spilled_rounds:
+            values = self.read_spilled(first, min(stop, self.spilled_rounds) - first)
+        recent_first = max(first - self.spilled_rounds, 0)
+        recent_stop = max(stop - self.spilled_rounds, 0)
+        values += self.recent[2 * recent_first:2 * recent_stop]
+
+        return list(zip(values[::2], values[1::2]))
+
+    def __iter__(self):
+        # spilled rounds are read back one memory-sized chunk at a time
+        for first in range(0, self.spilled_rounds, self.memory_rounds):
+            count = min(self.memory_rounds, self.spilled_rounds - first)
+            values = self.read_spilled(first, count)
+            for position in range(0, len(values), 2):
+                yield values[position], values[position + 1]
+
+        recent = self.recent
+        for position in range(0, len(recent), 2):
+            yield recent[position], recent[position + 1]
+
+    @property
+    def spilled(self):
+        return self.spill_file is not None
+
+    def close(self):
+        """
+        Empties the history and deletes the temporary file (if there is one)
+        """
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+        self.spilled_rounds = 0
+        self.recent = array(ROUND_TYPE)
@@ -0,0 +1,156 @@
+from collections import deque
+import json
+import queue
+import threading
+import time
+
+# trace levels (same numbers as the logging module)
+DEBUG = 10
+INFO = 20
+
+LEVEL_NAMES = {"debug": DEBUG, "info": INFO}
+
+
+class RoundGenerated:
+    """
+    A new round has been set up
+    """
+
+    kind = "round_generated"
+    level = DEBUG
+
+    __slots__ = ("time", "round_number", "colour_names", "target", "highest")
+
+    def __init__(self, round_number, colour_names, target, highest):
+        self.time = time.time()
+        self.round_number = round_number
+        self.colour_names = colour_names
+        self.target = target
+        self.highest = highest
+
+    def to_dict(self):
+        return {"event": self.kind, "time": self.time, "round": self.round_number,
+                "colours": self.colour_names, "target": self.target,
+                "highest": self.highest}
+
+
+class ChoiceMade:
+    """
+    A colour has been chosen
+    """
+
+    kind = "choice_made"
+    level = INFO
+
+    __slots__ = ("time", "round_number", "choice", "colour_name", "score", "won")
+
+    def __init__(self, round_number, choice, colour_name, score, won):
+        self.time = time.time()
+        self.round_number = round_number
+        self.choice = choice
+        self.colour_name = colour_name
+        self.score = score
+        self.won = won
+
+    def to_dict(self):
+        return {"event": self.kind, "time": self.time, "round": self.round_number,
+                "choice": self.choice, "colour": self.colour_name,
+                "score": self.score, "won": self.won}
+
+
+class GameOver:
+    """
+    The last round has been played
+    """
+
+    kind = "game_over"
+    level = INFO
+
+    __slots__ = ("time", "rounds_played", "rounds_won", "total_score", "max_possible")
+
+    def __init__(self, rounds_played, rounds_won, total_score, max_possible):
+        self.time = time.time()
+        self.rounds_played = rounds_played
+        self.rounds_won = rounds_won
+        self.total_score = total_score
+        self.max_possible = max_possible
+
+    def to_dict(self):
+        return {"event": self.kind, "time": self.time,
+                "rounds_played": self.rounds_played, "rounds_won": self.rounds_won,
+                "total_score": self.total_score, "max_possible": self.max_possible}
+
+
+class JsonlSink:
+    """
+    Writes events to a file (one JSON object per line) on a background
+    thread, so the game never waits for the disk
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.write_events,
+                                       name="round-trace-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, event):
+        self.queue.put(event)
+
+    def write_events(self):
+        with open(self.path, "a") as file:
+            while True:
+                event = self.queue.get()
+                if event is None:
+                    break
+
+                file.write(json.dumps(event.to_dict()) + "\n")
+
+                # only flush once we've caught up with the game
+                if self.queue.empty():
+                    file.flush()
+
+    def close(self):
+        """
+        Writes anything still waiting and stops the writer thread
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+class RoundTracer:
+    """
+    Keeps the most recent round events in a ring buffer (and optionally
+    sends them to a sink). Events below the tracer's level are ignored.
+    """
+
+    def __init__(self, capacity=1000, level=INFO, sink=None):
+        self.level = level
+        self.sink = sink
+        self.buffer = deque(maxlen=capacity)
+
+    def wants(self, level):
+        """
+        :return: True if events at this level will be kept (check this
+        before making an event so that ignored events cost nothing)
+        """
+        return level >= self.level
+
+    def record(self, event):
+        if event.level < self.level:
+            return
+
+        self.buffer.append(event)
+        if self.sink is not None:
+            self.sink.write(event)
+
+    def events(self):
+        """
+        :return: the buffered events, oldest first
+        """
+        return list(self.buffer)
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
@@ -0,0 +1,135 @@
+from array import array
+import struct
+import sys
+
+from game_session import CHOICE_MADE
+
+# each recorded game is: header | one byte per round (choice, won) |
+# one unsigned 32 bit score per round (little endian)
+RECORDING_MAGIC = b"CQSR"
+RECORDING_VERSION = 1
+
+# magic | version | seed | catalogue fingerprint | rounds wanted | rounds played
+RECORDING_HEADER = struct.Struct("<4sHQIII")
+
+# a round's byte holds the colour chosen (0 - 3) and whether it won
+CHOICE_MASK = 0b011
+WON_FLAG = 0b100
+
+MAX_SEED = (1 << 64) - 1
+
+
+class Recording:
+    """
+    Everything needed to play a game again: the seed, the colours it was
+    played with (as a fingerprint) and the choices made, plus the scores
+    so a replay can check it got the same results
+    """
+
+    __slots__ = ("seed", "fingerprint", "rounds_wanted", "moves", "scores")
+
+    def __init__(self, seed, fingerprint, rounds_wanted, moves=None, scores=None):
+        self.seed = seed
+        self.fingerprint = fingerprint
+        self.rounds_wanted = rounds_wanted
+        self.moves = bytearray() if moves is None else moves
+        self.scores = array("I") if scores is None else scores
+
+    @property
+    def rounds_played(self):
+        return len(self.moves)
+
+    def to_bytes(self):
+        scores = self.scores
+        if sys.byteorder == "big":
+            scores = array("I", scores)
+            scores.byteswap()
+
+        return (RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, self.seed,
+                                      self.fingerprint, self.rounds_wanted,
+                                      len(self.moves))
+                + bytes(self.moves) + scores.tobytes())
+
+    @classmethod
+    def from_buffer(cls, data, offset=0):
+        """
+        :param data: bytes holding one or more recordings
+        :param offset: where the recording starts
+        :return: Recording, offset of whatever comes after it
+        """
+
+        if len(data) - offset < RECORDING_HEADER.size:
+            raise ValueError(f"recording at byte {offset} is cut short")
+
+        (magic, version, seed, fingerprint, rounds_wanted,
+         rounds_played) = RECORDING_HEADER.unpack_from(data, offset)
+
+        if magic != RECORDING_MAGIC:
+            raise ValueError(f"no recording at byte {offset} (not a recording file?)")
+        if version != RECORDING_VERSION:
+            raise ValueError(f"recording at byte {offset} is version {version} "
+                             f"(expected {RECORDING_VERSION})")
+
+        moves_start = offset + RECORDING_HEADER.size
+        scores_start = moves_start + rounds_played
+        end = scores_start + 4 * rounds_played
+        if end > len(data):
+            raise ValueError(f"recording at byte {offset} is cut short")
+
+        scores = array("I")
+        scores.frombytes(data[scores_start:end])
+        if sys.byteorder == "big":
+            scores.byteswap()
+
+        return cls(seed, fingerprint, rounds_wanted,
+                   bytes(data[moves_start:scores_start]), scores), end
+
+
+class SessionRecorder:
+    """
+    Records each choice made in a GameSession as it is played
+    """
+
+    def __init__(self, session):
+        """
+        :param session: GameSession (must have a seed, ie: its own generator)
+        """
+
+        if session.seed is None:
+            raise ValueError("only games with a seed can be recorded")
+        if not 0 <= session.seed <= MAX_SEED:
+            raise ValueError("only games with a seed between 0 and 2**64 - 1 can be recorded")
+
+        self.recording = Recording(session.seed, session.catalogue.fingerprint(),
+                                   session.rounds_wanted)
+        session.subscribe(self.choice_made)
+
+    def choice_made(self, kind, result):
+        if kind == CHOICE_MADE:
+            self.recording.moves.append(result.choice | (WON_FLAG if result.won else 0))
+            self.recording.scores.append(result.score)
+
+
+def append_recording(path, recording):
+    """
+    Adds a recorded game to the end of a recording file
+    """
+    with open(path, "ab") as file:
+        file.write(recording.to_bytes())
+
+
+def read_recordings(path):
+    """
+    :param path: recording file
+    :return: list of every Recording in the file
+    """
+
+    with open(path, "rb") as file:
+        data = file.read()
+
+    recordings = []
+    offset = 0
+    while offset < len(data):
+        recording, offset = Recording.from_buffer(data, offset)
+        recordings.append(recording)
+    return recordings
@@ -0,0 +1,280 @@
+"""
+Monte Carlo simulator - plays Colour Quest strategies over lots of rounds
+using the real colour list and round rules (no window needed).
+
+Examples:
+    python simulate.py --rounds 1000000
+    python simulate.py --strategy highest-hex red-first --rounds 50000000 --workers 8
+    python simulate.py --strategy my_strategies:always_first
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import json
+import os
+import random
+import time
+
+from colour_catalogue import CSV_FILE, NO_RGB, get_colours
+from game_session import round_targets
+
+# rounds handed to a worker at a time
+DEFAULT_CHUNK = 1_000_000
+
+
+def known_values(values):
+    """
+    :return: colour values with NO_RGB swapped for -1 (so a colour that
+    isn't a hex code never has the most of anything)
+    """
+    return [-1 if value == NO_RGB else value for value in values]
+
+
+# Strategies - each one is given the names of the four colours, their
+# values as 0xRRGGBB numbers (NO_RGB for names that aren't hex codes) and
+# a random number generator and returns the index chosen
+
+def random_strategy(names, values, rng):
+    return int(rng.random() * len(names))
+
+
+def highest_hex_strategy(names, values, rng):
+    """
+    Always picks the colour with the biggest hex code
+    """
+    values = known_values(values)
+    return values.index(max(values))
+
+
+def red_first_strategy(names, values, rng):
+    """
+    The hint: red is the first colour in the code, so pick the colour with the
+    most red in it (a random one of them if there is a tie)
+    """
+    reds = [value >> 16 for value in known_values(values)]
+    most_red = max(reds)
+    best = [count for count, red in enumerate(reds) if red == most_red]
+    return best[int(rng.random() * len(best))]
+
+
+STRATEGIES = {
+    "random": random_strategy,
+    "highest-hex": highest_hex_strategy,
+    "red-first": red_first_strategy,
+}
+
+
+def resolve_strategy(strategy):
+    """
+    :param strategy: a callable, a built in strategy name or 'module:function'
+    :return: strategy function
+    """
+
+    if callable(strategy):
+        return strategy
+
+    if strategy in STRATEGIES:
+        return STRATEGIES[strategy]
+
+    module_name, _, function_name = strategy.partition(":")
+    if not function_name:
+        raise ValueError(f"unknown strategy {strategy!r} - choose from "
+                         f"{', '.join(STRATEGIES)} or use 'module:function'")
+
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def task_seed(seed, task):
+    """
+    Seed for one chunk of rounds, so results don't depend on which
+    worker happens to pick up which chunk
+    """
+    return f"{seed}:{task}"
+
+
+def play_rounds(strategy, rounds, seed, csv_path=CSV_FILE):
+    """
+    Plays a number of rounds with one strategy (runs inside a worker process)
+    :param strategy: strategy (see resolve_strategy)
+    :param rounds: number of rounds to play
+    :param seed: seed for this chunk's random number generator
+    :param csv_path: colour list to play with
+    :return: dictionary of totals for these rounds
+    """
+
+    choose = resolve_strategy(strategy)
+    catalogue = get_colours(csv_path)
+    names = catalogue.names
+    scores = catalogue.scores
+    draw_round_ids = catalogue.draw_round_ids
+    rng = random.Random(seed)
+
+    rgb = catalogue.rgb
+
+    rounds_won = 0
+    total_score = 0
+    max_possible = 0
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        round_ids = draw_round_ids(rng)
+        round_scores = [scores[colour_id] for colour_id in round_ids]
+        target, highest = round_targets(round_scores)
+
+        choice = choose([names[colour_id] for colour_id in round_ids],
+                        [rgb[colour_id] for colour_id in round_ids], rng)
+        score = round_scores[choice]
+
+        # same rules as the game - you only keep your points if you win
+        if score >= target:
+            rounds_won += 1
+            total_score += score
+        max_possible += highest
+
+    return {"pid": os.getpid(), "rounds": rounds, "rounds_won": rounds_won,
+            "total_score": total_score, "max_possible": max_possible,
+            "seconds": time.perf_counter() - start}
+
+
+def summarise(strategy_name, results, wall_seconds):
+    """
+    Adds up the results from each chunk
+    :return: dictionary of totals and rates for the strategy
+    """
+
+    rounds = sum(item["rounds"] for item in results)
+    rounds_won = sum(item["rounds_won"] for item in results)
+    total_score = sum(item["total_score"] for item in results)
+    max_possible = sum(item["max_possible"] for item in results)
+
+    # rounds / sec for each worker process (time spent actually playing)
+    per_worker = {}
+    for item in results:
+        worker = per_worker.setdefault(item["pid"], {"rounds": 0, "seconds": 0.0})
+        worker["rounds"] += item["rounds"]
+        worker["seconds"] += item["seconds"]
+
+    worker_rates = [worker["rounds"] / worker["seconds"]
+                    for worker in per_worker.values() if worker["seconds"]]
+
+    return {
+        "strategy": strategy_name,
+        "rounds": rounds,
+        "rounds_won": rounds_won,
+        "success_rate": rounds_won / rounds * 100 if rounds else 0,
+        "total_score": total_score,
+        "max_possible": max_possible,
+        "mean_score": total_score / rounds if rounds else 0,
+        "score_ratio": total_score / max_possible if max_possible else 0,
+        "wall_seconds": wall_seconds,
+        "rounds_per_sec": rounds / wall_seconds if wall_seconds else 0,
+        "worker_rounds_per_sec": worker_rates,
+    }
+
+
+def simulate(strategy, rounds, workers=None, seed=None,
+             chunk=DEFAULT_CHUNK, csv_path=CSV_FILE, executor=None):
+    """
+    Plays a strategy over lots of rounds, spread across worker processes
+    :param strategy: strategy (see resolve_strategy)
+    :param rounds: total number of rounds
+    :param workers: number of worker processes (defaults to number of CPUs)
+    :param seed: base seed (chunk seeds are made from it)
+    :param chunk: rounds per task handed to a worker
+    :param csv_path: colour list to play with
+    :param executor: existing ProcessPoolExecutor to use (optional)
+    :return: summary dictionary (see summarise)
+    """
+
+    if rounds < 1:
+        raise ValueError("please simulate at least one round")
+
+    # check the strategy exists before starting any processes
+    resolve_strategy(strategy)
+    strategy_name = strategy if isinstance(strategy, str) else strategy.__name__
+
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    chunk_sizes = [chunk] * (rounds // chunk)
+    if rounds % chunk:
+        chunk_sizes.append(rounds % chunk)
+
+    start = time.perf_counter()
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(play_rounds, strategy, size,
+                                   task_seed(seed, task), csv_path)
+                   for task, size in enumerate(chunk_sizes)]
+        results = [future.result() for future in futures]
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    summary = summarise(strategy_name, results, time.perf_counter() - start)
+    summary["seed"] = seed
+    return summary
+
+
+def print_summary(summary):
+    """
+    Prints the results in the same style as the stats window
+    """
+
+    worker_rates = summary["worker_rounds_per_sec"]
+    mean_worker_rate = sum(worker_rates) / len(worker_rates) if worker_rates else 0
+
+    print(f"Strategy: {summary['strategy']}")
+    print(f"  Success Rate: {summary['rounds_won']} / {summary['rounds']}"
+          f" ({summary['success_rate']:.0f}%)")
+    print(f"  Total Score: {summary['total_score']}")
+    print(f"  Maximum Possible Score: {summary['max_possible']}")
+    print(f"  Score / Maximum: {summary['score_ratio']:.3f}")
+    print(f"  Average Score: {summary['mean_score']:.2f}")
+    print(f"  Rounds / sec: {summary['rounds_per_sec']:,.0f} overall, "
+          f"{mean_worker_rate:,.0f} per worker ({len(worker_rates)} workers)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Colour Quest strategy simulator")
+    parser.add_argument("--strategy", nargs="+", default=["random"],
+                        help=f"strategies to play: {', '.join(STRATEGIES)} "
+                             f"or module:function")
+    parser.add_argument("--rounds", type=int, default=1_000_000,
+                        help="rounds to play for each strategy")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK,
+                        help="rounds given to a worker at a time")
+    parser.add_argument("--csv", default=CSV_FILE, help="colour list to use")
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON instead of text")
+    args = parser.parse_args(argv)
+
+    if args.rounds < 1 or args.chunk < 1:
+        parser.error("--rounds and --chunk must be whole numbers more than zero")
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for strategy in args.strategy:
+            summary = simulate(strategy, args.rounds, seed=seed, chunk=args.chunk,
+                               csv_path=args.csv, executor=executor)
+            summaries.append(summary)
+            if not args.json:
+                print_summary(summary)
+
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        print(f"(seed {seed})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Tk event loop stall detector. A heartbeat scheduled with root.after
+measures how late each beat runs (the event loop's lag) - anything that
+blocks Tk (a slow callback, reading a big csv on Tk's thread...) shows up
+as a late beat.
+
+A beat can only run once the stall is over, so a watchdog thread also
+watches the beats: when one is overdue it samples Tk's thread while it is
+still stuck (the callback running, from callback_profiler if it is
+installed, and the stack from sys._current_frames).
+
+Example (see B_01_Colour_Quest_v2.py --stall-monitor / --debug-overlay):
+    monitor = StallMonitor(root, stall_ms=200, profiler=callback_profiler)
+    monitor.start()
+    ...
+    print(monitor.format_report())
+"""
+
+import json
+import sys
+import threading
+import time
+import tkinter
+import traceback
+
+from latency_histogram import NS_PER_MS, LatencyHistogram
+
+# time between heartbeats
+DEFAULT_INTERVAL_MS = 50
+
+# beats later than this count as a stall
+DEFAULT_STALL_MS = 200
+
+# stalls kept for the report (the longest ones)
+MAX_STALLS = 50
+
+# innermost stack frames kept from each sample
+STACK_FRAMES = 8
+
+# how often the overlay's text is updated
+OVERLAY_UPDATE_MS = 250
+
+
+class Stall:
+    """
+    One time the event loop was blocked
+    """
+
+    __slots__ = ("at", "lag", "callback", "stack")
+
+    def __init__(self, at, lag, callback=None, stack=None):
+        # seconds since the monitor started, and ns the beat was late by
+        self.at = at
+        self.lag = lag
+
+        # what Tk's thread was doing (from the watchdog - None if it missed it)
+        self.callback = callback
+        self.stack = stack
+
+    def to_dict(self):
+        return {"at": self.at, "ms": self.lag / NS_PER_MS, "callback": self.callback,
+                "stack": self.stack}
+
+
+class StallMonitor:
+    """
+    Measures the event loop's lag with a heartbeat and records stalls
+    """
+
+    def __init__(self, root, interval_ms=DEFAULT_INTERVAL_MS, stall_ms=DEFAULT_STALL_MS,
+                 profiler=None):
+        """
+        :param root: Tk root window (the beats run on its thread)
+        :param interval_ms: time between beats
+        :param stall_ms: beats later than this count as a stall
+        :param profiler: CallbackProfiler, to name the callback running (optional)
+        """
+
+        self.root = root
+        self.interval_ms = interval_ms
+        self.stall_ns = int(stall_ms * NS_PER_MS)
+        self.profiler = profiler
+
+        self.lag = LatencyHistogram()
+        self.stalls = []
+        self.stall_count = 0
+        self.last_lag = 0
+
+        self.started = None
+        self.expected = None
+        self.after_id = None
+
+        # set by the watchdog while a beat is overdue: (expected ns, callback, stack)
+        self.sample = None
+        self.main_thread_id = threading.get_ident()
+        self.stopping = threading.Event()
+        self.watchdog = None
+
+        self.overlay = None
+        self.overlay_label = None
+        self.overlay_id = None
+
+    def start(self):
+        """
+        Starts the heartbeat and the watchdog (call from Tk's thread)
+        """
+
+        if self.after_id is not None:
+            return
+
+        self.main_thread_id = threading.get_ident()
+        self.started = time.perf_counter_ns()
+        self.schedule()
+
+        self.stopping.clear()
+        self.watchdog = threading.Thread(target=self.watch, name="stall-watchdog",
+                                         daemon=True)
+        self.watchdog.start()
+
+    def stop(self):
+        self.stopping.set()
+        for after_id in (self.after_id, self.overlay_id):
+            if after_id is not None:
+                try:
+                    self.root.after_cancel(after_id)
+                except tkinter.TclError:
+                    pass
+        self.after_id = self.overlay_id = None
+
+    def schedule(self):
+        self.expected = time.perf_counter_ns() + self.interval_ms * NS_PER_MS
+        self.after_id = self.root.after(self.interval_ms, self.beat)
+
+    def beat(self):
+        now = time.perf_counter_ns()
+        lag = max(0, now - self.expected)
+        self.lag.record(lag)
+        self.last_lag = lag
+
+        if lag >= self.stall_ns:
+            self.add_stall(now, lag)
+        self.sample = None
+        self.schedule()
+
+    def add_stall(self, now, lag):
+        callback = stack = None
+        sample = self.sample
+        if sample is not None and sample[0] == self.expected:
+            _, callback, stack = sample
+
+        self.stall_count += 1
+        self.stalls.append(Stall((now - self.started) / 1e9, lag, callback, stack))
+        if len(self.stalls) > MAX_STALLS:
+            # keep the longest
+            self.stalls.sort(key=lambda stall: -stall.lag)
+            del self.stalls[MAX_STALLS:]
+
+    def watch(self):
+        """
+        Watchdog thread - samples Tk's thread once per overdue beat
+        """
+
+        # checking at a quarter of the stall time catches it part way through
+        pause = max(self.stall_ns / NS_PER_MS / 4, 5) / 1000
+        while not self.stopping.wait(pause):
+            expected = self.expected
+            if expected is None:
+                continue
+
+            sample = self.sample
+            overdue = time.perf_counter_ns() - expected
+            if overdue < self.stall_ns // 2 or (sample is not None and sample[0] == expected):
+                continue
+
+            self.sample = (expected, self.running_callback(), self.main_stack())
+
+    def running_callback(self):
+        if self.profiler is None:
+            return None
+        current = self.profiler.current
+        return current[0] if current else None
+
+    def main_stack(self):
+        """
+        :return: innermost frames of Tk's thread, as 'file:line function' strings
+        """
+
+        frame = sys._current_frames().get(self.main_thread_id)
+        if frame is None:
+            return None
+        frames = traceback.extract_stack(frame)[-STACK_FRAMES:]
+        return [f"{summary.filename}:{summary.lineno} {summary.name}" for summary in frames]
+
+    def show_overlay(self):
+        """
+        Shows a small always-on-top window with the live lag
+        """
+
+        if self.overlay is not None:
+            return
+
+        self.overlay = tkinter.Toplevel(self.root)
+        self.overlay.title("Colour Quest debug")
+        self.overlay.attributes("-topmost", True)
+        self.overlay.resizable(False, False)
+        self.overlay_label = tkinter.Label(self.overlay, font=("Courier", 10),
+                                           justify="left", padx=8, pady=4)
+        self.overlay_label.grid()
+        self.overlay.protocol("WM_DELETE_WINDOW", self.hide_overlay)
+        self.update_overlay()
+
+    def hide_overlay(self):
+        if self.overlay_id is not None:
+            self.root.after_cancel(self.overlay_id)
+            self.overlay_id = None
+        if self.overlay is not None:
+            self.overlay.destroy()
+            self.overlay = self.overlay_label = None
+
+    def overlay_text(self):
+        return (f"lag {self.last_lag / NS_PER_MS:6.1f} ms   "
+                f"p99 {self.lag.value_at(99) / NS_PER_MS:6.1f} ms\n"
+                f"worst {self.lag.max / NS_PER_MS:6.1f} ms   "
+                f"stalls {self.stall_count}")
+
+    def update_overlay(self):
+        text = self.overlay_text()
+        if self.overlay_label.cget("text") != text:
+            self.overlay_label.configure(text=text)
+        self.overlay_id = self.root.after(OVERLAY_UPDATE_MS, self.update_overlay)
+
+    def report(self):
+        """
+        :return: dictionary of the lag percentiles and the stalls (longest first)
+        """
+        stalls = sorted(self.stalls, key=lambda stall: -stall.lag)
+        return {"interval_ms": self.interval_ms, "stall_ms": self.stall_ns / NS_PER_MS,
+                "lag_ms": self.lag.summary(), "stall_count": self.stall_count,
+                "stalls": [stall.to_dict() for stall in stalls]}
+
+    def format_report(self, style="text"):
+        """
+        :param style: 'text' for people to read, 'json' for scripts
+        :return: the report as a string
+        """
+
+        report = self.report()
+        if style == "json":
+            return json.dumps(report, indent=2)
+
+        lag = report["lag_ms"]
+        lines = [f"Event loop lag over {lag['count']:,} beats (ms): p50 {lag['p50']:.1f}, "
+                 f"p95 {lag['p95']:.1f}, p99 {lag['p99']:.1f}, max {lag['max']:.1f}",
+                 f"Stalls over {report['stall_ms']:g} ms: {report['stall_count']}"]
+
+        for stall in report["stalls"]:
+            lines.append(f"  {stall['ms']:8.1f} ms at {stall['at']:7.1f} s - "
+                         f"{stall['callback'] or 'callback unknown'}")
+            for frame in stall["stack"] or ():
+                lines.append(f"      {frame}")
+
+        return "\n".join(lines)
+
+    def dump(self, path="-"):
+        """
+        :param path: file to write ('.json' files get JSON), '-' prints the text report
+        """
+
+        if path == "-":
+            print(self.format_report(), flush=True)
+            return
+
+        style = "json" if path.endswith(".json") else "text"
+        with open(path, "w", encoding="utf-8") as report_file:
+            report_file.write(self.format_report(style) + "\n")
@@ -0,0 +1,86 @@
+import json
+import time
+
+# stages of starting the game, in the order they normally happen
+# (stage name | description for the report)
+STAGES = [
+    ("imports", "modules imported"),
+    ("first_window", "start window shown"),
+    ("catalogue_loaded", "colour list loaded"),
+    ("play_clicked", "play clicked"),
+    ("first_round", "first round playable"),
+]
+
+# things that take time but aren't measured from launch
+# (name | description for the report)
+DURATIONS = [
+    ("catalogue_load", "colour list load (background thread)"),
+    ("catalogue_wait", "waiting for the colour list"),
+]
+
+
+class StartupTimer:
+    """
+    Records when each stage of starting the game happened (measured from
+    launch) and how long the slow parts took
+    """
+
+    def __init__(self, launch_time=None):
+        """
+        :param launch_time: time.perf_counter() value taken as the program started
+        """
+        self.launch_time = time.perf_counter() if launch_time is None else launch_time
+
+        # stage -> seconds since launch, name -> seconds
+        self.marks = {}
+        self.durations = {}
+
+    def mark(self, stage):
+        """
+        Records that a stage has been reached (only the first time counts)
+        :return: True if this was the first time
+        """
+        if stage in self.marks:
+            return False
+        self.marks[stage] = time.perf_counter() - self.launch_time
+        return True
+
+    def record(self, name, seconds):
+        """
+        Records how long something took (only the first time counts)
+        """
+        self.durations.setdefault(name, seconds)
+
+    def report(self):
+        """
+        :return: dictionary of milliseconds for every stage / duration recorded
+        """
+        times = {stage: seconds * 1000 for stage, seconds in self.marks.items()}
+        times.update({name: seconds * 1000 for name, seconds in self.durations.items()})
+        return times
+
+    def format_report(self, style="text"):
+        """
+        :param style: 'text' for people to read, 'json' for scripts
+        :return: the report as a string
+        """
+
+        times = self.report()
+        if style == "json":
+            return json.dumps(times)
+
+        lines = ["Startup (ms since launch)"]
+        for stage, description in STAGES:
+            if stage in times:
+                lines.append(f"  {description:<40} {times[stage]:>9.1f}")
+
+        # the first round includes however long the player took to click play
+        if "play_clicked" in times and "first_round" in times:
+            lines.append(f"  {'play clicked -> first round':<40} "
+                         f"{times['first_round'] - times['play_clicked']:>9.1f}")
+
+        for name, description in DURATIONS:
+            if name in times:
+                lines.append(f"  {description:<40} {times[name]:>9.1f}")
+
+        return "\n".join(lines)
@@ -0,0 +1,70 @@
+import os
+import random
+import sys
+
+import pytest
+
+# the game's modules live in the repository root (there's no package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colour_catalogue import ColourCatalogue
+
+
+class FixedRandom:
+    """
+    Stands in for random.Random - random() hands out the numbers given
+    (and randrange(n) uses the next one to pick 0 to n - 1)
+    """
+
+    def __init__(self, numbers):
+        self.numbers = iter(numbers)
+
+    def random(self):
+        return next(self.numbers)
+
+    def randrange(self, stop):
+        return int(self.random() * stop)
+
+
+def catalogue_from_scores(scores):
+    """
+    :param scores: score for each colour (colour i is named #00000i in hex)
+    :return: ColourCatalogue
+    """
+    return ColourCatalogue.from_rows([f"#{colour_id:06X}", score, "#000000"]
+                                     for colour_id, score in enumerate(scores))
+
+
+@pytest.fixture
+def fixed_random():
+    return FixedRandom
+
+
+@pytest.fixture
+def make_catalogue():
+    return catalogue_from_scores
+
+
+@pytest.fixture
+def random_scores():
+    """
+    :return: function making a list of random scores (lots of repeats)
+    """
+    def make(colours=200, max_score=12, seed=1):
+        rng = random.Random(seed)
+        return [rng.randint(0, max_score) for _ in range(colours)]
+    return make
+
+
+@pytest.fixture
+def colour_csv(tmp_path):
+    """
+    :return: function that writes [name, score, fg] rows to a colour csv
+    file and returns its path
+    """
+    def write(rows, name="colours.csv"):
+        path = tmp_path / name
+        lines = ["name,score,fg"] + [",".join(str(value) for value in row) for row in rows]
+        path.write_text("\n".join(lines) + "\n")
+        return str(path)
+    return write
@@ -0,0 +1,73 @@
+from functools import partial
+import json
+import time
+
+import pytest
+
+from callback_profiler import CallbackProfiler, callback_name
+
+
+class Window:
+    def new_round(self):
+        pass
+
+    def after(self, func, *args):
+        # the same shape as tkinter's Misc.after wrapper
+        def callit():
+            func(*args)
+        return callit
+
+
+def test_callback_names_look_through_wrappers():
+    window = Window()
+    assert callback_name(window.new_round) == "Window.new_round"
+    assert callback_name(partial(partial(window.new_round))) == "Window.new_round"
+    assert callback_name(window.after(window.new_round)) == "after: Window.new_round"
+    assert callback_name(print) == "print"
+
+
+def test_calls_are_timed_per_callback():
+    profiler = CallbackProfiler(slow_ms=5)
+    for _ in range(3):
+        profiler.call("quick", lambda: None, ())
+    assert profiler.call("slow", time.sleep, (0.01,)) is None
+
+    rows = {row["callback"]: row for row in profiler.summary()}
+    assert rows["quick"]["count"] == 3
+    assert rows["quick"]["slow_calls"] == 0
+    assert rows["slow"]["slow_calls"] == 1
+    assert rows["slow"]["max"] >= 10
+    assert profiler.summary()[0]["callback"] == "slow"
+
+
+def test_callbacks_that_raise_are_still_timed():
+    profiler = CallbackProfiler()
+
+    def broken():
+        assert profiler.current[0] == "broken"
+        raise KeyError("oops")
+
+    with pytest.raises(KeyError):
+        profiler.call("broken", broken, ())
+    assert profiler.current is None
+    assert profiler.summary()[0]["count"] == 1
+
+
+def test_only_the_slowest_sampled_calls_are_kept():
+    profiler = CallbackProfiler(slow_ms=0, sample_rate=1, max_captures=2)
+    for seconds in (0.001, 0.004, 0.002):
+        profiler.call("sleep", time.sleep, (seconds,))
+
+    captures = profiler.summary()[0]["captures"]
+    assert len(captures) == 2
+    assert captures[0]["ms"] >= captures[1]["ms"] >= 2
+    assert "sleep" in captures[0]["profile"]
+
+    summary = json.loads(profiler.format_summary("json"))
+    assert summary["callbacks"][0]["callback"] == "sleep"
+    assert "Sampled slow call of sleep" in profiler.format_summary()
+
+
+def test_bad_sample_rate_is_refused():
+    with pytest.raises(ValueError):
+        CallbackProfiler(sample_rate=2)
@@ -0,0 +1,154 @@
+from fractions import Fraction
+from itertools import permutations
+import os
+import threading
+
+import pytest
+
+import colour_catalogue
+from colour_catalogue import (COMPILED_HEADER, ROUND_SIZE, BackgroundLoader, ColourCatalogue,
+                              compile_catalogue, load_catalogue, open_compiled,
+                              read_colour_csv)
+
+# several colours share a score, so a lot of picks get ruled out
+SCORES = [3, 1, 3, 2, 5, 3, 1, 4, 6, 2]
+
+
+def rejection_odds(scores):
+    """
+    :return: {round ids: chance} for the old loop - pick any colour, throw it
+    away if its score is already in the round
+    """
+
+    odds = {}
+    for round_ids in permutations(range(len(scores)), ROUND_SIZE):
+        round_scores = [scores[colour_id] for colour_id in round_ids]
+        if len(set(round_scores)) < ROUND_SIZE:
+            continue
+
+        # each accepted pick is equally likely to be any colour still allowed
+        chance = Fraction(1)
+        for pick in range(ROUND_SIZE):
+            allowed = sum(1 for score in scores if score not in round_scores[:pick])
+            chance /= allowed
+        odds[round_ids] = chance
+    return odds
+
+
+def draw_odds(catalogue, fixed_random):
+    """
+    :return: {round ids: chance} for draw_round_ids, found by trying every
+    position at every step (a uniform number in the middle of each one)
+    """
+
+    odds = {}
+
+    def draw(picked, chance):
+        round_ids = catalogue.draw_round_ids(fixed_random(picked + [0.5] * ROUND_SIZE))
+        if len(picked) == ROUND_SIZE:
+            odds[tuple(round_ids)] = odds.get(tuple(round_ids), 0) + chance
+            return
+
+        # how many colours are left at this step depends on the picks so far
+        used = {catalogue.scores[colour_id] for colour_id in round_ids[:len(picked)]}
+        remaining = sum(1 for score in catalogue.scores if score not in used)
+        for position in range(remaining):
+            draw(picked + [(position + 0.5) / remaining], chance / remaining)
+
+    draw([], Fraction(1))
+    return odds
+
+
+def test_draw_round_ids_has_the_same_odds_as_rejection_sampling(make_catalogue,
+                                                                fixed_random):
+    assert draw_odds(make_catalogue(SCORES), fixed_random) == rejection_odds(SCORES)
+
+
+def test_draw_round_ids_gives_different_scores(make_catalogue, fixed_random):
+    catalogue = make_catalogue(SCORES)
+    for first in (0, 0.25, 0.5, 0.999999):
+        round_ids = catalogue.draw_round_ids(fixed_random([first, 0.999999, 0, 0.5]))
+        assert len({catalogue.scores[colour_id] for colour_id in round_ids}) == ROUND_SIZE
+
+
+def test_draw_round_ids_needs_four_different_scores(make_catalogue, fixed_random):
+    with pytest.raises(ValueError):
+        make_catalogue([1, 1, 2, 2, 3]).draw_round_ids(fixed_random([0] * ROUND_SIZE))
+
+
+def test_score_index_groups_colours_by_score(make_catalogue):
+    catalogue = make_catalogue(SCORES)
+    starts = list(catalogue.bucket_starts)
+    assert list(catalogue.bucket_scores) == sorted(set(SCORES))
+    for bucket, score in enumerate(catalogue.bucket_scores):
+        ids = catalogue.order[starts[bucket]:starts[bucket + 1]]
+        assert sorted(ids) == [colour_id for colour_id, colour_score in enumerate(SCORES)
+                               if colour_score == score]
+
+
+def test_compiled_catalogue_matches_the_csv(colour_csv):
+    rows = [[f"#{number * 0x030201:06X}", number % 7, "#FFFFFF" if number % 2 else "#000000"]
+            for number in range(30)]
+    csv_path = colour_csv(rows)
+    compiled = open_compiled(compile_catalogue(csv_path), csv_path)
+    parsed = ColourCatalogue.from_rows(read_colour_csv(csv_path))
+
+    assert list(compiled.names) == list(parsed.names)
+    assert list(compiled.scores) == list(parsed.scores)
+    assert [compiled.fg(colour_id) for colour_id in range(30)] == [row[2] for row in rows]
+    assert list(compiled.rgb) == list(parsed.rgb)
+    assert compiled.fingerprint() == parsed.fingerprint()
+
+
+def test_stale_compiled_catalogue_is_not_used(colour_csv):
+    csv_path = colour_csv([[f"#{number:06X}", number % 5, "#000000"] for number in range(10)])
+    compiled_path = compile_catalogue(csv_path)
+    colour_csv([[f"#{number:06X}", number % 6, "#000000"] for number in range(12)])
+
+    with pytest.raises(ValueError, match="out of date"):
+        open_compiled(compiled_path, csv_path)
+    assert len(load_catalogue(csv_path)) == 12
+
+
+def test_checksum_is_only_checked_when_asked(colour_csv):
+    csv_path = colour_csv([[f"#{number:06X}", number % 5, "#000000"] for number in range(10)])
+    compiled_path = compile_catalogue(csv_path)
+
+    # damage a score without changing the file's size or modified time
+    info = os.stat(compiled_path)
+    with open(compiled_path, "r+b") as file:
+        file.seek(COMPILED_HEADER.size)
+        byte = file.read(1)
+        file.seek(COMPILED_HEADER.size)
+        file.write(bytes([byte[0] ^ 0xFF]))
+    os.utime(compiled_path, ns=(info.st_atime_ns, info.st_mtime_ns))
+
+    open_compiled(compiled_path, csv_path)
+    with pytest.raises(ValueError, match="checksum"):
+        open_compiled(compiled_path, csv_path, verify=True)
+    assert colour_catalogue.main([csv_path, "--verify"]) == 1
+
+
+def test_background_loader_passes_its_arguments(colour_csv):
+    csv_path = colour_csv([[f"#{number:06X}", number % 5, "#000000"] for number in range(10)])
+    loader = BackgroundLoader(load_catalogue, (csv_path,))
+    assert len(loader.result(timeout=10)) == 10
+    assert loader.ready() and loader.seconds is not None
+
+
+def test_background_loader_raises_the_load_error_when_asked():
+    def load():
+        raise ValueError("bad colour list")
+
+    loader = BackgroundLoader(load)
+    with pytest.raises(ValueError, match="bad colour list"):
+        loader.result(timeout=10)
+
+
+def test_background_loader_result_can_time_out():
+    release = threading.Event()
+    loader = BackgroundLoader(release.wait)
+    with pytest.raises(TimeoutError):
+        loader.result(timeout=0.01)
+    release.set()
+    assert loader.result(timeout=10) is True
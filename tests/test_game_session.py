@@ -0,0 +1,165 @@
+import random
+
+import pytest
+
+from game_session import (CHOICE_MADE, ROUND_STARTED, GameSession, RunningStats, round_ans,
+                          round_targets)
+
+SCORES = [3, 1, 3, 2, 5, 3, 1, 4, 6, 2, 8, 7]
+
+
+def play(session, pick):
+    """
+    Plays every round of a session
+    :param pick: function (round scores) -> index of the colour chosen
+    :return: list of ChoiceResult
+    """
+    results = []
+    while not session.game_over:
+        session.new_round()
+        results.append(session.choose(pick(session.round_scores)))
+    return results
+
+
+def test_round_targets_rounds_the_median_half_up():
+    assert round_targets([4, 1, 3, 2]) == (3, 4)
+    assert round_targets([1, 2, 4, 9]) == (3, 9)
+    for scores in ([1, 2, 4, 9], [0, 5, 6, 20], [3, 3, 8, 8]):
+        low, high = sorted(scores)[1:3]
+        assert round_targets(scores)[0] == round_ans((low + high) / 2)
+
+
+def test_winning_rounds_keep_their_points(make_catalogue):
+    session = GameSession(5, make_catalogue(SCORES), random.Random(1))
+    results = play(session, lambda scores: scores.index(max(scores)))
+
+    assert [result.won for result in results] == [True] * 5
+    assert session.rounds_won == 5
+    assert list(session.all_scores_list) == [result.score for result in results]
+    assert list(session.all_high_score_list) == [result.score for result in results]
+    assert session.success_rate == 100
+    assert results[-1].game_over and not results[0].game_over
+
+
+def test_losing_rounds_score_nothing(make_catalogue):
+    session = GameSession(4, make_catalogue(SCORES), random.Random(2))
+    highest = []
+
+    def lowest(scores):
+        highest.append(max(scores))
+        return scores.index(min(scores))
+
+    results = play(session, lowest)
+    assert not any(result.won for result in results)
+    assert list(session.all_scores_list) == [0] * 4
+    assert list(session.all_high_score_list) == highest
+    assert session.success_rate == 0
+
+
+def test_result_names_the_colour_chosen(make_catalogue):
+    catalogue = make_catalogue(SCORES)
+    session = GameSession(1, catalogue, random.Random(3))
+    session.new_round()
+    result = session.choose(2)
+    assert result.colour_name == catalogue.names[session.round_ids[2]]
+    assert result.score == SCORES[session.round_ids[2]]
+
+
+def test_rounds_must_be_played_in_order(make_catalogue):
+    session = GameSession(1, make_catalogue(SCORES), random.Random(4))
+    with pytest.raises(RuntimeError):
+        session.choose(0)
+
+    session.new_round()
+    with pytest.raises(RuntimeError):
+        session.new_round()
+
+    session.choose(0)
+    with pytest.raises(RuntimeError):
+        session.new_round()
+
+
+@pytest.mark.parametrize("choice", [-1, 4, True, "1"])
+def test_bad_choice_is_refused(make_catalogue, choice):
+    session = GameSession(2, make_catalogue(SCORES), random.Random(5))
+    session.new_round()
+    with pytest.raises(ValueError):
+        session.choose(choice)
+
+    # the round is still waiting for a proper choice
+    assert session.rounds_played == 0
+    session.choose(3)
+    assert session.rounds_played == 1
+
+
+def test_a_game_needs_rounds(make_catalogue):
+    with pytest.raises(ValueError):
+        GameSession(0, make_catalogue(SCORES))
+
+
+def test_running_stats_add_up_the_rounds():
+    stats = RunningStats()
+    for points, highest, won in ((7, 9, True), (0, 8, False), (12, 12, True)):
+        stats.add(points, highest, won)
+
+    assert stats.summary() == {"rounds_won": 2, "rounds_played": 3,
+                               "success_rate": 2 / 3 * 100, "total_score": 19,
+                               "max_possible": 29, "best_score": 12,
+                               "average_score": 19 / 3}
+    assert RunningStats().summary()["average_score"] == 0
+
+
+def test_session_stats_only_count_answered_rounds(make_catalogue):
+    session = GameSession(3, make_catalogue(SCORES), random.Random(6))
+    play(session, lambda scores: 1)
+    played = session.stats.summary()
+    assert played["total_score"] == sum(session.all_scores_list)
+    assert played["max_possible"] == sum(session.all_high_score_list)
+    assert played["best_score"] == max(session.all_scores_list)
+
+    session = GameSession(2, make_catalogue(SCORES), random.Random(6))
+    session.new_round()
+    assert session.stats.summary()["max_possible"] == 0
+
+
+def test_listeners_hear_each_change(make_catalogue):
+    session = GameSession(2, make_catalogue(SCORES), random.Random(7))
+    heard = []
+
+    def listener(kind, info):
+        heard.append((kind, info))
+
+    session.subscribe(listener)
+
+    info = session.new_round()
+    result = session.choose(0)
+    assert heard == [(ROUND_STARTED, info), (CHOICE_MADE, result)]
+
+    session.unsubscribe(listener)
+    session.new_round()
+    assert len(heard) == 2
+
+
+def test_prefetched_rounds_match_normal_rounds(make_catalogue, random_scores):
+    catalogue = make_catalogue(random_scores())
+    plain = GameSession(20, catalogue, rng=random.Random(5))
+    ahead = GameSession(20, catalogue, rng=random.Random(5))
+    while not plain.game_over:
+        plain.new_round()
+        ahead.new_round()
+        assert ahead.round_ids == plain.round_ids
+        assert ahead.target_score == plain.target_score
+        plain.choose(0)
+        ahead.choose(0)
+        ahead.prefetch()
+    assert ahead.prefetch() is False
+
+
+def test_cancelled_prefetch_puts_the_rng_back(make_catalogue, random_scores):
+    rng = random.Random(9)
+    session = GameSession(3, make_catalogue(random_scores()), rng=rng)
+    state = rng.getstate()
+    assert session.prefetch() is True
+    assert rng.getstate() != state
+    session.cancel_prefetch()
+    assert rng.getstate() == state
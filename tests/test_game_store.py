@@ -0,0 +1,79 @@
+import random
+import sqlite3
+
+import pytest
+
+from game_session import GameSession
+from game_store import GameStore
+
+SCORES = [3, 1, 3, 2, 5, 3, 1, 4, 6, 2, 8, 7]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GameStore(str(tmp_path / "history.db"), batch_size=3)
+    yield store
+    store.close()
+
+
+def stored_rounds(store):
+    return store.connection.execute("SELECT COUNT(*) FROM rounds").fetchone()[0]
+
+
+def test_rounds_are_written_in_batches(store):
+    session_id = store.start_session(5)
+    for round_number in range(1, 6):
+        store.record_round(session_id, round_number, "#000000", 5, 4, 9, True)
+        assert stored_rounds(store) == round_number // 3 * 3
+
+    store.end_session(session_id)
+    assert stored_rounds(store) == 5
+    ended = store.connection.execute("SELECT ended FROM sessions").fetchone()[0]
+    assert ended is not None
+
+
+def test_lifetime_stats_add_up_every_game(store):
+    first = store.start_session(2)
+    store.record_round(first, 1, "#000000", 7, 5, 9, True)
+    store.record_round(first, 2, "#000000", 2, 5, 8, False)
+    second = store.start_session(1)
+    store.record_round(second, 1, "#000000", 12, 6, 12, True)
+
+    assert store.lifetime_stats() == {"games": 2, "rounds_played": 3, "rounds_won": 2,
+                                      "success_rate": 2 / 3 * 100, "total_score": 19,
+                                      "max_possible": 29, "best_score": 12}
+
+
+def test_attach_records_a_game(store, make_catalogue):
+    session = GameSession(4, make_catalogue(SCORES), random.Random(1))
+    session_id = store.attach(session)
+    while not session.game_over:
+        session.new_round()
+        session.choose(2)
+    store.end_session(session_id)
+
+    stats = store.lifetime_stats()
+    assert stats["rounds_played"] == 4
+    assert stats["total_score"] == sum(session.all_scores_list)
+    assert stats["max_possible"] == sum(session.all_high_score_list)
+
+
+def test_games_survive_reopening(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = GameStore(path)
+    session_id = store.start_session(1)
+    store.record_round(session_id, 1, "#000000", 7, 5, 9, True)
+    store.close()
+
+    store = GameStore(path)
+    assert store.lifetime_stats()["total_score"] == 7
+    store.close()
+
+
+def test_failed_batch_is_rolled_back(store):
+    session_id = store.start_session(1)
+    store.record_round(session_id, 1, None, 7, 5, 9, True)
+    with pytest.raises(sqlite3.IntegrityError):
+        store.flush()
+    assert stored_rounds(store) == 0
+    assert store.lifetime_stats()["rounds_played"] == 0
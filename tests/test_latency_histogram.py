@@ -0,0 +1,65 @@
+import math
+import random
+
+import pytest
+
+from latency_histogram import LatencyHistogram
+
+
+def exact_percentile(values, percentile):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(percentile / 100 * len(ordered))) - 1]
+
+
+def test_percentiles_are_within_the_precision():
+    rng = random.Random(2)
+    values = [int(rng.lognormvariate(13, 1.5)) for _ in range(20_000)]
+    histogram = LatencyHistogram(significant_figures=2)
+    for value in values:
+        histogram.record(value)
+
+    for percentile in (1, 50, 95, 99, 99.9):
+        exact = exact_percentile(values, percentile)
+        assert exact <= histogram.value_at(percentile) <= exact * 1.01 + 1
+    assert histogram.value_at(100) == histogram.max == max(values)
+    assert histogram.mean == pytest.approx(sum(values) / len(values))
+
+
+def test_small_values_are_counted_exactly():
+    histogram = LatencyHistogram()
+    for value in range(100):
+        histogram.record(value)
+    assert [histogram.value_at(percentile) for percentile in (1, 50, 100)] == [0, 49, 99]
+
+
+def test_merge_is_the_same_as_recording_everything_once():
+    rng = random.Random(5)
+    first, second, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for number in range(5_000):
+        value = rng.randrange(10 ** rng.randrange(1, 10))
+        (first if number % 3 else second).record(value)
+        both.record(value)
+
+    first.merge(second)
+    first.merge(LatencyHistogram())
+    assert first.to_dict() == both.to_dict()
+
+    with pytest.raises(ValueError, match="precision"):
+        first.merge(LatencyHistogram(significant_figures=3))
+
+
+def test_dictionary_round_trip_keeps_the_summary():
+    histogram = LatencyHistogram()
+    for value in (5, 1_000, 1_234_567, 98_765_432):
+        histogram.record(value, times=3)
+    copy = LatencyHistogram.from_dict(histogram.to_dict())
+    assert copy.summary() == histogram.summary()
+    assert copy.to_dict() == histogram.to_dict()
+
+
+def test_bad_values_are_refused():
+    with pytest.raises(ValueError):
+        LatencyHistogram(significant_figures=6)
+    with pytest.raises(ValueError, match="negative"):
+        LatencyHistogram().record(-1)
+    assert LatencyHistogram().value_at(99) == 0
@@ -0,0 +1,103 @@
+import json
+import random
+
+import pytest
+
+from leaderboard import Leaderboard
+
+
+def names(entries):
+    return [entry.name for entry in entries]
+
+
+def test_games_rank_by_score_then_success_then_earliest():
+    board = Leaderboard(size=5)
+    board.submit("low", 10, 8, 10)
+    board.submit("high", 30, 2, 10)
+    board.submit("lucky", 20, 3, 10)
+    board.submit("steady", 20, 9, 10)
+    board.submit("steady again", 20, 9, 10)
+    assert names(board.top(10)) == ["high", "steady", "steady again", "lucky", "low"]
+
+
+def test_submit_returns_the_place():
+    board = Leaderboard(size=3)
+    assert board.submit("a", 10, 5, 10) == 1
+    assert board.submit("b", 30, 5, 10) == 1
+    assert board.submit("c", 20, 5, 10) == 2
+    assert board.submit("d", 5, 5, 10) is None
+    assert board.submit("e", 25, 5, 10) == 2
+    assert names(board.top(10)) == ["b", "e", "c"]
+
+
+def test_board_keeps_the_best_games_in_order():
+    rng = random.Random(3)
+    games = [(f"game {number}", rng.randrange(100), rng.randrange(11))
+             for number in range(500)]
+    board = Leaderboard(size=10)
+    for name, score, won in games:
+        board.submit(name, score, won, 10)
+
+    best = sorted(enumerate(games), key=lambda item: (item[1][1], item[1][2], -item[0]),
+                  reverse=True)[:10]
+    assert names(board.top(10)) == [game[0] for _, game in best]
+
+
+def test_games_only_compete_with_games_of_a_similar_length():
+    board = Leaderboard(size=2, brackets=(1, 5, 10))
+    board.submit("short", 10, 3, 3)
+    board.submit("long", 500, 40, 50)
+    board.submit("medium", 50, 5, 7)
+    assert names(board.top(4)) == ["short"]
+    assert names(board.top(5)) == ["medium"]
+    assert names(board.top(100)) == ["long"]
+    assert [board.bracket_name(index) for index in range(3)] == \
+        ["1-4 rounds", "5-9 rounds", "10+ rounds"]
+
+    with pytest.raises(ValueError):
+        board.submit("none", 0, 0, 0)
+
+
+def test_snapshot_reloads_the_same_board(tmp_path):
+    path = tmp_path / "board.json"
+    board = Leaderboard(size=3)
+    for number in range(8):
+        board.submit(f"game {number}", number * 7 % 11, number % 4, 4 + number)
+    assert board.save_if_changed(path)
+    assert not board.save_if_changed(path)
+
+    loaded = Leaderboard.load(path, size=3)
+    for rounds in board.brackets:
+        assert [entry.to_list() for entry in loaded.top(rounds)] == \
+            [entry.to_list() for entry in board.top(rounds)]
+
+    # later games still rank after the reloaded ones they tie with
+    loaded.submit("tie", 0, 0, 4)
+    assert loaded.submissions == 9
+
+
+def test_snapshot_is_resorted_into_a_new_layout(tmp_path):
+    path = tmp_path / "board.json"
+    board = Leaderboard(size=5, brackets=(1, 10))
+    for number in range(5):
+        board.submit(f"game {number}", number, 1, 2 + number)
+    board.save(path)
+
+    loaded = Leaderboard.load(path, size=2, brackets=(1, 5))
+    assert names(loaded.top(1)) == ["game 2", "game 1"]
+    assert names(loaded.top(5)) == ["game 4", "game 3"]
+
+
+def test_missing_snapshot_is_an_empty_board(tmp_path):
+    assert Leaderboard.load(tmp_path / "none.json").top(10) == []
+
+
+def test_bad_snapshot_is_refused(tmp_path):
+    path = tmp_path / "board.json"
+    path.write_text(json.dumps({"version": 99}))
+    with pytest.raises(ValueError, match="version"):
+        Leaderboard.load(path)
+
+    path.write_text(json.dumps({"version": 1, "entries": [[["name"]]]}))
+    with pytest.raises(ValueError, match="badly formed"):
+        Leaderboard.load(path)
@@ -0,0 +1,49 @@
+import asyncio
+import copy
+
+import pytest
+
+from load_test import compare, run_local, summarise
+from room_bot import BotStats
+
+
+def results(mode="rooms", rate=1000, p99_ns=2_000_000, **settings):
+    stats = BotStats()
+    for _ in range(100):
+        stats.round_latency.record(1_000_000)
+        stats.answer_latency.record(p99_ns)
+    stats.requests = rate
+    run_settings = {"players": 10, "games": 1, "rounds": 10, "think": [0, 0],
+                    "players_per_room": 2, "local": True}
+    run_settings.update(settings)
+    return summarise(mode, run_settings, stats, 1)
+
+
+def test_same_run_has_no_regressions():
+    baseline = results()
+    assert compare(copy.deepcopy(baseline), baseline) == []
+
+
+def test_slower_run_is_a_regression():
+    regressions = compare(results(rate=500, p99_ns=4_000_000), results())
+    assert {regression.split()[0] for regression in regressions} == {"requests", "choose", "all"}
+    assert not any(regression.startswith("ready") for regression in regressions)
+
+
+@pytest.mark.parametrize("changed", [{"mode": "api"}, {"players": 20},
+                                     {"players_per_room": 4}, {"local": False}])
+def test_runs_with_different_settings_are_not_compared(changed):
+    with pytest.raises(ValueError):
+        compare(results(**changed), results())
+
+
+def test_last_room_is_sized_to_the_players_left(make_catalogue):
+    # 5 players in rooms of 2 leaves one player on their own - who would
+    # otherwise wait for a second player forever
+    settings = {"players": 5, "games": 1, "rounds": 2, "think": (0, 0),
+                "players_per_room": 2, "seed": 1}
+    catalogue = make_catalogue(list(range(12)))
+    stats, _ = asyncio.run(asyncio.wait_for(run_local("rooms", catalogue, **settings), 10))
+    assert stats.games_finished == 5
+    assert stats.rounds_answered == 10
+    assert stats.failed_bots == 0
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import time
+
+from game_session import CHOICE_MADE, ROUND_STARTED
+from leaderboard import Leaderboard
+from remote_session import RemoteGameSession
+from room_protocol import MAX_ROUNDS, encode
+from room_server import RoomServer
+
+# long enough that a test which has to wait for a time limit fails instead
+WAIT = 2
+
+
+class Client:
+    """
+    One connection to a test server
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, port):
+        return cls(*await asyncio.open_connection("127.0.0.1", port))
+
+    def send(self, **message):
+        self.writer.write(encode(message))
+
+    async def expect(self, kind):
+        """
+        :return: the next message of this kind (skipping any others)
+        """
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), WAIT)
+            assert line, f"connection closed waiting for {kind}"
+            message = json.loads(line)
+            if message["type"] == kind:
+                return message
+
+    async def join(self, room, name, **options):
+        self.send(type="join", room=room, name=name, **options)
+        return await self.expect("joined")
+
+    def close(self):
+        self.writer.close()
+
+
+def run_with_server(test, make_catalogue, **options):
+    """
+    Runs test(server, port) on a new event loop with a server listening
+    on a free port
+    """
+
+    async def main():
+        server = RoomServer(make_catalogue(list(range(12))), seed=1, **options)
+        listener = await server.start(port=0)
+        try:
+            await test(server, listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            await listener.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_two_players_share_every_round(make_catalogue):
+    async def test(server, port):
+        first, second = await Client.connect(port), await Client.connect(port)
+        await first.join("room", "Ann", rounds=2, players=2)
+        joined = await second.join("room", "Bob", rounds=99)
+        assert joined["rounds"] == 2
+        assert joined["players"] == ["Ann", "Bob"]
+
+        for round_number in (1, 2):
+            first.send(type="ready")
+            second.send(type="ready")
+            rounds = [await first.expect("round"), await second.expect("round")]
+            assert rounds[0] == rounds[1]
+            assert rounds[0]["round"] == round_number
+
+            first.send(type="choose", round=round_number, choice=0)
+            second.send(type="choose", round=round_number, choice=3)
+            results = [await first.expect("result"), await second.expect("result")]
+            assert [result["place"] for result in results] == [1, 2]
+            assert results[1]["game_over"] == (round_number == 2)
+            await first.expect("round_over")
+            await second.expect("round_over")
+
+        standings = (await first.expect("game_over"))["standings"]
+        assert sorted(name for name, _, _ in standings) == ["Ann", "Bob"]
+        assert "room" not in server.rooms
+        assert server.rounds_played == 2
+        first.close()
+        second.close()
+
+    run_with_server(test, make_catalogue)
+
+
+def test_ready_sent_before_the_round_is_over_counts(make_catalogue):
+    # the ready time limit is far longer than the test waits, so the second
+    # round only starts in time if the early ready was remembered
+    async def test(server, port):
+        first, second = await Client.connect(port), await Client.connect(port)
+        await first.join("room", "Ann", rounds=3, players=2)
+        await second.join("room", "Bob")
+        first.send(type="ready")
+        second.send(type="ready")
+        await first.expect("round")
+        await second.expect("round")
+
+        first.send(type="choose", round=1, choice=1)
+        await first.expect("result")
+        first.send(type="ready")
+
+        second.send(type="choose", round=1, choice=2)
+        await second.expect("round_over")
+        second.send(type="ready")
+
+        assert (await first.expect("round"))["round"] == 2
+        assert (await second.expect("round"))["round"] == 2
+        first.close()
+        second.close()
+
+    run_with_server(test, make_catalogue, ready_seconds=60)
+
+
+def test_first_round_waits_for_the_players_wanted(make_catalogue):
+    async def test(server, port):
+        first, second, third = [await Client.connect(port) for _ in range(3)]
+        await first.join("room", "Ann", players=3)
+        await second.join("room", "Bob")
+        await third.join("room", "Cat")
+        first.send(type="ready")
+        second.send(type="ready")
+
+        # two ready and the third leaving mustn't start a game for two
+        third.send(type="leave")
+        await first.expect("player_left")
+        assert server.rooms["room"].round_number == 0
+
+        for client in (first, second, third):
+            client.close()
+
+    run_with_server(test, make_catalogue)
+
+
+def test_bad_messages_get_errors(make_catalogue):
+    async def test(server, port):
+        client = await Client.connect(port)
+        client.send(type="ready")
+        assert (await client.expect("error"))["message"] == "join a room first"
+
+        client.send(type="join", room="room", name="Ann", rounds=MAX_ROUNDS + 1)
+        assert "rounds must be" in (await client.expect("error"))["message"]
+
+        client.writer.write(b"not json\n")
+        assert (await client.expect("error"))["message"] == "not valid JSON"
+
+        await client.join("room", "Ann", rounds=1)
+        client.send(type="ready")
+        await client.expect("round")
+        client.send(type="choose", round=1, choice=-1)
+        assert (await client.expect("error"))["message"] == "choice must be 0 to 3"
+        client.close()
+
+    run_with_server(test, make_catalogue)
+
+
+def test_remote_session_plays_a_game(make_catalogue):
+    # the window's client runs its own threads, so it is driven from a
+    # worker thread while the server runs on the event loop
+    async def test(server, port):
+        def play():
+            session = RemoteGameSession(f"127.0.0.1:{port}", "room", "Ann", 2)
+            changes = []
+            session.subscribe(lambda kind, info: changes.append(kind))
+            deadline = time.monotonic() + WAIT
+            while time.monotonic() < deadline:
+                session.pump()
+                if session.game_over:
+                    break
+                if session.awaiting_choice:
+                    session.choose(0)
+                elif session.rounds_played == len(changes) // 2:
+                    session.new_round()
+                time.sleep(0.01)
+            error = session.take_error()
+            session.close()
+            return session.rounds_played, changes, error
+
+        rounds_played, changes, error = await asyncio.to_thread(play)
+        assert error is None
+        assert rounds_played == 2
+        assert changes == [ROUND_STARTED, CHOICE_MADE] * 2
+
+    run_with_server(test, make_catalogue)
+
+
+def test_finished_games_go_on_the_leaderboard(make_catalogue):
+    async def test(server, port):
+        client = await Client.connect(port)
+        await client.join("room", "Ann", rounds=1)
+        client.send(type="ready")
+        await client.expect("round")
+        client.send(type="choose", round=1, choice=0)
+        game_over = await client.expect("game_over")
+        assert [entry["name"] for entry in game_over["leaderboard"]["entries"]] == ["Ann"]
+
+        client.send(type="leaderboard", rounds=1)
+        assert (await client.expect("leaderboard"))["bracket"] == "1-4 rounds"
+        client.close()
+
+    run_with_server(test, make_catalogue, leaderboard=Leaderboard())
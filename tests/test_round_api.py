@@ -0,0 +1,124 @@
+import base64
+import json
+import socket
+import struct
+import threading
+
+import pytest
+
+import round_api
+from round_api import RoundAPI, RoundTokens, make_server
+
+ROUND = ([3, 7, 1, 9], [10, 40, 25, 5], 18, 40)
+
+SCORES = [colour_id % 8 for colour_id in range(16)]
+
+
+def change_byte(token, position):
+    data = bytearray(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    data[position] ^= 1
+    return base64.urlsafe_b64encode(bytes(data)).rstrip(b"=").decode("ascii")
+
+
+def test_token_round_trip(make_catalogue):
+    tokens = RoundTokens("secret", make_catalogue(SCORES))
+    colour_ids, scores, target, highest = tokens.read(tokens.issue(*ROUND))
+    assert (list(colour_ids), list(scores), target, highest) == ROUND
+
+
+def test_token_hides_the_scores(make_catalogue):
+    token = RoundTokens("secret", make_catalogue(SCORES)).issue(*ROUND)
+    data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    assert struct.pack("<4I", *ROUND[1]) not in data
+
+
+@pytest.mark.parametrize("position", [0, round_api.NONCE_BYTES, -1])
+def test_changed_token_is_refused(position, make_catalogue):
+    tokens = RoundTokens("secret", make_catalogue(SCORES))
+    with pytest.raises(ValueError, match="signature"):
+        tokens.read(change_byte(tokens.issue(*ROUND), position))
+
+
+def test_token_from_another_secret_is_refused(make_catalogue):
+    catalogue = make_catalogue(SCORES)
+    token = RoundTokens("secret", catalogue).issue(*ROUND)
+    with pytest.raises(ValueError, match="signature"):
+        RoundTokens("another secret", catalogue).read(token)
+
+
+def test_token_for_other_colours_is_refused(make_catalogue):
+    token = RoundTokens("secret", make_catalogue(SCORES)).issue(*ROUND)
+    with pytest.raises(ValueError, match="colour list"):
+        RoundTokens("secret", make_catalogue([score + 1 for score in SCORES])).read(token)
+
+
+def test_expired_token_is_refused(monkeypatch, make_catalogue):
+    tokens = RoundTokens("secret", make_catalogue(SCORES), token_seconds=60)
+    token = tokens.issue(*ROUND)
+
+    now = round_api.time.time()
+    monkeypatch.setattr(round_api.time, "time", lambda: now + 59)
+    tokens.read(token)
+
+    monkeypatch.setattr(round_api.time, "time", lambda: now + 61)
+    with pytest.raises(ValueError, match="expired"):
+        tokens.read(token)
+
+
+@pytest.mark.parametrize("token, message", [(None, "string"), ("not base64!", "base64"),
+                                            ("abcd", "length")])
+def test_malformed_token_is_refused(token, message, make_catalogue):
+    with pytest.raises(ValueError, match=message):
+        RoundTokens("secret", make_catalogue(SCORES)).read(token)
+
+
+def test_answer_marks_the_round(make_catalogue):
+    catalogue = make_catalogue(SCORES)
+    api = RoundAPI(catalogue, RoundTokens("secret", catalogue))
+    round_info = api.new_round()
+
+    results = [api.answer({"token": round_info["token"], "choice": choice})
+               for choice in range(4)]
+    assert all(result["target"] == round_info["target"] for result in results)
+    assert max(result["score"] for result in results) == results[0]["highest"]
+    for result in results:
+        assert result["won"] == (result["score"] >= round_info["target"])
+
+    with pytest.raises(ValueError, match="choice"):
+        api.answer({"token": round_info["token"], "choice": 4})
+
+
+@pytest.fixture
+def server(make_catalogue):
+    catalogue = make_catalogue(SCORES)
+    server = make_server(RoundAPI(catalogue, RoundTokens("secret", catalogue)), port=0)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05},
+                     daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, content_length, body=b"{}"):
+    with socket.create_connection(server.server_address, timeout=5) as connection:
+        connection.sendall(b"POST /answer HTTP/1.1\r\nHost: test\r\nContent-Length: "
+                           + content_length + b"\r\n\r\n" + body)
+        response = b""
+        while b"\r\n\r\n" not in response or not response.endswith(b"}"):
+            data = connection.recv(4096)
+            if not data:
+                break
+            response += data
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.mark.parametrize("content_length", [b"abc", b"-1", b"1.5", b"\xc2\xb2"])
+def test_bad_content_length_is_refused(server, content_length):
+    status, body = post(server, content_length)
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+
+def test_too_large_body_is_refused(server):
+    assert post(server, str(round_api.MAX_BODY_BYTES + 1).encode())[0] == 413
@@ -0,0 +1,62 @@
+import numpy as np
+
+from colour_catalogue import ROUND_SIZE
+from game_session import round_targets
+from procedural_catalogue import procedural_catalogue
+from round_batch import catalogue_arrays, draw_ids, generate_rounds
+from round_batch import round_targets as round_targets_batch
+import round_batch
+
+# the ends of [0, 1) are where an off by one would show up
+EDGES = [[0, 0, 0, 0], [0.9999999999] * ROUND_SIZE,
+         [0, 0.9999999999, 0, 0.9999999999], [0.5, 0, 0.9999999999, 0.5]]
+
+
+def check_same_ids(catalogue, uniforms, fixed_random):
+    order, bucket_starts, _ = catalogue_arrays(catalogue)
+    batch_ids = draw_ids(uniforms, order, bucket_starts)
+    for numbers, ids in zip(uniforms, batch_ids):
+        assert catalogue.draw_round_ids(fixed_random(numbers.tolist())) == ids.tolist()
+
+
+def test_draw_ids_matches_draw_round_ids(make_catalogue, random_scores, fixed_random):
+    uniforms = np.random.default_rng(5).random((5000, ROUND_SIZE))
+    check_same_ids(make_catalogue(random_scores()),
+                   np.concatenate([uniforms, EDGES]), fixed_random)
+
+
+def test_generate_rounds_targets_match_game_session(make_catalogue, random_scores):
+    catalogue = make_catalogue(random_scores(seed=2))
+    batch = generate_rounds(5000, seed=3, catalogue=catalogue)
+
+    assert len(batch) == 5000
+    for ids, scores, median, highest in zip(batch.colour_ids, batch.scores,
+                                            batch.medians, batch.highest):
+        assert scores.tolist() == [catalogue.scores[colour_id] for colour_id in ids]
+        assert len(set(scores.tolist())) == ROUND_SIZE
+        assert (median, highest) == round_targets(scores.tolist())
+
+
+def test_generate_rounds_chunks_give_the_same_rounds(make_catalogue, random_scores,
+                                                     monkeypatch):
+    catalogue = make_catalogue(random_scores(seed=4))
+    whole = generate_rounds(1000, seed=7, catalogue=catalogue)
+
+    monkeypatch.setattr(round_batch, "CHUNK_ROUNDS", 64)
+    chunked = generate_rounds(1000, seed=7, catalogue=catalogue)
+    assert np.array_equal(whole.colour_ids, chunked.colour_ids)
+    assert np.array_equal(whole.medians, chunked.medians)
+
+
+def test_draw_ids_matches_draw_round_ids_for_procedural_colours(fixed_random):
+    uniforms = np.random.default_rng(6).random((2000, ROUND_SIZE))
+    check_same_ids(procedural_catalogue(max_score=5), np.concatenate([uniforms, EDGES]),
+                   fixed_random)
+
+
+def test_generate_rounds_with_procedural_colours():
+    catalogue = procedural_catalogue(max_score=20)
+    batch = generate_rounds(2000, seed=8, catalogue=catalogue)
+    for ids, scores in zip(batch.colour_ids[:200], batch.scores[:200]):
+        assert scores.tolist() == [catalogue.scores[colour_id] for colour_id in ids]
+    assert np.array_equal(batch.medians, round_targets_batch(batch.scores)[0])
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from game_session import GameSession
+from round_history import RoundHistory
+
+
+def filled(memory_rounds, rounds=50, seed=1):
+    """
+    :return: RoundHistory and the same rounds as a list of (score, highest)
+    """
+    rng = random.Random(seed)
+    history = RoundHistory(memory_rounds)
+    expected = []
+    for _ in range(rounds):
+        round_values = (rng.randrange(100), rng.randrange(100))
+        history.append(*round_values)
+        expected.append(round_values)
+    return history, expected
+
+
+@pytest.mark.parametrize("memory_rounds", [1, 3, 7, 1000])
+def test_reads_back_what_was_written(memory_rounds):
+    history, expected = filled(memory_rounds)
+    assert len(history) == len(expected)
+    assert list(history) == expected
+    assert [history[index] for index in range(-len(expected), len(expected))] == expected * 2
+    assert list(history.scores) == [score for score, _ in expected]
+    assert list(history.high_scores) == [highest for _, highest in expected]
+    history.close()
+
+
+def test_old_rounds_spill_to_a_file():
+    history, expected = filled(memory_rounds=8, rounds=20)
+    assert history.spilled
+    assert history.spilled_rounds == 16
+    assert len(history.recent) == 2 * 4
+    assert history[0] == expected[0] and history[19] == expected[19]
+
+    history.close()
+    assert not history.spilled and len(history) == 0
+
+    short, _ = filled(memory_rounds=8, rounds=7)
+    assert not short.spilled
+
+
+@pytest.mark.parametrize("memory_rounds", [1, 3, 7, 1000])
+def test_slices_match_a_list(memory_rounds):
+    history, expected = filled(memory_rounds)
+    rng = random.Random(memory_rounds)
+    ends = [None, *range(-60, 60)]
+    for _ in range(500):
+        index = slice(rng.choice(ends), rng.choice(ends), rng.choice([None, 1, 2, -1, -3]))
+        assert history[index] == expected[index]
+        assert history.scores[index] == [score for score, _ in expected[index]]
+        assert history.high_scores[index] == [highest for _, highest in expected[index]]
+    history.close()
+
+
+def test_index_out_of_range():
+    history, _ = filled(memory_rounds=4, rounds=10)
+    for index in (10, -11):
+        with pytest.raises(IndexError):
+            history[index]
+    history.close()
+
+
+def test_memory_rounds_must_be_positive():
+    with pytest.raises(ValueError):
+        RoundHistory(0)
+
+
+def test_session_score_lists_can_be_sliced(make_catalogue):
+    session = GameSession(6, make_catalogue([3, 1, 3, 2, 5, 3, 1, 4]), random.Random(2),
+                          history=RoundHistory(memory_rounds=2))
+    while not session.game_over:
+        session.new_round()
+        session.choose(0)
+
+    assert session.history.spilled
+    assert session.all_scores_list[-3:] == list(session.all_scores_list)[-3:]
+    assert session.all_high_score_list[::2] == list(session.all_high_score_list)[::2]
+    session.history.close()
@@ -0,0 +1,56 @@
+import json
+import random
+
+from game_session import GameSession
+from round_trace import (DEBUG, INFO, ChoiceMade, GameOver, JsonlSink, RoundGenerated,
+                         RoundTracer)
+
+SCORES = [3, 1, 3, 2, 5, 3, 1, 4, 6, 2, 8, 7]
+
+
+def choice(round_number):
+    return ChoiceMade(round_number, 0, "#000000", 5, True)
+
+
+def test_ring_buffer_keeps_the_newest_events():
+    tracer = RoundTracer(capacity=3)
+    for round_number in range(1, 6):
+        tracer.record(choice(round_number))
+    assert [event.round_number for event in tracer.events()] == [3, 4, 5]
+
+
+def test_events_below_the_level_are_ignored():
+    tracer = RoundTracer(level=INFO)
+    assert not tracer.wants(DEBUG) and tracer.wants(INFO)
+
+    tracer.record(RoundGenerated(1, ["#000000"] * 4, 3, 5))
+    tracer.record(choice(1))
+    assert [event.kind for event in tracer.events()] == ["choice_made"]
+
+
+def test_session_traces_each_round(make_catalogue):
+    tracer = RoundTracer(level=DEBUG)
+    session = GameSession(2, make_catalogue(SCORES), random.Random(1), tracer=tracer)
+    for _ in range(2):
+        info = session.new_round()
+        session.choose(1)
+
+    kinds = [event.kind for event in tracer.events()]
+    assert kinds == ["round_generated", "choice_made", "round_generated", "choice_made",
+                     "game_over"]
+    assert tracer.events()[2].target == info.target
+    game_over = tracer.events()[-1]
+    assert isinstance(game_over, GameOver)
+    assert game_over.rounds_played == 2
+
+
+def test_jsonl_sink_writes_one_line_per_event(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = RoundTracer(sink=JsonlSink(str(path)))
+    for round_number in range(1, 4):
+        tracer.record(choice(round_number))
+    tracer.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["round"] for line in lines] == [1, 2, 3]
+    assert lines[0]["event"] == "choice_made" and lines[0]["won"] is True
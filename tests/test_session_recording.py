@@ -0,0 +1,67 @@
+import pytest
+
+from game_session import GameSession
+from replay import record_random_games, replay, replay_game
+from session_recording import (RECORDING_HEADER, Recording, SessionRecorder, append_recording,
+                               read_recordings)
+
+
+def record_game(catalogue, seed, rounds=6):
+    session = GameSession(rounds, catalogue, seed=seed)
+    recorder = SessionRecorder(session)
+    while not session.game_over:
+        session.new_round()
+        session.choose(session.rounds_played % 4)
+    return session, recorder.recording
+
+
+def test_recording_keeps_every_choice(make_catalogue, random_scores):
+    session, recording = record_game(make_catalogue(random_scores()), seed=7)
+    assert recording.seed == 7
+    assert recording.rounds_wanted == recording.rounds_played == 6
+    assert sum(recording.scores) >= sum(session.all_scores_list)
+
+
+def test_recordings_round_trip_through_a_file(tmp_path, make_catalogue, random_scores):
+    catalogue = make_catalogue(random_scores())
+    path = tmp_path / "games.cqr"
+    recordings = [record_game(catalogue, seed)[1] for seed in (1, 2, 2 ** 64 - 1)]
+    for recording in recordings:
+        append_recording(path, recording)
+
+    loaded = read_recordings(path)
+    assert [recording.to_bytes() for recording in loaded] == \
+        [recording.to_bytes() for recording in recordings]
+
+
+def test_cut_short_recording_is_refused(make_catalogue, random_scores):
+    data = record_game(make_catalogue(random_scores()), seed=3)[1].to_bytes()
+    with pytest.raises(ValueError, match="cut short"):
+        Recording.from_buffer(data[:-1])
+    with pytest.raises(ValueError, match="not a recording"):
+        Recording.from_buffer(b"XXXX" + data[4:])
+    assert Recording.from_buffer(data)[1] == len(data) > RECORDING_HEADER.size
+
+
+def test_replay_matches_the_recording(make_catalogue, random_scores):
+    catalogue = make_catalogue(random_scores())
+    recording = record_game(catalogue, seed=11)[1]
+    assert replay_game(recording, catalogue) is None
+
+    # a different score shows up as a mismatch in that round
+    recording.scores[2] += 1
+    assert replay_game(recording, catalogue) == 3
+
+
+def test_replay_skips_games_from_another_colour_list(tmp_path, make_catalogue,
+                                                     random_scores):
+    catalogue = make_catalogue(random_scores())
+    path = tmp_path / "games.cqr"
+    record_random_games(path, 5, 10, catalogue, seed=4)
+    record_random_games(path, 2, 10, make_catalogue(random_scores(seed=2)), seed=4)
+
+    summary = replay(read_recordings(path), catalogue, repeat=2)
+    assert summary["games"] == 10
+    assert summary["rounds"] == 100
+    assert summary["wrong_colours"] == 2
+    assert summary["mismatches"] == []
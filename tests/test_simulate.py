@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+import random
+
+import pytest
+
+from colour_catalogue import NO_RGB, colour_rgb
+from simulate import highest_hex_strategy, play_rounds, red_first_strategy, simulate
+
+NAMES = ["red", "#102030", "#FF0000", "#00FFFF"]
+
+
+@pytest.fixture
+def csv_path(colour_csv):
+    """
+    :return: colour csv with some names that aren't hex codes
+    """
+    return colour_csv([f"#{number * 0x060503:06X}" if number % 3 else f"colour {number}",
+                       number % 9, "#000000"] for number in range(40))
+
+
+def test_colour_rgb():
+    assert [colour_rgb(name) for name in NAMES] == [NO_RGB, 0x102030, 0xFF0000, 0x00FFFF]
+    assert colour_rgb("#GGGGGG") == NO_RGB
+
+
+def test_strategies_ignore_names_that_are_not_hex_codes():
+    values = [colour_rgb(name) for name in NAMES]
+    rng = random.Random(1)
+    assert highest_hex_strategy(NAMES, values, rng) == 2
+    assert red_first_strategy(NAMES, values, rng) == 2
+
+
+@pytest.mark.parametrize("strategy", ["random", "highest-hex", "red-first"])
+def test_play_rounds(csv_path, strategy):
+    totals = play_rounds(strategy, 500, "test:0", csv_path)
+    assert totals["rounds"] == 500
+    assert 0 < totals["rounds_won"] <= 500
+    assert totals["total_score"] <= totals["max_possible"]
+
+    # the same seed plays the same rounds
+    again = play_rounds(strategy, 500, "test:0", csv_path)
+    assert (again["rounds_won"], again["total_score"]) == (totals["rounds_won"],
+                                                           totals["total_score"])
+
+
+def test_simulate_adds_up_the_chunks(csv_path):
+    with ThreadPoolExecutor(2) as executor:
+        summary = simulate("highest-hex", 1050, seed=3, chunk=100, csv_path=csv_path,
+                           executor=executor)
+    assert summary["rounds"] == 1050
+    assert summary["success_rate"] == summary["rounds_won"] / 1050 * 100
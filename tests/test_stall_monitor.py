@@ -0,0 +1,77 @@
+import time
+
+from callback_profiler import CallbackProfiler
+from latency_histogram import NS_PER_MS
+from stall_monitor import MAX_STALLS, StallMonitor
+
+
+class FakeRoot:
+    """
+    Keeps after() callbacks for the test to run by hand
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+
+    def after(self, ms, func):
+        self.next_id += 1
+        self.pending[self.next_id] = func
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def run_pending(self):
+        pending, self.pending = self.pending, {}
+        for func in pending.values():
+            func()
+
+
+def test_late_beats_are_stalls():
+    root = FakeRoot()
+    monitor = StallMonitor(root, interval_ms=10, stall_ms=100)
+    monitor.schedule()
+
+    # on time, then 300 ms late
+    monitor.expected = time.perf_counter_ns()
+    monitor.started = monitor.expected
+    root.run_pending()
+    monitor.expected = time.perf_counter_ns() - 300 * NS_PER_MS
+    root.run_pending()
+
+    report = monitor.report()
+    assert report["lag_ms"]["count"] == 2
+    assert report["stall_count"] == 1
+    assert report["stalls"][0]["ms"] >= 300
+    assert report["stalls"][0]["callback"] is None
+    assert len(root.pending) == 1
+
+
+def test_only_the_longest_stalls_are_kept():
+    monitor = StallMonitor(FakeRoot(), stall_ms=1)
+    monitor.started = 0
+    for lag in range(MAX_STALLS + 10):
+        monitor.add_stall(0, lag * NS_PER_MS)
+    assert monitor.stall_count == MAX_STALLS + 10
+    assert min(stall.lag for stall in monitor.stalls) == 10 * NS_PER_MS
+
+
+def test_watchdog_catches_what_was_running():
+    root = FakeRoot()
+    profiler = CallbackProfiler()
+    monitor = StallMonitor(root, interval_ms=10, stall_ms=40, profiler=profiler)
+    monitor.start()
+    try:
+        # the beat can't run until this 'callback' has finished
+        profiler.call("Play.slow_thing", time.sleep, (0.2,))
+        root.run_pending()
+    finally:
+        monitor.stop()
+
+    stall = monitor.report()["stalls"][0]
+    assert stall["callback"] == "Play.slow_thing"
+    assert any("test_watchdog_catches_what_was_running" in frame
+               for frame in stall["stack"])
+    assert "Play.slow_thing" in monitor.format_report()
+    assert not root.pending
@@ -0,0 +1,77 @@
+from widget_render import WidgetRenderer, add_counters, format_counters
+
+
+class FakeWidget:
+    """
+    Records config() calls, and runs after_idle callbacks when told to
+    """
+
+    def __init__(self):
+        self.configured = []
+        self.idle = []
+
+    def config(self, **options):
+        self.configured.append(options)
+
+    def after_idle(self, func):
+        self.idle.append(func)
+        return f"after#{len(self.idle)}"
+
+    def after_cancel(self, after_id):
+        self.idle[int(after_id.split("#")[1]) - 1] = None
+
+    def run_idle(self):
+        idle, self.idle = self.idle, []
+        for func in idle:
+            if func is not None:
+                func()
+
+
+def test_changes_are_sent_once_when_idle():
+    idle_widget, label = FakeWidget(), FakeWidget()
+    renderer = WidgetRenderer(idle_widget)
+    renderer.set(label, text="one")
+    renderer.set(label, text="two", bg="red")
+
+    assert label.configured == []
+    assert len(idle_widget.idle) == 1
+
+    idle_widget.run_idle()
+    assert label.configured == [{"text": "two", "bg": "red"}]
+
+
+def test_unchanged_options_are_skipped():
+    idle_widget, label, button = FakeWidget(), FakeWidget(), FakeWidget()
+    renderer = WidgetRenderer(idle_widget)
+    renderer.seed(label, text="hello", bg="red")
+
+    renderer.set(label, text="hello", bg="blue")
+    renderer.set(button, state="normal")
+    idle_widget.run_idle()
+    renderer.set(button, state="normal")
+    idle_widget.run_idle()
+
+    assert label.configured == [{"bg": "blue"}]
+    assert button.configured == [{"state": "normal"}]
+    assert renderer.counters() == {"calls_issued": 2, "calls_skipped": 1,
+                                   "options_sent": 2, "options_skipped": 2}
+
+
+def test_cancel_throws_pending_changes_away():
+    idle_widget, label = FakeWidget(), FakeWidget()
+    renderer = WidgetRenderer(idle_widget)
+    renderer.set(label, text="never shown")
+    renderer.cancel()
+    idle_widget.run_idle()
+    assert label.configured == []
+
+
+def test_counters_add_up_across_renderers():
+    totals = add_counters({}, {"calls_issued": 3, "calls_skipped": 1,
+                               "options_sent": 5, "options_skipped": 2})
+    add_counters(totals, {"calls_issued": 1, "calls_skipped": 0,
+                          "options_sent": 1, "options_skipped": 4})
+    assert totals == {"calls_issued": 4, "calls_skipped": 1, "options_sent": 6,
+                      "options_skipped": 6}
+    assert "4 config calls sent" in format_counters(totals)
+    assert "0 config calls sent" in format_counters({})
@@ -0,0 +1,106 @@
+class WidgetRenderer:
+    """
+    Remembers the options last applied to each widget and only sends Tk the
+    ones that have changed. Changes made during an event are collected and
+    sent in one go when Tk is next idle.
+
+    All changes to a widget should go through the renderer (or be passed
+    to seed()) so that what it remembers matches what is on screen.
+    """
+
+    def __init__(self, idle_widget):
+        """
+        :param idle_widget: any widget (used to schedule the idle flush)
+        """
+        self.idle_widget = idle_widget
+
+        # widget -> {option: value} last sent to Tk / waiting to be sent
+        self.applied = {}
+        self.pending = {}
+        self.flush_id = None
+
+        # counters so we can see how much work is being saved
+        self.calls_issued = 0
+        self.calls_skipped = 0
+        self.options_sent = 0
+        self.options_skipped = 0
+
+    def seed(self, widget, **options):
+        """
+        Records options a widget already has (eg: the ones it was made with)
+        """
+        self.applied.setdefault(widget, {}).update(options)
+
+    def set(self, widget, **options):
+        """
+        Asks for a widget's options to be changed (sent when Tk is idle)
+        """
+
+        self.pending.setdefault(widget, {}).update(options)
+
+        if self.flush_id is None:
+            self.flush_id = self.idle_widget.after_idle(self.flush)
+
+    def flush(self):
+        """
+        Sends the changed options to Tk - one config() call per widget
+        that actually needs changing
+        """
+
+        self.flush_id = None
+        pending = self.pending
+        self.pending = {}
+
+        for widget, options in pending.items():
+            applied = self.applied.setdefault(widget, {})
+            changes = {name: value for name, value in options.items()
+                       if name not in applied or applied[name] != value}
+
+            self.options_skipped += len(options) - len(changes)
+            if not changes:
+                self.calls_skipped += 1
+                continue
+
+            widget.config(**changes)
+            applied.update(changes)
+            self.calls_issued += 1
+            self.options_sent += len(changes)
+
+    def cancel(self):
+        """
+        Throws away anything waiting to be sent (eg: when the window closes)
+        """
+        if self.flush_id is not None:
+            self.idle_widget.after_cancel(self.flush_id)
+            self.flush_id = None
+        self.pending = {}
+
+    def counters(self):
+        """
+        :return: dictionary of Tk calls issued / skipped
+        """
+        return {"calls_issued": self.calls_issued, "calls_skipped": self.calls_skipped,
+                "options_sent": self.options_sent, "options_skipped": self.options_skipped}
+
+
+def add_counters(totals, counters):
+    """
+    Adds one renderer's counters to a running total (eg: every game played)
+    :return: totals
+    """
+    for name, value in counters.items():
+        totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def format_counters(counters):
+    """
+    :param counters: dictionary from counters() or add_counters
+    :return: one line summary of renderer counters (missing ones count as 0)
+    """
+    calls_issued, calls_skipped, options_sent, options_skipped = (
+        counters.get(name, 0) for name in ("calls_issued", "calls_skipped",
+                                           "options_sent", "options_skipped"))
+    return (f"Widget renderer: {calls_issued:,} config calls sent, "
+            f"{calls_skipped:,} skipped (nothing changed) - "
+            f"{options_sent:,} options sent, {options_skipped:,} skipped")